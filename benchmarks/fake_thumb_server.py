@@ -0,0 +1,95 @@
+# fake_thumb_server.py
+#
+# A local HTTP server that serves synthetic JPEG thumbnails for the benchmarks.
+# Any path ending in '.jpg' gets one of a fixed set of generated images, picked from the path,
+# so different videos get different images without generating one per video.
+# Responses carry an ETag and honour If-None-Match, like YouTube's image servers.
+
+import io
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageDraw
+
+# YouTube's hqdefault thumbnails are 480x360.
+THUMB_SIZE = (480, 360)
+VARIANT_COUNT = 32
+
+def make_thumbnail_variants(count=VARIANT_COUNT):
+    """Generates count distinct JPEGs with some detail in them, so they compress like real thumbnails."""
+    variants = []
+    for index in range(count):
+        img = Image.new('RGB', THUMB_SIZE, ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256))
+        draw = ImageDraw.Draw(img)
+        for line in range(0, THUMB_SIZE[1], 6):
+            shade = (line * 3 + index * 17) % 256
+            draw.line([(0, line), (THUMB_SIZE[0], (line * 7 + index * 11) % THUMB_SIZE[1])], fill=(shade, 255 - shade, (shade * 2) % 256), width=2)
+        draw.rectangle([40, 260, 440, 330], fill=(20, 20, 20))
+        draw.text((60, 280), f"Benchmark thumbnail {index}", fill=(255, 255, 255))
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=85)
+        variants.append(buffer.getvalue())
+    return variants
+
+class FakeThumbnailServer:
+    """Runs the server on a background thread. Use as a context manager; base_url is set once it is listening."""
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.variants = make_thumbnail_variants()
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    server.requests_served += 1
+                if not self.path.endswith('.jpg'):
+                    self.send_error(404)
+                    return
+                variant = zlib.crc32(self.path.encode('utf-8')) % len(server.variants)
+                etag = f'"bench-{variant}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.variants[variant]
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# fake_yt_dlp.py
+#
+# A stand-in for the yt-dlp command used by the benchmarks. It answers the two kinds of calls
+# YT-Ledger makes, without touching the network:
+#   - playlist scans (--flat-playlist --print ...), listing synthetic video IDs
+#   - per-video lookups (--print-json <video url>), printing a synthetic info JSON line, preceded by
+#     a few download progress lines when --progress-template is given
+#
+# Settings come from environment variables set by run_benchmarks.py:
+#   YTLEDGER_BENCH_VIDEOS     number of videos in every playlist (default 100)
+#   YTLEDGER_BENCH_LATENCY    seconds to wait before answering, to mimic YouTube (default 0)
+#   YTLEDGER_BENCH_THUMB_URL  base URL of the fake thumbnail server
+
+import json
+import os
+import sys
+import time
+import zlib
+
+def video_id_for(index):
+    """Synthetic 11 character IDs, like YouTube's."""
+    return f"bench{index:06d}"
+
+def video_info(video_id, thumb_base_url):
+    seed = zlib.crc32(video_id.encode('ascii'))
+    day = 1 + seed % 28
+    month = 1 + (seed >> 8) % 12
+    return {
+        'id': video_id,
+        'title': f"Benchmark video {video_id} " + "with a longer title " * (seed % 4),
+        'channel': f"Benchmark Channel {seed % 50}",
+        'upload_date': f"20{10 + (seed >> 16) % 15}{month:02d}{day:02d}",
+        'thumbnail': f"{thumb_base_url}/vi/{video_id}/hqdefault.jpg",
+        'description': "Synthetic description text for benchmarking. " * (1 + seed % 20),
+        'webpage_url': f"https://www.youtube.com/watch?v={video_id}",
+    }
+
+class _ProgressFields(dict):
+    # yt-dlp prints NA for fields a template asks for but the download doesn't have.
+    def __missing__(self, key):
+        return 'NA'
+
+def print_progress(template, video_id, size=4 * 1024 * 1024, steps=4):
+    for step in range(1, steps + 1):
+        fields = _ProgressFields({
+            'info.id': video_id,
+            'progress.status': 'finished' if step == steps else 'downloading',
+            'progress.downloaded_bytes': size * step // steps,
+            'progress.total_bytes,progress.total_bytes_estimate': size,
+            'progress.speed': float(size),
+            'progress.eta': steps - step,
+        })
+        sys.stdout.write(template % fields + "\n")
+
+def main(args):
+    video_count = int(os.environ.get('YTLEDGER_BENCH_VIDEOS', '100'))
+    latency = float(os.environ.get('YTLEDGER_BENCH_LATENCY', '0'))
+    thumb_base_url = os.environ.get('YTLEDGER_BENCH_THUMB_URL', 'http://127.0.0.1:8765')
+    url = args[-1] if args else ''
+
+    if latency:
+        time.sleep(latency)
+
+    if '--flat-playlist' in args:
+        print_format = args[args.index('--print') + 1] if '--print' in args else '%(id)s'
+        count = video_count
+        if '--playlist-items' in args:
+            # Only the "1:N" form used by the snapshot probe is supported.
+            count = min(count, int(args[args.index('--playlist-items') + 1].split(':')[1]))
+        lines = []
+        for index in range(count):
+            video_id = video_id_for(index)
+            lines.append(print_format.replace('%(playlist_count)s', str(video_count)).replace('%(id)s', video_id))
+        sys.stdout.write("\n".join(lines) + "\n")
+        return 0
+
+    if '--print-json' in args:
+        video_id = url.split('v=')[-1]
+        sys.stderr.write(f"[youtube] {video_id}: Downloading webpage\n")
+        if '--progress-template' in args:
+            template = args[args.index('--progress-template') + 1]
+            print_progress(template.split(':', 1)[1] if template.startswith('download:') else template, video_id)
+        sys.stdout.write(json.dumps(video_info(video_id, thumb_base_url)) + "\n")
+        return 0
+
+    sys.stderr.write(f"fake yt-dlp: unsupported arguments {args}\n")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
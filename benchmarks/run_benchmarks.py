@@ -0,0 +1,279 @@
+# run_benchmarks.py
+#
+# Times YT-Ledger's main stages on synthetic playlists, fully offline.
+# A fake yt-dlp command (fake_yt_dlp.py) is put first on PATH and a local server
+# (fake_thumb_server.py) serves the thumbnails, so no request ever leaves the machine.
+#
+#   python benchmarks/run_benchmarks.py
+#   python benchmarks/run_benchmarks.py --sizes 100,1000 --stages metadata,thumbnails --latency 0.05
+#
+# Each stage runs in its own process, so its peak memory can be measured on its own. Stages
+# use the output of the stages before them; a report stage run without 'metadata' gets a
+# synthetic video list, and one run without 'thumbnails' gets no images.
+# Every run is appended to the results file, so runs can be compared over time.
+#
+# The fake yt-dlp is installed as a script with a shebang line, so the 'metadata' stage needs
+# Linux or macOS.
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+STAGES = ('metadata', 'thumbnails', 'derivatives', 'xlsx', 'html', 'pdf')
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+PLAYLIST_URL = 'https://www.youtube.com/playlist?list=PLytledgerbenchmark'
+
+def peak_rss_mb(who):
+    """Peak resident memory in MB of this process (RUSAGE_SELF) or of its largest finished child (RUSAGE_CHILDREN)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+# --- Stages. These run in the child process. ---
+
+def synthetic_videos(size):
+    """The video list the metadata stage would return for size videos, built without running it."""
+    from fake_yt_dlp import video_id_for, video_info
+    from video_record import VideoRecord
+    thumb_base_url = os.environ.get('YTLEDGER_BENCH_THUMB_URL', '')
+    videos = []
+    for index in range(size):
+        video_data = VideoRecord.from_ytdlp(video_info(video_id_for(index), thumb_base_url))
+        video_data.truncate_description()
+        videos.append(video_data)
+    return videos
+
+def load_stage_output(workdir, name, default):
+    path = workdir / f"{name}.pkl"
+    if not path.exists():
+        return default()
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def save_stage_output(workdir, name, value):
+    with open(workdir / f"{name}.pkl", 'wb') as f:
+        pickle.dump(value, f)
+
+def run_stage(stage, workdir, size, settings):
+    """Runs one stage and returns how long its timed part took, in seconds."""
+    import main
+    from report_html import create_html_report
+    from report_pdf import create_pdf_report
+    from report_xlsx import create_spreadsheet
+    from thumb_cache import ThumbnailCache
+    from thumb_derivatives import DerivativeBuilder
+
+    if stage == 'metadata':
+        start = time.perf_counter()
+        videos = main.process_playlist_with_yt_dlp(
+            [PLAYLIST_URL], set(), workdir / 'videos', 1080, None, False, None, None,
+            metadata_workers=settings['metadata_workers'], engine_mode='subprocess', scan_workers=1
+        )
+        elapsed = time.perf_counter() - start
+        if not videos or len(videos) != size:
+            raise RuntimeError(f"Expected {size} videos from the metadata stage, got {len(videos or [])}.")
+        save_stage_output(workdir, 'videos', videos)
+        return elapsed
+
+    videos = load_stage_output(workdir, 'videos', lambda: synthetic_videos(size))
+    thumb_map = load_stage_output(workdir, 'thumb_map', dict)
+    derivatives = load_stage_output(workdir, 'derivatives', dict)
+
+    start = time.perf_counter()
+    if stage == 'thumbnails':
+        thumbs_folder = workdir / 'thumbs'
+        thumb_map = main.download_all_thumbnails_parallel(
+            videos, thumbs_folder, ThumbnailCache(thumbs_folder),
+            max_workers=settings['thumbnail_workers'], connections_per_host=settings['thumbnail_connections_per_host']
+        )
+        elapsed = time.perf_counter() - start
+        save_stage_output(workdir, 'thumb_map', thumb_map)
+        return elapsed
+    if stage == 'derivatives':
+        builder = DerivativeBuilder(workdir / 'thumbs' / 'derived', settings['derivative_workers'])
+        builder.build_all(thumb_map)
+        derivatives = builder.finish()
+        elapsed = time.perf_counter() - start
+        save_stage_output(workdir, 'derivatives', derivatives)
+        return elapsed
+    if stage == 'xlsx':
+        create_spreadsheet(videos, thumb_map, workdir / 'report.xlsx', derivatives=derivatives)
+    elif stage == 'html':
+        create_html_report(videos, thumb_map, "Benchmark Report", "YT-Ledger", REPO_DIR / 'template.html', workdir / 'report.html', derivatives=derivatives)
+    elif stage == 'pdf':
+        create_pdf_report(videos, thumb_map, workdir / 'report.pdf', "Benchmark Report", "YT-Ledger", derivatives=derivatives, workers=settings['pdf_workers'])
+    return time.perf_counter() - start
+
+def stage_child_main(args):
+    """Entry point of the child process for one stage. Writes its measurements next to the stage's output."""
+    import logging
+    sys.path[:0] = [str(REPO_DIR), str(BENCH_DIR)]
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    workdir = Path(args.workdir)
+    settings = json.loads(args.settings)
+    seconds = run_stage(args.run_stage, workdir, args.size, settings)
+    result = {
+        'wall_seconds': round(seconds, 3),
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        'peak_child_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+    (workdir / f"{args.run_stage}.result.json").write_text(json.dumps(result), encoding='utf-8')
+
+# --- The parent process. ---
+
+def install_fake_ytdlp(bin_dir):
+    """Puts an executable 'yt-dlp' into bin_dir that runs fake_yt_dlp.py with this Python."""
+    source = (BENCH_DIR / 'fake_yt_dlp.py').read_text(encoding='utf-8')
+    script = bin_dir / 'yt-dlp'
+    script.write_text(f"#!{sys.executable}\n{source}", encoding='utf-8')
+    script.chmod(0o755)
+
+def git_commit():
+    try:
+        process = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return process.stdout.strip() or None
+
+def append_results(output_path, run_record):
+    """Adds this run to the results file, which holds a list of runs."""
+    runs = []
+    if output_path.exists():
+        try:
+            runs = json.loads(output_path.read_text(encoding='utf-8'))
+        except ValueError:
+            print(f"Results file '{output_path}' is unreadable. Starting a new one.")
+            runs = []
+    runs.append(run_record)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    tmp_path.write_text(json.dumps(runs, indent=2), encoding='utf-8')
+    os.replace(tmp_path, output_path)
+
+def run_benchmarks(args):
+    from fake_thumb_server import FakeThumbnailServer
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        sys.exit(f"Unknown stage(s): {', '.join(unknown)}. Choose from: {', '.join(STAGES)}.")
+    stages = [stage for stage in STAGES if stage in stages]
+    if 'metadata' in stages and os.name == 'nt':
+        sys.exit("The 'metadata' stage needs the fake yt-dlp script, which only runs on Linux and macOS.")
+
+    settings = {
+        'ytdlp_latency': args.latency,
+        'thumb_latency': args.thumb_latency,
+        'metadata_workers': args.metadata_workers,
+        'thumbnail_workers': args.thumbnail_workers,
+        'thumbnail_connections_per_host': args.thumbnail_connections_per_host,
+        'derivative_workers': args.derivative_workers,
+        'pdf_workers': args.pdf_workers,
+    }
+    run_record = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': settings,
+        'results': [],
+    }
+
+    root_dir = Path(tempfile.mkdtemp(prefix='ytledger_bench_'))
+    bin_dir = root_dir / 'bin'
+    bin_dir.mkdir()
+    install_fake_ytdlp(bin_dir)
+
+    print(f"{'videos':>8}  {'stage':<12} {'seconds':>9} {'videos/s':>10} {'peak RSS MB':>12} {'child RSS MB':>13}")
+    try:
+        with FakeThumbnailServer(latency=args.thumb_latency) as server:
+            for size in sizes:
+                workdir = root_dir / f"{size}_videos"
+                workdir.mkdir()
+                env = dict(
+                    os.environ,
+                    PATH=str(bin_dir) + os.pathsep + os.environ.get('PATH', ''),
+                    YTLEDGER_BENCH_VIDEOS=str(size),
+                    YTLEDGER_BENCH_LATENCY=str(args.latency),
+                    YTLEDGER_BENCH_THUMB_URL=server.base_url,
+                )
+                for stage in stages:
+                    result = {'videos': size, 'stage': stage}
+                    process = subprocess.run(
+                        [sys.executable, str(Path(__file__).resolve()), '--run-stage', stage, '--workdir', str(workdir),
+                         '--size', str(size), '--settings', json.dumps(settings)],
+                        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8'
+                    )
+                    result_path = workdir / f"{stage}.result.json"
+                    if process.returncode == 0 and result_path.exists():
+                        result.update(json.loads(result_path.read_text(encoding='utf-8')))
+                        result['videos_per_second'] = round(size / result['wall_seconds'], 1) if result['wall_seconds'] else None
+                        result['ok'] = True
+                        print(f"{size:>8}  {stage:<12} {result['wall_seconds']:>9.2f} {result['videos_per_second'] or 0:>10.1f} "
+                              f"{result['peak_rss_mb'] or 0:>12.1f} {result['peak_child_rss_mb'] or 0:>13.1f}")
+                    else:
+                        result['ok'] = False
+                        result['error'] = process.stderr[-2000:]
+                        print(f"{size:>8}  {stage:<12} FAILED\n{process.stderr[-2000:]}")
+                    run_record['results'].append(result)
+                if not args.keep:
+                    shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        if args.keep:
+            print(f"\nBenchmark files kept in '{root_dir}'.")
+        else:
+            shutil.rmtree(root_dir, ignore_errors=True)
+
+    output_path = Path(args.output)
+    append_results(output_path, run_record)
+    print(f"\nResults appended to '{output_path}'.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for YT-Ledger's pipeline stages.")
+    parser.add_argument('--sizes', default=",".join(str(size) for size in DEFAULT_SIZES), help="Comma separated video counts (default: %(default)s).")
+    parser.add_argument('--stages', default=",".join(STAGES), help="Comma separated stages to time (default: %(default)s).")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the fake yt-dlp waits before answering each call.")
+    parser.add_argument('--thumb-latency', type=float, default=0.0, help="Seconds the fake thumbnail server waits before each response.")
+    parser.add_argument('--metadata-workers', type=int, default=4, help="Same as metadata_workers in config.ini.")
+    parser.add_argument('--thumbnail-workers', type=int, default=10, help="Same as thumbnail_workers in config.ini.")
+    parser.add_argument('--thumbnail-connections-per-host', type=int, default=10, help="Same as thumbnail_connections_per_host in config.ini.")
+    parser.add_argument('--derivative-workers', type=int, default=0, help="Same as derivative_workers in config.ini.")
+    parser.add_argument('--pdf-workers', type=int, default=1, help="Same as pdf_workers in config.ini.")
+    parser.add_argument('--output', default=str(BENCH_DIR / 'results.json'), help="JSON file the run is appended to (default: %(default)s).")
+    parser.add_argument('--label', default="", help="Free text stored with the run, e.g. a branch name.")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated reports and thumbnails for inspection.")
+    # Used internally to run one stage in a child process.
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--settings', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    if arguments.run_stage:
+        stage_child_main(arguments)
+    else:
+        run_benchmarks(arguments)
@@ -0,0 +1,103 @@
+# startup_budget.py
+#
+# Checks that YT-Ledger starts quickly, using Python's own import timer (python -X importtime).
+# Runs that end early, such as cron jobs with a bad or empty config, should not pay for
+# requests, Pillow, openpyxl or fpdf2; those are only loaded by the stages that use them.
+#
+#   python benchmarks/startup_budget.py
+#   python benchmarks/startup_budget.py --budget-ms 80 --runs 10
+#
+# Each scenario runs in a fresh interpreter a few times and the fastest run counts, which keeps
+# the numbers steady on a busy machine. Only imports made by YT-Ledger itself are counted, not
+# the ones Python makes while starting up. The script exits with status 1 if a scenario goes over
+# the budget or loads one of the heavy modules, so it can run as a check before merging.
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+# Packages that must not be imported until a stage needs them.
+HEAVY_MODULES = ('requests', 'urllib3', 'PIL', 'openpyxl', 'fpdf', 'fontTools', 'pypdf', 'yt_dlp')
+
+# "import time:  self [us] | cumulative | imported package", nested imports indented by two spaces each.
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+def scenarios(workdir):
+    """Returns {name: (command, working directory)}. Each working directory is prepared here."""
+    no_config_dir = workdir / 'no_config'
+    no_config_dir.mkdir()
+    empty_config_dir = workdir / 'empty_playlist'
+    empty_config_dir.mkdir()
+    # The shipped config.ini has no playlist_id, so main() stops right after reading it.
+    shutil.copy(REPO_DIR / 'config.ini', empty_config_dir / 'config.ini')
+    main_script = str(REPO_DIR / 'main.py')
+    return {
+        'import main': ([sys.executable, '-X', 'importtime', '-c', 'import main'], REPO_DIR),
+        'no config.ini': ([sys.executable, '-X', 'importtime', main_script], no_config_dir),
+        'empty playlist_id': ([sys.executable, '-X', 'importtime', main_script], empty_config_dir),
+    }
+
+def measure(command, cwd):
+    """Runs command once and returns (milliseconds spent importing after startup, set of top-level packages imported)."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_DIR) + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    process = subprocess.run(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+    after_startup = False
+    total_us = 0
+    packages = set()
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if after_startup:
+            packages.add(module.split('.')[0])
+            if indent == 1:
+                # A top-level import; its cumulative time includes everything it pulled in.
+                total_us += cumulative
+        elif indent == 1 and module == 'site':
+            # Everything up to 'site' is the interpreter starting up.
+            after_startup = True
+    return total_us / 1000, packages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checks YT-Ledger's import time against a budget.")
+    parser.add_argument('--budget-ms', type=float, default=100.0, help="Most milliseconds of imports allowed per scenario (default: %(default)s).")
+    parser.add_argument('--runs', type=int, default=5, help="Runs per scenario; the fastest counts (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix='ytledger_startup_'))
+    failed = False
+    try:
+        print(f"{'scenario':<20} {'import ms':>10}  heavy modules loaded")
+        for name, (command, cwd) in scenarios(workdir).items():
+            timings = []
+            packages = set()
+            for _ in range(max(1, args.runs)):
+                milliseconds, run_packages = measure(command, cwd)
+                timings.append(milliseconds)
+                packages |= run_packages
+            fastest = min(timings)
+            heavy = sorted(package for package in packages if package in HEAVY_MODULES)
+            over_budget = fastest > args.budget_ms
+            failed = failed or over_budget or bool(heavy)
+            status = " (over budget)" if over_budget else ""
+            print(f"{name:<20} {fastest:>10.1f}  {', '.join(heavy) or '-'}{status}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failed:
+        print(f"\nStartup budget exceeded. Budget: {args.budget_ms:.0f} ms and none of: {', '.join(HEAVY_MODULES)}.")
+        return 1
+    print(f"\nAll scenarios within {args.budget_ms:.0f} ms.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# download_scheduler.py
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import instrumentation
+
+# yt-dlp is asked to print this line (see DownloadScheduler.ytdlp_args) once a video's formats are downloaded
+# and its post-processing, the FFmpeg merge first of all, is about to start.
+MERGE_MARKER = '[ledger-merge]'
+
+# Seconds between free space checks while new downloads are paused for disk space.
+DISK_RECHECK_SECONDS = 30
+
+class DownloadScheduler:
+    """
+    Decides when each video may start downloading, so the network, the disk and FFmpeg are all kept busy
+    without any of them being asked for too much.
+
+    A video first holds one of network_workers download slots. When yt-dlp reports that the download is
+    done and the merge begins, it gives that slot to the next video and takes one of merge_workers merge
+    slots instead, so downloads carry on while earlier videos are merged. Run with a pool of `workers`
+    threads, videos waiting for a merge slot take up the spare threads, so when FFmpeg falls behind new
+    downloads stop starting instead of piling up more files to merge.
+    The in-process engine runs the merge in the worker thread, so it can hold a merge back until a slot
+    is free. A yt-dlp subprocess is held back by a MergeGate. Where named pipes aren't available (Windows),
+    a subprocess merges straight away and is only counted; when several downloads finish together, up to
+    `workers` merges can run at once.
+
+    bandwidth_limit (bytes per second, 0 = none) is shared equally between the download slots through yt-dlp's
+    --limit-rate. No new download starts while video_folder has less than min_free_bytes free; if nothing
+    is running that could change it, the video is skipped.
+    """
+    def __init__(self, video_folder, network_workers=2, merge_workers=1, bandwidth_limit=0, min_free_bytes=0):
+        self.video_folder = video_folder
+        self.network_workers = max(1, network_workers)
+        self.merge_workers = max(1, merge_workers)
+        self.bandwidth_limit = max(0, bandwidth_limit)
+        self.min_free_bytes = max(0, min_free_bytes)
+        self.downloading = 0
+        self.merging = 0
+        self._low_disk = False
+        self._cond = threading.Condition()
+
+    @property
+    def workers(self):
+        """Most videos in progress at once, counting those being merged."""
+        return self.network_workers + self.merge_workers
+
+    def ytdlp_args(self):
+        """The yt-dlp arguments the scheduler relies on."""
+        args = ['--print', f'post_process:{MERGE_MARKER} %(id)s']
+        if self.bandwidth_limit:
+            args += ['--limit-rate', str(max(1, int(self.bandwidth_limit / self.network_workers)))]
+        return args
+
+    def _free_bytes(self):
+        try:
+            return shutil.disk_usage(self.video_folder).free
+        except OSError:
+            return None
+
+    def _disk_ok(self):
+        if not self.min_free_bytes:
+            return True
+        free = self._free_bytes()
+        if free is None or free >= self.min_free_bytes:
+            if self._low_disk:
+                self._low_disk = False
+                logging.info("  -> Enough disk space is free again. Resuming downloads.")
+            return True
+        if not self._low_disk:
+            self._low_disk = True
+            logging.warning(
+                f"  -> Only {free / 1024 ** 3:.1f} GB free in '{self.video_folder}'. "
+                f"New downloads wait until {self.min_free_bytes / 1024 ** 3:.1f} GB are free."
+            )
+        return False
+
+    @contextmanager
+    def download(self, video_id):
+        """
+        Holds a download slot for one video and yields its _Download, or None if the video has to be skipped
+        for lack of disk space. The slot, or the merge slot it turned into, is released on leaving the block.
+        """
+        started = False
+        with self._cond:
+            while True:
+                if self.downloading < self.network_workers:
+                    if self._disk_ok():
+                        self.downloading += 1
+                        started = True
+                        break
+                    if not self.downloading and not self.merging:
+                        # Nothing running will free any space, so waiting would never end.
+                        break
+                    self._cond.wait(timeout=DISK_RECHECK_SECONDS)
+                else:
+                    self._cond.wait()
+        if not started:
+            instrumentation.count('downloads.skipped_low_disk')
+            logging.error(f"  -> Skipping the download of {video_id}: not enough free disk space in '{self.video_folder}'.")
+            yield None
+            return
+        download = _Download(self)
+        try:
+            yield download
+        finally:
+            download.release()
+
+class _Download:
+    """One video's place in the DownloadScheduler, moving from a download slot to a merge slot."""
+    __slots__ = ('scheduler', 'phase')
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.phase = 'download'
+
+    def merging(self, wait=True):
+        """
+        Swaps the download slot for a merge slot. With wait, blocks until a merge slot is free;
+        without it the merge is counted straight away (for callers that can't block, like the pipe reader).
+        """
+        scheduler = self.scheduler
+        with scheduler._cond:
+            if self.phase != 'download':
+                return
+            scheduler.downloading -= 1
+            self.phase = 'waiting'
+            scheduler._cond.notify_all()
+            while wait and scheduler.merging >= scheduler.merge_workers:
+                scheduler._cond.wait()
+            scheduler.merging += 1
+            self.phase = 'merge'
+        instrumentation.count('downloads.merges')
+
+    def release(self):
+        scheduler = self.scheduler
+        with scheduler._cond:
+            if self.phase == 'download':
+                scheduler.downloading -= 1
+            elif self.phase == 'merge':
+                scheduler.merging -= 1
+            self.phase = 'done'
+            scheduler._cond.notify_all()
+
+class MergeGate:
+    """
+    Holds a yt-dlp subprocess back between its download and its merge until a merge slot is free.
+
+    yt-dlp is asked to write MERGE_MARKER to a named pipe right after printing it to stdout. Opening a named
+    pipe for writing blocks until someone opens it for reading, so yt-dlp waits there. When the marker shows
+    up on stdout, call merge_requested(); a helper thread then waits in on_merge(wait=True) for a slot and
+    opens the pipe, letting yt-dlp carry on with the merge.
+    """
+    def __init__(self, on_merge):
+        self.on_merge = on_merge
+        self._requested = threading.Event()
+        self._closed = False
+        self._fd = None
+        self._dir = tempfile.mkdtemp(prefix='ytledger-merge-')
+        self.fifo = os.path.join(self._dir, 'gate')
+        os.mkfifo(self.fifo)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def ytdlp_args(self):
+        return ['--print-to-file', f'post_process:{MERGE_MARKER}', self.fifo]
+
+    def merge_requested(self):
+        """Called from the pipe reader when the marker is printed; never blocks."""
+        self._requested.set()
+
+    def _run(self):
+        self._requested.wait()
+        if self._closed:
+            return
+        self.on_merge(wait=True)
+        # Non-blocking, so this never hangs if yt-dlp died before opening its end. The pipe stays open
+        # until close(), so yt-dlp can open it whenever it gets there.
+        self._fd = os.open(self.fifo, os.O_RDONLY | os.O_NONBLOCK)
+
+    def close(self):
+        """Call once the yt-dlp process has exited."""
+        self._closed = True
+        self._requested.set()
+        self._thread.join()
+        if self._fd is not None:
+            os.close(self._fd)
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+def open_merge_gate(on_merge):
+    """Returns a MergeGate for one yt-dlp subprocess, or None where named pipes aren't available."""
+    if not hasattr(os, 'mkfifo'):
+        return None
+    try:
+        return MergeGate(on_merge)
+    except OSError as e:
+        logging.warning(f"  > Could not set up the merge gate. This merge won't wait for a merge slot. Error: {e}")
+        return None
@@ -0,0 +1,137 @@
+# folder_import.py
+
+import concurrent.futures
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+import instrumentation
+from video_record import VideoRecord, parse_info_line
+
+META_SUFFIX = '.meta.json'
+INFO_SUFFIX = '.info.json'
+
+# Extensions a downloaded video can have; downloads are merged to mp4, but older ones may not be.
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.mov', '.m4v')
+
+# Sidecars read by one task of the worker pool. A folder with fewer than this is read without a pool.
+CHUNK_SIZE = 200
+
+# The video ID yt-dlp puts at the end of every file name ('%(title)s [%(id)s].%(ext)s').
+ID_IN_NAME = re.compile(r'\[([0-9A-Za-z_-]{11})\]$')
+
+def find_sidecars(video_folder):
+    """
+    Lists the videos in video_folder by the sidecars next to them.
+    Returns [(stem, has_meta, has_info, video_name or None)], one per '<title> [<id>]' stem that has a sidecar.
+    """
+    stems = {}
+    videos = {}
+    with os.scandir(video_folder) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.endswith(META_SUFFIX):
+                stems.setdefault(name[:-len(META_SUFFIX)], [False, False])[0] = True
+            elif name.endswith(INFO_SUFFIX):
+                stems.setdefault(name[:-len(INFO_SUFFIX)], [False, False])[1] = True
+            else:
+                stem, ext = os.path.splitext(name)
+                if ext.lower() in VIDEO_EXTENSIONS:
+                    videos[stem] = name
+    return [(stem, has_meta, has_info, videos.get(stem)) for stem, (has_meta, has_info) in sorted(stems.items())]
+
+def read_meta_file(path):
+    """Builds a record from the .meta.json written by main.fetch_video_metadata. It has no ID field of its own."""
+    with open(path, encoding='utf-8') as f:
+        meta = json.load(f)
+    return VideoRecord(
+        id=None,
+        title=meta.get('video_title', 'N/A'),
+        channel=meta.get('channel_name', 'N/A'),
+        thumbnail_url=meta.get('thumbnail_url'),
+        upload_date=meta.get('original_upload_date', 'N/A'),
+        video_path=meta.get('local_file_path'),
+        description=meta.get('description', ''),
+    )
+
+def read_info_file(path):
+    """Builds a record from yt-dlp's .info.json, keeping only the keys the reports use (see parse_info_line)."""
+    with open(path, encoding='utf-8') as f:
+        return VideoRecord.from_ytdlp(parse_info_line(f.read()))
+
+def read_sidecars(video_folder, sidecars):
+    """
+    Reads one chunk of find_sidecars() entries. Runs in a worker process.
+    Returns (records, errors), errors being messages for the parent to log.
+    """
+    video_folder = Path(video_folder)
+    records = []
+    errors = []
+    for stem, has_meta, has_info, video_name in sidecars:
+        # The .meta.json is a few kilobytes; the .info.json can be hundreds, so it is only read when there is no .meta.json.
+        path = video_folder / (stem + (META_SUFFIX if has_meta else INFO_SUFFIX))
+        try:
+            video_data = read_meta_file(path) if has_meta else read_info_file(path)
+        except (OSError, ValueError) as e:
+            errors.append(f"Could not read '{path}'. Skipping. Error: {e}")
+            continue
+        if not video_data.id:
+            match = ID_IN_NAME.search(stem)
+            if not match:
+                errors.append(f"Could not tell the video ID of '{path}' from its name. Skipping.")
+                continue
+            video_data.id = match.group(1)
+        # The recorded path may be from before the folder was moved; the file next to the sidecar is what counts.
+        if video_name:
+            video_data.video_path = str(video_folder / video_name)
+        elif video_data.downloaded and not os.path.exists(video_data.video_path):
+            video_data.video_path = None
+        video_data.truncate_description()
+        records.append(video_data)
+    return records, errors
+
+def load_video_folder(video_folder, max_workers=None, executor=None, on_video=None):
+    """
+    Rebuilds the video list from the .meta.json and .info.json sidecars in video_folder, without yt-dlp or the network.
+    The sidecars are read in a process pool; executor can be one shared with other work, as in batch mode.
+    A video found under more than one name (it was retitled) is taken from the name that has the video file.
+    on_video, if given, is called once for every video in the result.
+    """
+    if not Path(video_folder).is_dir():
+        logging.error(f"Video folder '{video_folder}' does not exist. Nothing to rebuild from.")
+        return []
+
+    with instrumentation.span('scan_video_folder'):
+        sidecars = find_sidecars(video_folder)
+    logging.info(f"  -> Found {len(sidecars)} video(s) with sidecar files in '{video_folder}'.")
+    instrumentation.count('folder_import.meta', sum(has_meta for _, has_meta, _, _ in sidecars))
+    instrumentation.count('folder_import.info', sum(not has_meta for _, has_meta, _, _ in sidecars))
+
+    chunks = [sidecars[start:start + CHUNK_SIZE] for start in range(0, len(sidecars), CHUNK_SIZE)]
+    if len(chunks) <= 1:
+        results = [read_sidecars(video_folder, chunk) for chunk in chunks]
+    else:
+        pool = executor or concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or None)
+        try:
+            results = list(pool.map(read_sidecars, [video_folder] * len(chunks), chunks))
+        finally:
+            if executor is None:
+                pool.shutdown(wait=True)
+
+    videos = {}
+    for records, errors in results:
+        for message in errors:
+            logging.warning(f"  > {message}")
+        for video_data in records:
+            existing = videos.get(video_data.id)
+            if existing is None or (video_data.downloaded and not existing.downloaded):
+                videos[video_data.id] = video_data
+
+    video_list = [videos[video_id] for video_id in sorted(videos)]
+    if on_video:
+        for video_data in video_list:
+            on_video(video_data)
+    logging.info(f"  -> Rebuilt {len(video_list)} video(s) from disk, {sum(v.downloaded for v in video_list)} of them downloaded.")
+    return video_list
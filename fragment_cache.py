@@ -0,0 +1,123 @@
+# fragment_cache.py
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+import instrumentation
+
+# Fragments written per transaction.
+WRITE_BATCH = 500
+
+class FragmentCache:
+    """
+    A persistent SQLite cache of the per-video pieces a report is built from, such as spreadsheet rows with
+    their image size and bytes, or a PDF banner's wrapped text.
+
+    Every entry is stored under a key hashed from everything the fragment depends on (see fragment_key), so
+    a video whose fields and thumbnail are unchanged is reused and any change simply misses. Each report writer
+    opens its own connection for its own kind of fragment, which lets writers in separate processes share one file.
+    """
+    def __init__(self, db_path, kind, max_age_days=30):
+        self.db_path = Path(db_path)
+        self.kind = kind
+        self.max_age_seconds = float(max_age_days) * 86400
+        self.hits = 0
+        self.misses = 0
+        self._now = time.time()
+        self._used = []
+        self._pending = []
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fragments (
+                    kind TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    data TEXT,
+                    blob BLOB,
+                    used_at REAL NOT NULL,
+                    PRIMARY KEY (kind, video_id)
+                )
+            """)
+
+    def get(self, video_id, key):
+        """Returns (data, blob) stored for video_id under key, or None if there is none or it is out of date."""
+        row = self._conn.execute(
+            "SELECT data, blob FROM fragments WHERE kind = ? AND video_id = ? AND key = ?", (self.kind, video_id, key)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.append((self._now, self.kind, video_id))
+        return row
+
+    def put(self, video_id, key, data, blob=None):
+        """Stores a fragment, replacing whatever video_id had before."""
+        self._pending.append((self.kind, video_id, key, data, blob, self._now))
+        if len(self._pending) >= WRITE_BATCH:
+            self._flush()
+
+    def _flush(self):
+        # Short transactions, so writers in other processes aren't locked out for a whole report.
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fragments (kind, video_id, key, data, blob, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending
+            )
+        self._pending.clear()
+
+    def close(self):
+        """Writes what is left of this run's fragments and drops ones of this kind that no report has used for max_age_days."""
+        try:
+            self._flush()
+            with self._conn:
+                self._conn.executemany("UPDATE fragments SET used_at = ? WHERE kind = ? AND video_id = ?", self._used)
+                if self.max_age_seconds:
+                    self._conn.execute(
+                        "DELETE FROM fragments WHERE kind = ? AND used_at < ?", (self.kind, self._now - self.max_age_seconds)
+                    )
+        finally:
+            self._conn.close()
+        instrumentation.count(f'fragment_cache.{self.kind}.hit', self.hits)
+        instrumentation.count(f'fragment_cache.{self.kind}.miss', self.misses)
+        if self.hits:
+            logging.info(f"  -> Reused {self.hits} cached {self.kind} row(s), rendered {self.misses}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def fragment_key(*parts):
+    """Hashes the values a fragment depends on. Paths and other objects are hashed by their text."""
+    return hashlib.sha1(json.dumps(parts, default=str, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def file_signature(path):
+    """
+    Identifies a file's current content cheaply, by its path, size and modification time.
+    Returns None for a missing file, so a fragment built without an image misses once the image arrives.
+    """
+    if not path:
+        return None
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+def open_fragment_cache(db_path_str, kind):
+    """Opens the report fragment cache configured in config.ini, or returns None when it is disabled or unusable."""
+    if not db_path_str:
+        return None
+    try:
+        return FragmentCache(Path(db_path_str), kind)
+    except sqlite3.Error as e:
+        logging.error(f"Could not open the report cache '{db_path_str}'. Building the {kind} report without it. Error: {e}")
+        return None
@@ -0,0 +1,236 @@
+# instrumentation.py
+
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb(who='self'):
+    """Peak resident memory in MB of this process, or of its largest finished child process with who='children'."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return round(usage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else usage.ru_maxrss / 1024, 1)
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1)]
+
+class RunMetrics:
+    """
+    Timings, counters and memory use for one run of the script.
+
+    Stages are the big steps of main(). They record wall time, the CPU time of the whole process and of its
+    finished child processes, and peak memory. Spans are smaller units of work that repeat, such as one
+    yt-dlp call or one thumbnail. They are summed per name and record the CPU time of the thread that ran them.
+    Counters add up things like bytes transferred, subprocesses started and cache hits.
+
+    Every stage is kept as a Chrome trace event. Spans are only kept when trace is on, since there can be many.
+    """
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.spans = {}
+        self.counters = {}
+        self.trace_events = []
+        self._thread_names = {}
+
+    def _add_trace_event(self, name, category, started_at, wall, args=None, pid=None, tid=None):
+        pid = pid or os.getpid()
+        tid = tid or threading.get_ident()
+        event = {
+            'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': round((started_at - self.started_at) * 1e6), 'dur': round(wall * 1e6),
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.trace_events.append(event)
+            if (pid, tid) not in self._thread_names:
+                self._thread_names[(pid, tid)] = threading.current_thread().name if pid == os.getpid() else f"worker {pid}"
+
+    @contextmanager
+    def stage(self, name):
+        started_at = time.time()
+        start = time.perf_counter()
+        cpu_start = os.times()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu_end = os.times()
+            self.record_stage(
+                name, started_at, wall,
+                cpu_seconds=(cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system),
+                children_cpu_seconds=(cpu_end.children_user - cpu_start.children_user) + (cpu_end.children_system - cpu_start.children_system),
+                peak_rss=peak_rss_mb(),
+            )
+
+    def record_stage(self, name, started_at, wall, cpu_seconds=None, children_cpu_seconds=None, peak_rss=None, pid=None):
+        """Adds a stage that was timed elsewhere, e.g. a report written in a worker process."""
+        with self._lock:
+            entry = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'children_cpu_seconds': 0.0, 'peak_rss_mb': None})
+            entry['wall_seconds'] += wall
+            entry['cpu_seconds'] += cpu_seconds or 0.0
+            entry['children_cpu_seconds'] += children_cpu_seconds or 0.0
+            if peak_rss is not None:
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0, peak_rss)
+        self._add_trace_event(name, 'stage', started_at, wall, pid=pid, tid=1 if pid else None)
+
+    @contextmanager
+    def span(self, name, **args):
+        started_at = time.time()
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - cpu_start
+            with self._lock:
+                entry = self.spans.setdefault(name, {'durations': [], 'cpu_seconds': 0.0})
+                entry['durations'].append(wall)
+                entry['cpu_seconds'] += cpu
+            if self.trace:
+                self._add_trace_event(name, 'span', started_at, wall, args)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        times = os.times()
+        spans = {}
+        for name, entry in self.spans.items():
+            durations = sorted(entry['durations'])
+            spans[name] = {
+                'count': len(durations),
+                'wall_seconds': round(sum(durations), 3),
+                'cpu_seconds': round(entry['cpu_seconds'], 3),
+                'mean_seconds': round(sum(durations) / len(durations), 4),
+                'p95_seconds': round(_percentile(durations, 0.95), 4),
+                'max_seconds': round(durations[-1], 4),
+            }
+        stages = {
+            name: {key: round(value, 3) if isinstance(value, float) else value for key, value in entry.items()}
+            for name, entry in self.stages.items()
+        }
+        return {
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._start, 3),
+            'cpu_seconds': round(times.user + times.system, 3),
+            'children_cpu_seconds': round(times.children_user + times.children_system, 3),
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_child_rss_mb': peak_rss_mb('children'),
+            'stages': stages,
+            'spans': spans,
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def write_summary(self, path, summary):
+        _write_atomic(path, json.dumps(summary, indent=2))
+
+    def write_prometheus(self, path, summary):
+        """Writes the summary in the Prometheus text format, e.g. for node_exporter's textfile collector."""
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP ytledger_{name} {help_text}")
+            lines.append(f"# TYPE ytledger_{name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"ytledger_{name}{{{label_text}}} {value}" if label_text else f"ytledger_{name} {value}")
+
+        metric('last_run_timestamp_seconds', "When the last run started.", [({}, round(self.started_at))])
+        metric('run_wall_seconds', "Wall time of the last run.", [({}, summary['wall_seconds'])])
+        metric('run_cpu_seconds', "CPU time of the last run.", [({'process': 'self'}, summary['cpu_seconds']), ({'process': 'children'}, summary['children_cpu_seconds'])])
+        if summary['peak_rss_mb'] is not None:
+            metric('peak_rss_bytes', "Peak resident memory.", [
+                ({'process': 'self'}, int(summary['peak_rss_mb'] * 1024 * 1024)),
+                ({'process': 'largest_child'}, int(summary['peak_child_rss_mb'] * 1024 * 1024)),
+            ])
+        metric('stage_wall_seconds', "Wall time of each stage.", [({'stage': name}, entry['wall_seconds']) for name, entry in summary['stages'].items()])
+        metric('stage_cpu_seconds', "CPU time of each stage.", [({'stage': name}, entry['cpu_seconds']) for name, entry in summary['stages'].items()])
+        metric('span_count', "Number of times each unit of work ran.", [({'span': name}, entry['count']) for name, entry in summary['spans'].items()])
+        metric('span_wall_seconds', "Total wall time of each unit of work.", [({'span': name}, entry['wall_seconds']) for name, entry in summary['spans'].items()])
+        metric('span_p95_seconds', "95th percentile duration of each unit of work.", [({'span': name}, entry['p95_seconds']) for name, entry in summary['spans'].items()])
+        for name, value in summary['counters'].items():
+            metric(re.sub(r'[^a-zA-Z0-9_]', '_', name) + '_total', f"Counter '{name}' for the last run.", [({}, value)])
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+    def write_trace(self, path):
+        """Writes the trace in Chrome's trace-event format. Open it in chrome://tracing or ui.perfetto.dev."""
+        with self._lock:
+            events = list(self.trace_events)
+            thread_names = dict(self._thread_names)
+        for (pid, tid), thread_name in thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}})
+        _write_atomic(path, json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+
+def _write_atomic(path, text):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+# The metrics of the current run. Modules record into it through the functions below.
+_current = RunMetrics()
+
+def start_run(trace=False):
+    """Starts a fresh set of metrics for a new run."""
+    global _current
+    _current = RunMetrics(trace)
+    return _current
+
+def current():
+    return _current
+
+def set_trace(enabled):
+    _current.trace = enabled
+
+def stage(name):
+    return _current.stage(name)
+
+def span(name, **args):
+    return _current.span(name, **args)
+
+def count(name, value=1):
+    _current.count(name, value)
+
+def record_stage(name, started_at, wall, **kwargs):
+    _current.record_stage(name, started_at, wall, **kwargs)
+
+def write_outputs(summary_file=None, prometheus_file=None, trace_file=None):
+    """Writes whichever outputs are configured and logs a short overview of the run."""
+    summary = _current.summary()
+    stage_text = ", ".join(f"{name} {entry['wall_seconds']:.1f}s" for name, entry in summary['stages'].items())
+    logging.info(f"\nRun took {summary['wall_seconds']:.1f}s ({stage_text}). Peak memory: {summary['peak_rss_mb']} MB.")
+    outputs = ((summary_file, lambda path: _current.write_summary(path, summary)),
+               (prometheus_file, lambda path: _current.write_prometheus(path, summary)),
+               (trace_file, _current.write_trace))
+    for path, write in outputs:
+        if not path:
+            continue
+        try:
+            write(path)
+            logging.info(f"  -> Run metrics written to '{path}'.")
+        except OSError as e:
+            logging.error(f"Could not write run metrics to '{path}'. Error: {e}")
+    return summary
@@ -0,0 +1,199 @@
+# ledger_index.py
+
+import collections
+import logging
+import re
+import sqlite3
+from pathlib import Path
+
+from metadata_store import VIDEO_FIELDS
+from video_record import DESCRIPTION_CHARS, VideoRecord
+
+# Config sections that define sub-reports are named '[report:<name>]'.
+QUERY_SECTION_PREFIX = 'report:'
+
+SPLIT_BY = ('channel', 'year')
+
+DATE_BOUND = re.compile(r'^\d{4}(-\d{2}(-\d{2})?)?$')
+
+# One sub-report: the videos matching every filter that is set.
+# date_from and date_to are 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' and both included; match is a full-text query over
+# the title and description (SQLite FTS5 syntax: words, "phrases", OR, NOT, prefix*). split_by makes one report
+# for each channel or each year among the matching videos.
+ReportQuery = collections.namedtuple(
+    'ReportQuery', 'name channel date_from date_to match split_by report_title', defaults=(None,) * 6
+)
+
+def report_name_slug(value):
+    """Turns a sub-report name, channel or year into something safe to put in a file name."""
+    return re.sub(r'[^\w-]+', '_', value).strip('_') or 'none'
+
+def _lower_bound(date):
+    # Padded so that partial dates compare correctly against 'YYYY-MM-DD'.
+    return date + '-00' * (2 - date.count('-'))
+
+def _upper_bound(date):
+    return date + '-99' * (2 - date.count('-'))
+
+def parse_report_queries(config):
+    """Reads the '[report:<name>]' sections of a config into ReportQuery tuples, skipping any that are invalid."""
+    queries = []
+    for section in config.sections():
+        if not section.startswith(QUERY_SECTION_PREFIX):
+            continue
+        name = report_name_slug(section[len(QUERY_SECTION_PREFIX):].strip())
+        options = {key: config.get(section, key, fallback='').strip() or None for key in ReportQuery._fields[1:]}
+        bad_dates = [options[key] for key in ('date_from', 'date_to') if options[key] and not DATE_BOUND.match(options[key])]
+        if bad_dates:
+            logging.warning(f"Skipping sub-report [{section}]: dates must look like 2024, 2024-05 or 2024-05-31, not {', '.join(bad_dates)}.")
+            continue
+        if options['split_by']:
+            options['split_by'] = options['split_by'].lower()
+            if options['split_by'] not in SPLIT_BY:
+                logging.warning(f"Skipping sub-report [{section}]: split_by must be one of {', '.join(SPLIT_BY)}.")
+                continue
+        if options['date_from']:
+            options['date_from'] = _lower_bound(options['date_from'])
+        if options['date_to']:
+            options['date_to'] = _upper_bound(options['date_to'])
+        queries.append(ReportQuery(name, **options))
+    return queries
+
+class LedgerIndex:
+    """
+    The videos of one ledger in SQLite, so sub-reports can be cut from it by channel, upload date and text
+    without fetching anything again.
+
+    channel and upload_date are indexed, and the title and description are searchable through an FTS5 table
+    when this SQLite has FTS5; otherwise text queries fall back to matching each word with LIKE.
+    The index is rebuilt from each run's video list by replace(). Kept in a file, it also lets a later
+    run build its reports from it alone (main.py --from-index).
+
+    One file can hold several ledgers, e.g. of configs kept in the same folder. Every row belongs to the
+    ledger named by ledger_key, and this index only ever reads or replaces that ledger's rows.
+    """
+    def __init__(self, db_path=':memory:', ledger_key=''):
+        self.db_path = db_path
+        self.ledger_key = ledger_key
+        self._conn = sqlite3.connect(str(db_path))
+        with self._conn:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(ledger)")]
+            if columns and 'ledger' not in columns:
+                # Written before rows were keyed by ledger. It is rebuilt on every run anyway.
+                self._conn.execute("DROP TABLE IF EXISTS ledger_text")
+                self._conn.execute("DROP TABLE ledger")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS ledger (ledger TEXT, {', '.join(f'{field} TEXT' for field in VIDEO_FIELDS)}, PRIMARY KEY (ledger, id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ledger_channel ON ledger (ledger, channel COLLATE NOCASE)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ledger_upload_date ON ledger (ledger, upload_date)")
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS ledger_text USING fts5(title, description, content='ledger', content_rowid='rowid')"
+                )
+                self.full_text = True
+            except sqlite3.OperationalError:
+                logging.warning("  > This SQLite has no FTS5. Text filters in sub-reports will use slower LIKE matching.")
+                self.full_text = False
+
+    def replace(self, video_list, descriptions=None):
+        """
+        Makes this ledger's part of the index hold exactly video_list. descriptions can map video IDs to their
+        full description (see MetadataStore.get_descriptions), since the records only carry the start of it.
+        """
+        descriptions = descriptions or {}
+        rows = (
+            [self.ledger_key] + [getattr(video_data, field) for field in VIDEO_FIELDS[:-1]] + [descriptions.get(video_data.id, video_data.description)]
+            for video_data in video_list
+        )
+        with self._conn:
+            self._conn.execute("DELETE FROM ledger WHERE ledger = ?", (self.ledger_key,))
+            self._conn.executemany(f"INSERT OR REPLACE INTO ledger VALUES (?, {', '.join('?' for _ in VIDEO_FIELDS)})", rows)
+            if self.full_text:
+                self._conn.execute("INSERT INTO ledger_text (ledger_text) VALUES ('rebuild')")
+
+    def _where(self, query):
+        clauses, params = ["ledger = ?"], [self.ledger_key]
+        if query is None:
+            return clauses[0], params
+        if query.channel:
+            clauses.append("channel = ? COLLATE NOCASE")
+            params.append(query.channel)
+        if query.date_from or query.date_to:
+            # Leaves out 'N/A' dates, which would sort after every real one.
+            clauses.append("upload_date GLOB '[0-9]*'")
+        if query.date_from:
+            clauses.append("upload_date >= ?")
+            params.append(query.date_from)
+        if query.date_to:
+            clauses.append("upload_date <= ?")
+            params.append(query.date_to)
+        if query.match and self.full_text:
+            clauses.append("rowid IN (SELECT rowid FROM ledger_text WHERE ledger_text MATCH ?)")
+            params.append(query.match)
+        elif query.match:
+            for word in query.match.split():
+                clauses.append("(title LIKE ? OR description LIKE ?)")
+                params += [f'%{word}%'] * 2
+        return ' AND '.join(clauses), params
+
+    def videos(self, query=None):
+        """
+        Returns the VideoRecords matching query (all of them for None), newest first like the main report.
+        Raises sqlite3.OperationalError for a malformed text query.
+        """
+        where, params = self._where(query)
+        rows = self._conn.execute(
+            f"SELECT {', '.join(VIDEO_FIELDS[:-1])}, substr(description, 1, ?) FROM ledger WHERE {where} ORDER BY upload_date DESC, id",
+            [DESCRIPTION_CHARS] + params
+        ).fetchall()
+        return [VideoRecord(*row) for row in rows]
+
+    def expand(self, queries):
+        """
+        Replaces each query that has split_by with one query per channel or year among its videos.
+        Queries that SQLite rejects are logged and left out.
+        """
+        expanded = []
+        for query in queries:
+            if not query.split_by:
+                expanded.append(query)
+                continue
+            where, params = self._where(query)
+            column = 'channel' if query.split_by == 'channel' else 'substr(upload_date, 1, 4)'
+            if query.split_by == 'year':
+                where += " AND upload_date GLOB '[0-9]*'"
+            try:
+                values = [row[0] for row in self._conn.execute(f"SELECT DISTINCT {column} FROM ledger WHERE {where} ORDER BY 1", params)]
+            except sqlite3.OperationalError as e:
+                logging.error(f"❌ Sub-report '{query.name}' has an invalid filter. Error: {e}")
+                continue
+            for value in values:
+                title = f"{query.report_title} - {value}" if query.report_title else None
+                if query.split_by == 'channel':
+                    part = query._replace(channel=value)
+                else:
+                    part = query._replace(
+                        date_from=max(query.date_from or '', _lower_bound(value)),
+                        date_to=min(query.date_to or _upper_bound(value), _upper_bound(value)),
+                    )
+                expanded.append(part._replace(name=f"{query.name}_{report_name_slug(value)}", split_by=None, report_title=title))
+        return expanded
+
+    def count(self):
+        """How many videos this ledger has in the index."""
+        return self._conn.execute("SELECT count(*) FROM ledger WHERE ledger = ?", (self.ledger_key,)).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+def open_ledger_index(db_path_str, ledger_key):
+    """
+    Opens the ledger index file configured in config.ini, or an in-memory index when none is, for the ledger
+    named by ledger_key. Returns None if unusable.
+    """
+    try:
+        return LedgerIndex(Path(db_path_str) if db_path_str else ':memory:', ledger_key)
+    except sqlite3.Error as e:
+        logging.error(f"Could not open the ledger index '{db_path_str}'. Continuing without it. Error: {e}")
+        return None
@@ -1,218 +1,689 @@
 # main.py
 
+import argparse
+import atexit
 import configparser
+import hashlib
 import json
 import logging
+import logging.handlers
+import os
 import subprocess
 import sys
 import threading
+import queue
+import sqlite3
+import itertools
+import collections
 import concurrent.futures
+import contextlib
+import time
 from datetime import datetime
 from pathlib import Path
-import io
-import requests
-from PIL import Image
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as OpenpyxlImage
-from urllib.parse import quote, urlparse, parse_qs
-from report_pdf import create_pdf_report
-from report_html import create_html_report
+from urllib.parse import urlparse, parse_qs
+from report_html import render_video_row
+from report_runner import REPORT_FORMATS, parse_report_formats, run_reports
+from ytdlp_engine import create_inprocess_engine
+from subprocess_io import PROGRESS_TEMPLATE, ProgressTracker, parse_progress_line, pipe_reader
+from download_scheduler import MERGE_MARKER, DownloadScheduler, open_merge_gate
+from metadata_store import open_metadata_store
+from folder_import import load_video_folder
+from ledger_index import open_ledger_index, parse_report_queries
+from run_journal import open_run_journal
+from thumb_cache import LazySession, ThumbnailCache, create_session
+from thumb_derivatives import DerivativeBuilder
+from video_record import VideoRecord, parse_info_line
+from rate_limiter import OK, AdaptiveLimiter, RetryQueue, YtdlpOutcome, classify_http_error
+import instrumentation
 
 # --- Setup Centralized Logging ---
+# Done from setup_logging() rather than at import time: worker processes re-import this
+# module on some platforms and must not truncate the log file.
 log_file_path = Path("yt_ledger.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] - %(message)s",
-    handlers=[
+
+def setup_logging():
+    """
+    Sends log records through a queue to a single thread that writes the log file and the console.
+    Worker threads then never wait on disk or terminal writes, which add up when many downloads log at once.
+    """
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s")
+    handlers = [
         logging.FileHandler(log_file_path, mode='w', encoding='utf-8'),
         logging.StreamHandler(sys.stdout)
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    # Registered after logging's own shutdown hook, so it runs first and the queue is drained before the files close.
+    atexit.register(listener.stop)
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    if hasattr(os, 'register_at_fork'):
+        # A forked worker process has no listener thread; it writes to the handlers directly, as before.
+        os.register_at_fork(after_in_child=lambda: setattr(root, 'handlers', list(handlers)))
 
-def sanitize_filename(name):
-    """Removes invalid characters from a string so it can be used as a filename."""
-    invalid_chars = set('<>:"/\\|?*')
-    return "".join(char for char in name if char not in invalid_chars)[:150]
-
-def stream_handler(stream, log_level_info, log_level_warn):
-    """Redirects a stream (like stderr) to the logging system."""
-    with stream:
-        for line in iter(stream.readline, ''):
-            line_stripped = line.strip()
-            if line_stripped:
-                if line_stripped.lower().startswith(('warning:', 'error:')):
-                    log_level_warn(f"[yt-dlp] {line_stripped}")
-                else:
-                    log_level_info(f"[yt-dlp] {line_stripped}")
+# Default number of threads downloading thumbnails, and of connections kept open to each image host.
+THUMBNAIL_WORKERS = 10
+THUMBNAIL_CONNECTIONS_PER_HOST = 10
+
+# Number of leading entries fetched to check a playlist against its saved snapshot.
+# Only these entries and the video count are compared, so a reorder or a swap further down that keeps the
+# count goes unnoticed until the snapshot is older than playlist_snapshot_hours, or the run uses --refresh.
+PLAYLIST_PROBE_SIZE = 5
+
+class BufferedLog:
+    """Collects log messages from a worker thread so they can be replayed later in a fixed order."""
+    def __init__(self):
+        self.records = []
 
-def process_playlist_with_yt_dlp(playlist_urls, single_video_ids, video_folder, preferred_resolution, ffmpeg_location, download_videos_flag, archive_file, cookies_file):
+    def info(self, message):
+        self.records.append((logging.INFO, message))
+
+    def warning(self, message):
+        self.records.append((logging.WARNING, message))
+
+    def critical(self, message):
+        self.records.append((logging.CRITICAL, message))
+
+    def flush(self):
+        for level, message in self.records:
+            logging.log(level, message)
+        self.records.clear()
+
+def log_ytdlp_line(line, log=logging):
+    """Forwards a line of yt-dlp's stderr to the log, as a warning if yt-dlp marked it as one."""
+    line_stripped = line.strip()
+    if line_stripped:
+        if line_stripped.lower().startswith(('warning:', 'error:')):
+            log.warning(f"[yt-dlp] {line_stripped}")
+        else:
+            log.info(f"[yt-dlp] {line_stripped}")
+
+def process_playlist_with_yt_dlp(playlist_urls, single_video_ids, video_folder, preferred_resolution, ffmpeg_location, download_videos_flag, archive_file, cookies_file, metadata_workers=1, download_workers=1, engine_mode='subprocess', metadata_store=None, scan_workers=1, on_video=None, limiter=None, max_retries=0, shared=None, progress_interval=0, scheduler=None, journal=None):
     """
     Uses yt-dlp to fetch video information from playlists and single videos, optionally downloading them.
+    When a metadata store is given, only videos that are new or stale are sent to yt-dlp, and
+    playlists that are unchanged since their last scan are read from their saved snapshot.
+    on_video, if given, is called once for every video in the result as soon as its metadata is known.
+    limiter and max_retries are passed on to run_video_jobs.
+    shared is the batch's SharedResources. Videos and playlists an earlier ledger of the batch already
+    fetched are taken from it instead of asking yt-dlp again.
+    When downloading, the combined progress of all downloads is logged every progress_interval seconds (0 = never),
+    and scheduler, a DownloadScheduler, if given, decides when each download and merge may run.
+    journal, a RunJournal, records every video as it is done. Videos an interrupted earlier run already finished
+    are taken from it, and if that run had finished fetching, its videos are returned without scanning at all,
+    unless some of their downloaded files have gone missing.
     """
-    all_found_ids = set() # Use a set to automatically handle duplicates
+    if journal and journal.fetched_ids is not None and download_videos_flag and journal.lost_downloads:
+        logging.info(f"  -> {len(journal.lost_downloads)} video(s) of the interrupted run are missing their downloaded file. Fetching them again.")
+    elif journal and journal.fetched_ids is not None:
+        logging.info("  -> The interrupted run had already fetched every video. Going straight to the reports.")
+        video_metadata_list = [journal.videos[video_id] for video_id in sorted(journal.fetched_ids) if video_id in journal.videos]
+        for video_data in video_metadata_list:
+            if shared:
+                shared.videos[video_data.id] = video_data
+            if on_video:
+                on_video(video_data)
+        return video_metadata_list
 
-    if playlist_urls:
-        logging.info(f"Scanning {len(playlist_urls)} playlist(s) to get a list of all available video IDs...")
-        for playlist_url in playlist_urls:
-            logging.info(f"  -> Scanning playlist: {playlist_url}")
-            try:
-                command = [
-                    'yt-dlp', '--ignore-config', '--no-warnings',
-                    '--ignore-errors', '--flat-playlist', '--print', '%(id)s', playlist_url
-                ]
-
-                # --- ADD COOKIES TO PLAYLIST SCAN ---
-                if cookies_file and cookies_file.exists():
-                    logging.info(f"  -> Using cookies from: {cookies_file}")
-                    command += ['--cookies', str(cookies_file)]
+    video_ids = [] # Every unique ID, in the order it arrived
+    cached = {}
+    reused = {}
+    resumed = {}
+    failed_ids = []
+    failed_scans = []
+    fetch_count = 0
 
-                process = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', check=True)
-                
-                playlist_specific_ids = {line for line in process.stdout.splitlines() if line.strip()}
-                if not playlist_specific_ids:
-                    logging.warning(f"  -> Playlist {playlist_url} is empty or contains no available videos.")
-                    continue
-                
-                logging.info(f"  -> Found {len(playlist_specific_ids)} videos in this playlist.")
-                all_found_ids.update(playlist_specific_ids)
-
-            except FileNotFoundError:
-                logging.critical("'yt-dlp' command not found. Please ensure yt-dlp is installed and in your system's PATH.")
-                return None
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Could not scan playlist {playlist_url}. It may be private or invalid. Skipping. Error: {e.stderr}")
+    def iter_ids_to_fetch():
+        # Deduplicates the incoming IDs and filters out the ones the metadata cache can serve.
+        nonlocal fetch_count
+        seen = set()
+        for video_id in iter_source_video_ids(playlist_urls, single_video_ids, cookies_file, scan_workers, metadata_store, shared, failed_scans):
+            if video_id in seen:
                 continue
-    
-    if single_video_ids:
-        logging.info(f"Adding {len(single_video_ids)} individual video ID(s) to the processing queue.")
-        all_found_ids.update(single_video_ids)
+            seen.add(video_id)
+            video_ids.append(video_id)
+            shared_video = reusable_shared_video(shared.videos.get(video_id), video_folder, download_videos_flag) if shared else None
+            if shared_video:
+                reused[video_id] = shared_video
+                instrumentation.count('batch.video_reused')
+                # Not put in this ledger's metadata cache: the shared record only has the start of the description,
+                # and storing it would leave a fresh-looking entry with the text cut short.
+                if on_video:
+                    on_video(shared_video)
+                continue
+            journaled = journal.videos.get(video_id) if journal else None
+            if journaled and not (download_videos_flag and not journaled.downloaded):
+                resumed[video_id] = journaled
+                instrumentation.count('journal.resumed')
+                if shared:
+                    shared.videos[video_id] = journaled
+                if on_video:
+                    on_video(journaled)
+                continue
+            if metadata_store:
+                cache_entry = metadata_store.get_many([video_id]).get(video_id)
+                if cache_entry:
+                    cached[video_id] = cache_entry
+            if needs_fetch(cached.get(video_id), metadata_store, download_videos_flag):
+                if metadata_store:
+                    instrumentation.count('metadata_cache.miss')
+                fetch_count += 1
+                yield video_id
+            else:
+                instrumentation.count('metadata_cache.hit')
+                if shared:
+                    shared.videos[video_id] = cached[video_id][0]
+                if on_video:
+                    on_video(cached[video_id][0])
 
-    video_ids = sorted(list(all_found_ids))
-    total_videos = len(video_ids)
+    def on_fetched(video_data):
+        if metadata_store:
+            metadata_store.put(video_data)
+        # Only the start of the description is used by the reports; the store keeps the rest.
+        video_data.truncate_description()
+        if journal:
+            journal.record_video(video_data)
+        if shared:
+            shared.videos[video_data.id] = video_data
+        if on_video:
+            on_video(video_data)
+
+    def on_failed(video_id, reason):
+        if reason != 'skipped':
+            # Skipped videos (e.g. by the archive file) would only be skipped again.
+            failed_ids.append(video_id)
+        if journal:
+            journal.record_failure(video_id, reason)
+
+    # IDs are streamed into the worker pool while the playlists are still being scanned.
+    # The pool and engine are only set up once the first video actually needs fetching.
+    fetched_list = []
+    id_stream = iter_ids_to_fetch()
+    try:
+        first_id = next(id_stream, None)
+        if first_id is not None:
+            metadata_workers = max(1, metadata_workers)
+            download_workers = max(1, download_workers)
+            if not download_videos_flag:
+                max_workers = metadata_workers
+                logging.info(f"  -> Running metadata-only jobs with up to {max_workers} concurrent worker(s).")
+            elif scheduler:
+                max_workers = scheduler.workers
+                logging.info(f"  -> Running download jobs with up to {scheduler.network_workers} download(s) and {scheduler.merge_workers} merge(s) at once.")
+            else:
+                max_workers = download_workers
+                logging.info(f"  -> Running download jobs with up to {max_workers} concurrent worker(s).")
+
+            if download_videos_flag:
+                video_folder.mkdir(parents=True, exist_ok=True)
 
+            progress = ProgressTracker(progress_interval) if download_videos_flag and progress_interval > 0 else None
+            ytdlp_args = build_ytdlp_args(
+                video_folder, preferred_resolution, ffmpeg_location, download_videos_flag, archive_file, cookies_file,
+                progress=progress is not None, scheduler=scheduler
+            )
+            engine = None
+            if engine_mode == 'inprocess':
+                engine = create_inprocess_engine(ytdlp_args)
+                if engine:
+                    logging.info("  -> Using the in-process yt-dlp engine.")
+
+            try:
+                fetched_list = run_video_jobs(
+                    itertools.chain([first_id], id_stream), ytdlp_args, download_videos_flag, archive_file, cookies_file,
+                    max_workers, engine, on_video=on_fetched, limiter=limiter, max_retries=max_retries, progress=progress,
+                    scheduler=scheduler, on_failed=on_failed
+                )
+            finally:
+                if engine:
+                    engine.close()
+    except FileNotFoundError:
+        logging.critical("'yt-dlp' command not found. Please ensure yt-dlp is installed and in your system's PATH.")
+        return None
+
+    total_videos = len(video_ids)
     if total_videos == 0:
         logging.warning("No unique videos were found from the provided playlists or single IDs. Nothing to do.")
         return []
-        
-    logging.info(f"\n--> Found {total_videos} unique videos across all sources. They will now be processed individually.")
 
+    logging.info(f"\n--> Found {total_videos} unique videos across all sources.")
+    if reused:
+        logging.info(f"  -> {len(reused)} video(s) were already fetched for an earlier ledger in this batch.")
+    if resumed:
+        logging.info(f"  -> {len(resumed)} video(s) were already done by the interrupted run.")
+    if metadata_store:
+        logging.info(f"  -> {total_videos - len(reused) - len(resumed) - fetch_count} video(s) were up to date in the metadata cache. {fetch_count} were fetched.")
+
+    # Merge fresh results with cached entries so the report still covers every video.
+    # A stale entry is only used when the refresh failed or yt-dlp skipped the video.
+    fetched = {video_data.id: video_data for video_data in fetched_list}
     video_metadata_list = []
-    for i, video_id in enumerate(video_ids, 1):
-        video_url = f"https://www.youtube.com/watch?v={video_id}"
-        logging.info(f"\n--- PROCESSING VIDEO {i} of {total_videos}: {video_url} ---")
+    for video_id in sorted(video_ids):
+        if video_id in fetched:
+            video_metadata_list.append(fetched.pop(video_id))
+        elif video_id in reused:
+            video_metadata_list.append(reused[video_id])
+        elif video_id in resumed:
+            video_metadata_list.append(resumed[video_id])
+        elif video_id in cached:
+            video_metadata_list.append(cached[video_id][0])
+            if on_video and needs_fetch(cached[video_id], metadata_store, download_videos_flag):
+                on_video(cached[video_id][0])
+    video_metadata_list.extend(fetched.values())
 
-        output_template = video_folder / '%(title)s [%(id)s].%(ext)s'
-        command = [
-            'yt-dlp', '--ignore-config', '--print-json', '--ignore-errors',
-        ]
+    if journal and not failed_ids and not failed_scans:
+        # Nothing is left to retry, so a restart can go straight to the reports.
+        journal.record_fetched(video_metadata_list)
 
-        if archive_file:
-            logging.info(f"  -> Archive functionality is ON. Using file: {archive_file}")
-            command += ['--download-archive', str(archive_file)]
-        else:
-            logging.info("  -> Archive functionality is OFF. All videos will be processed.")
-
-        # --- ADD COOKIES TO MAIN DOWNLOAD/METADATA COMMAND ---
-        if cookies_file and cookies_file.exists():
-            logging.info(f"  -> Using cookies from: {cookies_file}")
-            command += ['--cookies', str(cookies_file)]
-
-        if download_videos_flag:
-            video_folder.mkdir(parents=True, exist_ok=True)
-            command += [
-                '-o', str(output_template),
-                '-f', f'bestvideo[ext=mp4][height<={preferred_resolution}]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                '--merge-output-format', 'mp4',
-                '--write-info-json', '--write-sub', '--write-auto-sub', '--sub-format', 'srt'
-            ]
-            if ffmpeg_location:
-                command += ['--ffmpeg-location', ffmpeg_location]
-
-        command.append(video_url)
+    logging.info(f"\n--> Finished processing all available videos. Total collected: {len(video_metadata_list)}.")
+    return video_metadata_list
 
-        try:
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
-            stderr_thread = threading.Thread(target=stream_handler, args=(process.stderr, logging.info, logging.warning))
-            stderr_thread.start()
+def iter_source_video_ids(playlist_urls, single_video_ids, cookies_file, scan_workers, metadata_store=None, shared=None, failed_scans=None):
+    """
+    Yields the single video IDs, then every playlist's IDs as the concurrent scans produce them. May repeat IDs.
+    Playlists already scanned for an earlier ledger of the batch are replayed from shared instead.
+    Playlists whose scan failed part way are added to failed_scans, if given.
+    """
+    if single_video_ids:
+        logging.info(f"Adding {len(single_video_ids)} individual video ID(s) to the processing queue.")
+        yield from sorted(single_video_ids)
 
-            stdout_lines = []
-            with process.stdout:
-                for line in iter(process.stdout.readline, ''):
-                    stdout_lines.append(line)
+    if shared:
+        for playlist_url in playlist_urls:
+            if playlist_url in shared.playlists:
+                logging.info(f"  -> Playlist {playlist_url} was already scanned for an earlier ledger in this batch.")
+                instrumentation.count('batch.playlist_reused')
+                yield from shared.playlists[playlist_url]
+        playlist_urls = [playlist_url for playlist_url in playlist_urls if playlist_url not in shared.playlists]
 
-            stderr_thread.join()
-            process.wait()
+    if not playlist_urls:
+        return
 
-            if not stdout_lines:
-                logging.warning(f"  -> FAILED to get metadata for video {video_id}. It may have been skipped by the archive file. Skipping.")
-                continue
+    scan_workers = max(1, min(scan_workers, len(playlist_urls)))
+    logging.info(f"Scanning {len(playlist_urls)} playlist(s) to get a list of all available video IDs ({scan_workers} at a time)...")
+    id_queue = queue.Queue()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=scan_workers) as executor:
+        futures = [executor.submit(scan_playlist_timed, playlist_url, cookies_file, id_queue, metadata_store) for playlist_url in playlist_urls]
+        for future in futures:
+            future.add_done_callback(lambda _: id_queue.put(None))
 
-            video_info = json.loads(stdout_lines[-1])
-            video_title = video_info.get('title', 'N/A')
-            channel_name = video_info.get('channel', 'N/A')
-            upload_date_raw = video_info.get('upload_date')
-            upload_date = datetime.strptime(upload_date_raw, '%Y%m%d').strftime('%Y-%m-%d') if upload_date_raw else "N/A"
-            video_path = Path(video_info.get('_filename', "Not Downloaded"))
-
-            video_metadata_list.append({
-                'id': video_info.get('id'),
-                'title': video_title,
-                'channel': channel_name,
-                'thumbnail_url': video_info.get('thumbnail'),
-                'upload_date': upload_date,
-                'video_path': video_path,
-                'description': video_info.get('description', 'N/A')
-            })
-
-            logging.info(f"  -> Successfully retrieved metadata for '{video_title}'.")
-
-            if download_videos_flag and video_path.name != "Not Downloaded":
-                clean_metadata = {
-                    "video_title": video_title,
-                    "channel_name": channel_name,
-                    "youtube_url": video_info.get("webpage_url"),
-                    "original_upload_date": upload_date,
-                    "thumbnail_url": video_info.get('thumbnail'),
-                    "local_file_path": video_path.as_posix(),
-                    "description": video_info.get('description', 'N/A')
-                }
-                meta_filepath = video_path.with_suffix('.meta.json')
-                with open(meta_filepath, 'w', encoding='utf-8') as f:
-                    json.dump(clean_metadata, f, indent=4, ensure_ascii=False)
+        finished_scans = 0
+        while finished_scans < len(futures):
+            video_id = id_queue.get()
+            if video_id is None:
+                finished_scans += 1
+            else:
+                yield video_id
 
-        except Exception as e:
-            logging.critical(f"A critical error occurred while processing video {video_id}. Skipping. Error: {e}")
-            continue
+        for playlist_url, future in zip(playlist_urls, futures):
+            playlist_ids = future.result() # Re-raises FileNotFoundError if yt-dlp is missing
+            if playlist_ids is None and failed_scans is not None:
+                failed_scans.append(playlist_url)
+            if shared and playlist_ids is not None:
+                shared.playlists[playlist_url] = playlist_ids
+
+def build_scan_command(playlist_url, cookies_file, print_args):
+    command = [
+        'yt-dlp', '--ignore-config', '--no-warnings',
+        '--ignore-errors', '--flat-playlist'
+    ] + print_args
+
+    # --- ADD COOKIES TO PLAYLIST SCAN ---
+    if cookies_file and cookies_file.exists():
+        command += ['--cookies', str(cookies_file)]
+
+    command.append(playlist_url)
+    return command
+
+def playlist_matches_snapshot(playlist_url, cookies_file, snapshot):
+    """
+    Cheaply checks a playlist against its last snapshot by fetching only its first few entries.
+    The playlist counts as unchanged when the reported video count and the leading IDs both match.
+    Changes past the first PLAYLIST_PROBE_SIZE entries that keep the count are not seen; the snapshot's
+    age limit (MetadataStore snapshot_hours) bounds how long such a playlist is served stale.
+    """
+    snapshot_ids, snapshot_count = snapshot
+    probe_size = min(PLAYLIST_PROBE_SIZE, snapshot_count)
+    if probe_size == 0:
+        return False
+
+    command = build_scan_command(playlist_url, cookies_file, ['--playlist-items', f'1:{probe_size}', '--print', '%(playlist_count)s %(id)s'])
+    instrumentation.count('subprocesses.ytdlp_probe')
+    process = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
+    if process.returncode != 0:
+        return False
+
+    entries = [line.split() for line in process.stdout.splitlines() if line.strip()]
+    reported_counts = {entry[0] for entry in entries}
+    probe_ids = [entry[-1] for entry in entries]
+    return reported_counts == {str(snapshot_count)} and probe_ids == snapshot_ids[:probe_size]
+
+def scan_playlist(playlist_url, cookies_file, id_queue, metadata_store=None):
+    """
+    Lists the video IDs of one playlist, putting each on id_queue as soon as yt-dlp prints it.
+    If the playlist is unchanged since its last saved snapshot, the snapshot is used instead of a full scan.
+    Returns the playlist's IDs, or None if the scan failed part way.
+    """
+    logging.info(f"  -> Scanning playlist: {playlist_url}")
+    if cookies_file and cookies_file.exists():
+        logging.info(f"  -> Using cookies from: {cookies_file}")
+
+    snapshot = metadata_store.get_playlist_snapshot(playlist_url) if metadata_store else None
+    if snapshot and playlist_matches_snapshot(playlist_url, cookies_file, snapshot):
+        logging.info(f"  -> Playlist {playlist_url} is unchanged since the last scan ({snapshot[1]} videos). Using the saved snapshot.")
+        instrumentation.count('playlist_snapshot.hit')
+        for video_id in snapshot[0]:
+            id_queue.put(video_id)
+        return snapshot[0]
+    if metadata_store:
+        instrumentation.count('playlist_snapshot.miss')
+
+    command = build_scan_command(playlist_url, cookies_file, ['--print', '%(id)s'])
+    instrumentation.count('subprocesses.ytdlp_scan')
+    stderr_lines = []
+    playlist_ids = []
+
+    def on_video_id(line):
+        video_id = line.strip()
+        if video_id:
+            playlist_ids.append(video_id)
+            id_queue.put(video_id)
+
+    returncode = pipe_reader().run(command, on_video_id, lambda line: stderr_lines.append(line + '\n'))
+
+    if returncode != 0:
+        logging.error(f"Could not fully scan playlist {playlist_url}. It may be private or invalid. {len(playlist_ids)} video(s) found before the error will still be processed. Error: {''.join(stderr_lines)}")
+        return None
+
+    if not playlist_ids:
+        logging.warning(f"  -> Playlist {playlist_url} is empty or contains no available videos.")
+        return playlist_ids
+
+    if snapshot:
+        new_count = len(set(playlist_ids) - set(snapshot[0]))
+        logging.info(f"  -> Found {len(playlist_ids)} videos in playlist {playlist_url}, {new_count} of them new since the last scan.")
+    else:
+        logging.info(f"  -> Found {len(playlist_ids)} videos in playlist {playlist_url}.")
+
+    if metadata_store:
+        metadata_store.save_playlist_snapshot(playlist_url, playlist_ids)
+    return playlist_ids
+
+def scan_playlist_timed(playlist_url, cookies_file, id_queue, metadata_store=None):
+    with instrumentation.span('playlist_scan', playlist=playlist_url):
+        return scan_playlist(playlist_url, cookies_file, id_queue, metadata_store)
+
+def reusable_shared_video(video_data, video_folder, download_videos_flag):
+    """
+    Returns the record an earlier ledger of a batch fetched, as this ledger can use it, or None if the video has
+    to go through yt-dlp for this ledger. A video downloaded into another ledger's folder isn't this ledger's
+    download: it is fetched again when this ledger downloads, and otherwise only its metadata is used.
+    """
+    if video_data is None:
+        return None
+    if video_data.downloaded and not Path(video_data.video_path).resolve().is_relative_to(Path(video_folder).resolve()):
+        return None if download_videos_flag else video_data.replace(video_path=None)
+    if download_videos_flag and not video_data.downloaded:
+        return None
+    return video_data
+
+def needs_fetch(cache_entry, metadata_store, download_videos_flag):
+    """Decides whether a video has to go through yt-dlp or can be served from the metadata cache."""
+    if cache_entry is None:
+        return True
+    video_data, fetched_at = cache_entry
+    if not metadata_store.is_fresh(fetched_at):
+        return True
+    # A cached metadata-only entry doesn't count once downloads are switched on, and neither does one
+    # whose file is gone (e.g. the download failed after yt-dlp printed the info line).
+    return download_videos_flag and not (video_data.downloaded and os.path.exists(video_data.video_path))
+
+def run_video_jobs(video_ids, ytdlp_args, download_videos_flag, archive_file, cookies_file, max_workers, engine=None, on_video=None, limiter=None, max_retries=0, progress=None, scheduler=None, on_failed=None):
+    """
+    Processes video IDs in a thread pool and returns the collected metadata in input order.
+    video_ids may be a lazy iterator; jobs are submitted as IDs arrive.
+    on_video, if given, is called from this thread with each video's metadata as it is collected.
+
+    yt-dlp calls go through limiter (an AdaptiveLimiter), which lowers the number running at once when
+    YouTube starts throttling. Videos that failed because of throttling or a network error are put in a
+    retry queue and tried again after a backoff delay, up to max_retries times.
+    progress, a ProgressTracker, gets the download progress of every worker and logs it as one line.
+    scheduler, a DownloadScheduler, holds each download back until it has a download slot and enough disk space.
+    on_failed, if given, is called with the video ID and the reason ('throttled', 'failed' or 'skipped')
+    for each video that ends without metadata.
+    """
+    total_videos = len(video_ids) if hasattr(video_ids, '__len__') else None
+    limiter = limiter or AdaptiveLimiter('ytdlp', max_workers)
+    retries = RetryQueue(limiter, max_retries)
+
+    # With a single worker, log straight through so progress appears live.
+    # Otherwise each worker buffers its log lines and they are replayed in
+    # video order, keeping the log identical between runs.
+    def make_log():
+        return logging if max_workers == 1 else BufferedLog()
+
+    def fetch(video_id, index, log):
+        watcher = YtdlpOutcome(log)
+        with limiter.slot() as slot, (scheduler.download(video_id) if scheduler else contextlib.nullcontext()) as download:
+            if scheduler and download is None:
+                return None, slot.outcome
+            video_data = fetch_video_metadata(
+                video_id, index, total_videos, ytdlp_args, download_videos_flag, archive_file, cookies_file, watcher, engine, progress,
+                on_merge=download.merging if download else None
+            )
+            if video_data is None:
+                slot.outcome = watcher.outcome
+        return video_data, slot.outcome
+
+    video_metadata_list = []
+    pending = collections.deque()
+
+    def collect(future, log, video_id, index, attempt):
+        video_data, outcome = future.result()
+        if isinstance(log, BufferedLog):
+            log.flush()
+        if video_data:
+            video_metadata_list.append(video_data)
+            if on_video:
+                on_video(video_data)
+        elif outcome != OK:
+            if retries.add((video_id, index), attempt):
+                logging.warning(f"  -> Video {video_id} failed ({outcome}). It will be retried later.")
+                return
+            if max_retries:
+                logging.warning(f"  -> Giving up on video {video_id} after {attempt + 1} attempts.")
+            if on_failed:
+                on_failed(video_id, outcome)
+        elif on_failed:
+            on_failed(video_id, 'skipped')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(video_id, index, attempt=0):
+            log = make_log()
+            pending.append((executor.submit(fetch, video_id, index, log), log, video_id, index, attempt))
+
+        def submit_due_retries():
+            for (video_id, index), attempt in retries.pop_due():
+                submit(video_id, index, attempt)
+
+        for i, video_id in enumerate(video_ids, 1):
+            submit(video_id, i)
+            submit_due_retries()
+            # Collect whatever has already finished in order, without waiting on the rest.
+            while pending and pending[0][0].done():
+                collect(*pending.popleft())
+
+        while pending or len(retries):
+            if pending:
+                concurrent.futures.wait([pending[0][0]], timeout=retries.next_due_in())
+                while pending and pending[0][0].done():
+                    collect(*pending.popleft())
+            else:
+                time.sleep(retries.next_due_in())
+            submit_due_retries()
 
-    logging.info(f"\n--> Finished processing all available videos. Total collected: {len(video_metadata_list)}.")
     return video_metadata_list
 
-def download_thumbnail(video_data, thumbs_folder, session):
-    """Downloads a single thumbnail for a given video."""
-    video_id = video_data.get('id')
-    video_title = video_data.get('title', 'N/A')
-    thumbnail_url = video_data.get('thumbnail_url')
+def build_ytdlp_args(video_folder, preferred_resolution, ffmpeg_location, download_videos_flag, archive_file, cookies_file, progress=False, scheduler=None):
+    """
+    Builds the yt-dlp arguments shared by every per-video call. The video URL is appended by the caller.
+    With progress on, downloads report their progress on stdout in the form subprocess_io.parse_progress_line reads.
+    A DownloadScheduler adds the arguments it needs to follow each download.
+    """
+    output_template = video_folder / '%(title)s [%(id)s].%(ext)s'
+    args = ['--ignore-config', '--print-json', '--ignore-errors']
+
+    if archive_file:
+        args += ['--download-archive', str(archive_file)]
 
-    if not thumbnail_url:
-        return video_id, None
+    # --- ADD COOKIES TO MAIN DOWNLOAD/METADATA COMMAND ---
+    if cookies_file and cookies_file.exists():
+        args += ['--cookies', str(cookies_file)]
+
+    if download_videos_flag:
+        args += [
+            '-o', str(output_template),
+            '-f', f'bestvideo[ext=mp4][height<={preferred_resolution}]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+            '--merge-output-format', 'mp4',
+            '--write-info-json', '--write-sub', '--write-auto-sub', '--sub-format', 'srt'
+        ]
+        if ffmpeg_location:
+            args += ['--ffmpeg-location', ffmpeg_location]
+        if progress:
+            # --print-json silences progress; ask for it back, at most once a second per download.
+            args += ['--progress', '--newline', '--progress-delta', '1', '--progress-template', f'download:{PROGRESS_TEMPLATE}']
+        if scheduler:
+            args += scheduler.ytdlp_args()
+
+    return args
+
+def run_ytdlp_subprocess(command, log=logging, on_progress=None, on_merge=None):
+    """
+    Runs a yt-dlp command, forwarding stderr to the log, and returns its stdout lines.
+    Progress lines are passed to on_progress as ProgressEvents instead of being returned.
+    on_merge is called when the download is done, and yt-dlp waits for it to return before merging
+    (see MergeGate). Without named pipes it is called as on_merge(wait=False) and the merge doesn't wait.
+    """
+    instrumentation.count('subprocesses.ytdlp')
+    stdout_lines = []
+    gate = open_merge_gate(on_merge) if on_merge else None
+    if gate:
+        command = command[:-1] + gate.ytdlp_args() + command[-1:]
+
+    def on_stdout_line(line):
+        if line.startswith(MERGE_MARKER):
+            if gate:
+                gate.merge_requested()
+            elif on_merge:
+                on_merge(wait=False)
+            return
+        event = parse_progress_line(line)
+        if event is None:
+            stdout_lines.append(line)
+        elif on_progress:
+            on_progress(event)
+
+    try:
+        pipe_reader().run(command, on_stdout_line, lambda line: log_ytdlp_line(line, log))
+    finally:
+        if gate:
+            gate.close()
+    return stdout_lines
+
+def fetch_video_metadata(video_id, index, total_videos, ytdlp_args, download_videos_flag, archive_file, cookies_file, log=logging, engine=None, progress=None, on_merge=None):
+    """
+    Runs yt-dlp for a single video and returns its VideoRecord, or None if it failed or was skipped.
+    The record still has the full description; the caller truncates it once it has been stored.
+    Uses the in-process engine when one is given, otherwise spawns a yt-dlp subprocess.
+    Download progress goes to progress, a ProgressTracker, if given, and on_merge is called when the merge starts.
+    """
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    position = f"{index} of {total_videos}" if total_videos else f"{index}"
+    log.info(f"\n--- PROCESSING VIDEO {position}: {video_url} ---")
+
+    if archive_file:
+        log.info(f"  -> Archive functionality is ON. Using file: {archive_file}")
+    else:
+        log.info("  -> Archive functionality is OFF. All videos will be processed.")
+
+    if cookies_file and cookies_file.exists():
+        log.info(f"  -> Using cookies from: {cookies_file}")
+
+    try:
+        on_progress = progress.update if progress else None
+        with instrumentation.span('ytdlp', video_id=video_id):
+            try:
+                if engine:
+                    stdout_lines = engine.run(video_url, log, on_progress, on_merge)
+                else:
+                    stdout_lines = run_ytdlp_subprocess(['yt-dlp'] + ytdlp_args + [video_url], log, on_progress, on_merge)
+            finally:
+                if progress:
+                    progress.finish(video_id)
+        instrumentation.count('bytes.ytdlp_output', sum(len(line.encode('utf-8')) for line in stdout_lines))
+
+        if not stdout_lines:
+            log.warning(f"  -> FAILED to get metadata for video {video_id}. It may have been skipped by the archive file. Skipping.")
+            return None
+
+        video_info = parse_info_line(stdout_lines[-1])
+        video_data = VideoRecord.from_ytdlp(video_info)
+
+        log.info(f"  -> Successfully retrieved metadata for '{video_data.title}'.")
+
+        if download_videos_flag and video_data.downloaded:
+            video_path = Path(video_data.video_path)
+            clean_metadata = {
+                "video_title": video_data.title,
+                "channel_name": video_data.channel,
+                "youtube_url": video_info.get("webpage_url"),
+                "original_upload_date": video_data.upload_date,
+                "thumbnail_url": video_data.thumbnail_url,
+                "local_file_path": video_path.as_posix(),
+                "description": video_data.description
+            }
+            meta_filepath = video_path.with_suffix('.meta.json')
+            with open(meta_filepath, 'w', encoding='utf-8') as f:
+                json.dump(clean_metadata, f, indent=4, ensure_ascii=False)
+            if video_path.exists():
+                instrumentation.count('bytes.videos', video_path.stat().st_size)
+
+        return video_data
 
-    safe_title = sanitize_filename(video_title)
-    local_thumb_path = thumbs_folder / f"{safe_title} [{video_id}].jpg"
+    except Exception as e:
+        log.critical(f"A critical error occurred while processing video {video_id}. Skipping. Error: {e}")
+        return None
 
-    if local_thumb_path.exists():
-        return video_id, local_thumb_path
+def download_thumbnail(video_data, thumb_cache, session, limiter=None):
+    """
+    Fetches a single thumbnail for a given video through the thumbnail cache.
+    Returns (video_id, path or None, outcome), where the outcome tells whether a failure is worth retrying.
+    """
+    video_id = video_data.id
+    thumbnail_url = video_data.thumbnail_url
 
+    if not thumbnail_url:
+        return video_id, None, OK
+
+    ticket = limiter.acquire() if limiter else None
+    outcome = OK
     try:
-        res = session.get(thumbnail_url, timeout=15)
-        res.raise_for_status()
-        with open(local_thumb_path, 'wb') as f:
-            f.write(res.content)
-        return video_id, local_thumb_path
-    except requests.exceptions.RequestException as e:
+        with instrumentation.span('thumbnail', video_id=video_id):
+            return video_id, thumb_cache.fetch(video_id, thumbnail_url, session), OK
+    except OSError as e:
+        # requests' exceptions are OSErrors too.
+        outcome = classify_http_error(e)
         logging.warning(f"  > Could not download thumbnail for {video_id}. Error: {e}")
-        return video_id, None
+        return video_id, None, outcome
+    finally:
+        if limiter:
+            limiter.release(ticket, outcome)
 
-def download_all_thumbnails_parallel(video_list, thumbs_folder):
+def download_all_thumbnails_parallel(video_list, thumbs_folder, thumb_cache=None, limiter=None, max_workers=THUMBNAIL_WORKERS, connections_per_host=THUMBNAIL_CONNECTIONS_PER_HOST):
     """Downloads all thumbnails in parallel using a thread pool."""
     logging.info("\nDownloading thumbnails...")
     thumbs_folder.mkdir(exist_ok=True)
@@ -222,176 +693,647 @@ def download_all_thumbnails_parallel(video_list, thumbs_folder):
         logging.info("No videos processed, skipping thumbnail download.")
         return thumb_map
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        with requests.Session() as session:
+    thumb_cache = thumb_cache or ThumbnailCache(thumbs_folder)
+    limiter = limiter or AdaptiveLimiter('thumbnails', max_workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with create_session(connections_per_host) as session:
             future_to_video = {
-                executor.submit(download_thumbnail, video_data, thumbs_folder, session): video_data
+                executor.submit(download_thumbnail, video_data, thumb_cache, session, limiter): video_data
                 for video_data in video_list
             }
             processed_thumbs = 0
             for future in concurrent.futures.as_completed(future_to_video):
                 processed_thumbs += 1
-                video_id, thumb_path = future.result()
+                video_id, thumb_path, _ = future.result()
                 if thumb_path:
                     thumb_map[video_id] = thumb_path
                 sys.stdout.write(f"\r  -> Processed {processed_thumbs}/{len(video_list)} thumbnails...")
                 sys.stdout.flush()
 
     sys.stdout.write("\n")
+    thumb_cache.save()
     logging.info("Thumbnail download stage complete.")
     return thumb_map
 
-def create_spreadsheet(video_list, thumb_map, output_filename):
-    """Creates an Excel spreadsheet report."""
-    if not video_list: return
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "YT-Ledger Report"
-    
-    headers = ["Thumbnail", "Video Title", "Channel Name", "Full YouTube URL", "Original Upload Date", "Local File Path"]
-    ws.append(headers)
-
-    ws.column_dimensions['A'].width = 18
-    ws.column_dimensions['B'].width = 60 
-    ws.column_dimensions['C'].width = 30 
-    ws.column_dimensions['D'].width = 50 
-    ws.column_dimensions['E'].width = 20 
-    ws.column_dimensions['F'].width = 70 
-
-    logging.info("\nBuilding the Excel spreadsheet...")
-    for index, video_data in enumerate(video_list, start=2):
-        ws.row_dimensions[index].height = 75
-        video_id = video_data.get('id')
-
-        if video_id in thumb_map:
+class ReportPipeline:
+    """
+    Fetches thumbnails and prepares report rows in the background while metadata is still being collected.
+    Each downloaded thumbnail is handed to the DerivativeBuilder for its report-sized variants.
+
+    submit() is called with each video as soon as its metadata arrives. Once more than max_pending
+    videos are waiting, submit() blocks, which holds back the metadata stage until the thumbnail
+    workers catch up.
+
+    Downloads go through limiter, and thumbnails that failed because of throttling or a network error
+    are retried after a backoff delay, up to max_retries times. Retries don't count towards max_pending.
+
+    Download threads don't wait for the derivatives of their thumbnail; the rows that need them are
+    rendered in finish(), so the threads only ever wait on the network.
+
+    session can be an HTTP session shared with other pipelines, as in batch mode; finish() then leaves it open.
+    journal, a RunJournal, records each thumbnail's result; thumbnails it already has are used without a request.
+    offline uses only the thumbnails already in the cache and never makes a request.
+    """
+    def __init__(self, thumb_cache, derivative_builder, html_base_dir, max_workers=THUMBNAIL_WORKERS, max_pending=200, limiter=None, max_retries=0, connections_per_host=THUMBNAIL_CONNECTIONS_PER_HOST, session=None, journal=None, offline=False):
+        self.thumb_cache = thumb_cache
+        self.journal = journal
+        self.offline = offline
+        self.derivative_builder = derivative_builder
+        self.html_base_dir = html_base_dir
+        self.thumb_map = {}
+        self.html_rows = {}
+        self.submitted = 0
+        self.limiter = limiter or AdaptiveLimiter('thumbnails', max_workers)
+        self.retries = RetryQueue(self.limiter, max_retries)
+        self._rows_waiting = []
+        self._owns_session = session is None
+        self._session = session or LazySession(connections_per_host)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+
+    def submit(self, video_data):
+        self._slots.acquire()
+        self.submitted += 1
+        future = self._submit(video_data, 0)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._submit_due_retries()
+
+    def _submit(self, video_data, attempt):
+        future = self._executor.submit(self._process, video_data, attempt)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda done: self._forget(done, video_data.id))
+        return future
+
+    def _forget(self, future, video_id):
+        with self._futures_lock:
+            self._futures.discard(future)
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            logging.error(f"  > Thumbnail stage failed for video {video_id}. It is missing from the report. Error: {error!r}")
+
+    def _submit_due_retries(self):
+        for video_data, attempt in self.retries.pop_due():
+            self._submit(video_data, attempt)
+
+    def _process(self, video_data, attempt):
+        journaled = self.journal.thumbnail(video_data.id) if self.journal else None
+        if journaled:
+            video_id, thumb_path, outcome = video_data.id, journaled, OK
+            instrumentation.count('journal.thumbnail_resumed')
+        elif self.offline:
+            video_id, thumb_path, outcome = video_data.id, self.thumb_cache.cached(video_data.id), OK
+        else:
+            video_id, thumb_path, outcome = download_thumbnail(video_data, self.thumb_cache, self._session, self.limiter)
+        if thumb_path is None and outcome != OK and self.retries.add(video_data, attempt):
+            return
+        if self.journal and video_data.thumbnail_url:
+            self.journal.record_thumbnail(video_id, thumb_path)
+        if thumb_path:
+            self.thumb_map[video_id] = thumb_path
+            self._rows_waiting.append((video_data, thumb_path, self.derivative_builder.submit(video_id, thumb_path)))
+        else:
+            self.html_rows[video_id] = render_video_row(video_data, None, self.html_base_dir)
+
+    def finish(self):
+        """Waits for all queued work, including retries, and returns the thumbnail map."""
+        while True:
+            with self._futures_lock:
+                outstanding = list(self._futures)
+            concurrent.futures.wait(outstanding)
+            self._submit_due_retries()
+            with self._futures_lock:
+                if self._futures:
+                    continue
+            delay = self.retries.next_due_in()
+            if delay is None:
+                break
+            time.sleep(delay)
+        self._executor.shutdown(wait=True)
+        for video_data, thumb_path, derivatives in self._rows_waiting:
             try:
-                img_pillow = Image.open(thumb_map[video_id])
-                img_pillow.thumbnail((120, 90))
-                png_stream = io.BytesIO()
-                img_pillow.save(png_stream, format='PNG')
-                png_stream.seek(0)
-                ws.add_image(OpenpyxlImage(png_stream), f'A{index}')
+                paths = derivatives.result()
+                self.html_rows[video_data.id] = render_video_row(video_data, paths['html'] if paths else thumb_path, self.html_base_dir)
             except Exception as e:
-                logging.warning(f"  > Warning: Could not process thumbnail for {video_id}. Error: {e}")
+                # One bad row must not stop the other writers or the cache save below.
+                logging.warning(f"  > Could not prepare the report row for {video_data.id} with its thumbnail. It is shown without one. Error: {e}")
+                self.html_rows[video_data.id] = render_video_row(video_data, None, self.html_base_dir)
+        self._rows_waiting.clear()
+        self.derivative_builder.finish()
+        if self._owns_session:
+            self._session.close()
+        self.thumb_cache.save()
+        logging.info(f"Thumbnail download stage complete. {len(self.thumb_map)}/{self.submitted} thumbnails available.")
+        return self.thumb_map
 
-        video_url = f"https://www.youtube.com/watch?v={video_id}"
-        ws[f'B{index}'] = video_data.get('title', 'N/A')
-        ws[f'C{index}'] = video_data.get('channel', 'N/A')
-        
-        cell = ws[f'D{index}']
-        cell.value = video_url
-        cell.hyperlink = video_url
-        cell.style = "Hyperlink"
-        
-        ws[f'E{index}'] = video_data.get('upload_date', 'N/A')
-        
-        video_path = video_data.get('video_path')
-        ws[f'F{index}'] = video_path.as_posix() if video_path.name != "Not Downloaded" else "Not Downloaded"
+class SharedResources:
+    """
+    What the ledgers of one batch run share, so that each config doesn't start from nothing:
 
-    try:
-        wb.save(output_filename)
-        logging.info(f"✅ Success! Spreadsheet saved as '{output_filename}'")
-    except Exception as e:
-        logging.error(f"❌ Error saving Excel file: {e}")
+    - the metadata of every video fetched so far and the IDs of every playlist scanned, so a video or
+      playlist that several ledgers include goes through yt-dlp once,
+    - thumbnails already downloaded into any ledger's folder (see ThumbnailCache),
+    - one HTTP session with its keep-alive connections, one process pool for thumbnail derivatives,
+      and one rate limiter per host, so throttling seen by one ledger slows down the next as well.
 
-def main():
-    """Main function to run the archival script."""
-    project_name = "YT-Ledger v1.0"
+    The pools and limiters are sized by the first ledger that asks for them.
+    """
+    def __init__(self):
+        self.videos = {}
+        self.playlists = {}
+        self.thumbnails = {}
+        self._limiters = {}
+        self._session = None
+        self._derivative_executor = None
+
+    def limiter(self, name, *args):
+        """Returns the batch's AdaptiveLimiter called name, creating it with args the first time."""
+        if name not in self._limiters:
+            self._limiters[name] = AdaptiveLimiter(name, *args)
+        return self._limiters[name]
+
+    def session(self, connections_per_host):
+        if self._session is None:
+            self._session = LazySession(connections_per_host)
+        return self._session
+
+    def derivative_executor(self, max_workers):
+        if self._derivative_executor is None:
+            self._derivative_executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or None)
+        return self._derivative_executor
+
+    def close(self):
+        if self._session:
+            self._session.close()
+        if self._derivative_executor:
+            self._derivative_executor.shutdown(wait=True)
 
+# The files a ledger writes for itself alone. Two ledgers of a batch must not share any of them (see batch_file_suffixes).
+LEDGER_FILE_SETTINGS = (
+    ('outputs', 'output_file_xls'), ('outputs', 'output_file_html'), ('outputs', 'output_file_pdf'),
+    ('cache', 'journal_file'), ('cache', 'ledger_index_db'),
+    ('metrics', 'summary_file'), ('metrics', 'prometheus_file'), ('metrics', 'trace_file'),
+)
+
+def read_config(config_path):
+    """Reads a config file, skipping comment lines so a commented-out line inside a value doesn't become part of it."""
     config = configparser.ConfigParser(interpolation=None)
-    config_path = Path('config.ini')
+    config_lines = Path(config_path).read_text(encoding='utf-8').splitlines()
+    config_string = "\n".join(line for line in config_lines if not line.strip().startswith('#') and not line.strip().startswith(';'))
+    config.read_string(config_string)
+    return config
+
+def path_with_suffix(path, suffix):
+    """The path with '_<suffix>' added to the file name, before the extension."""
+    return path.with_name(f"{path.stem}_{suffix}{path.suffix}")
+
+def run_ledger(config_path, shared=None, from_disk=False, from_index=False, file_suffix=None, refresh=False):
+    """
+    Builds one ledger from its config file. Returns True when the run got as far as the reports.
+    from_disk rebuilds the reports from the sidecar files in video_folder and the cached thumbnails,
+    without yt-dlp or the network (see folder_import). from_index does the same from the ledger index
+    file the last run left behind ([cache] ledger_index_db).
+
+    Relative paths in the config are taken from the config file's folder. shared is the batch's SharedResources,
+    or None for a single run. file_suffix, if given, is added to the name of every file in LEDGER_FILE_SETTINGS,
+    for batch ledgers whose configs would otherwise write the same files.
+    """
+    project_name = "YT-Ledger v1.0"
+    instrumentation.start_run()
+
+    config_path = Path(config_path)
     if not config_path.exists():
-        logging.critical("CRITICAL ERROR: config.ini not found. Please create it from the template.")
-        return
+        logging.critical(f"CRITICAL ERROR: {config_path} not found. Please create it from the template.")
+        return False
+    config_dir = config_path.parent
 
-    try:
-        config_lines = config_path.read_text(encoding='utf-8').splitlines()
-        config_string = "\n".join(line for line in config_lines if not line.strip().startswith('#') and not line.strip().startswith(';'))
-        config.read_string(config_string)
+    def config_file(path_str):
+        path = Path(path_str)
+        return path if path.is_absolute() else config_dir / path
+
+    with instrumentation.stage('config'):
+        try:
+            config = read_config(config_path)
         
-        ids_str = config.get('youtube', 'playlist_id', fallback='')
-        report_title = config.get('youtube', 'report_title', fallback=f"YouTube Archive Report - {datetime.now().strftime('%Y-%m-%d')}")
+            ids_str = config.get('youtube', 'playlist_id', fallback='')
+            report_title = config.get('youtube', 'report_title', fallback=f"YouTube Archive Report - {datetime.now().strftime('%Y-%m-%d')}")
         
-        download_videos_flag = config.getboolean('downloads', 'download_videos')
-        video_folder = Path(config.get('downloads', 'video_folder'))
-        preferred_resolution = config.get('downloads', 'preferred_resolution', fallback='1080')
-        ffmpeg_location = config.get('downloads', 'ffmpeg_location', fallback=None) or None
+            download_videos_flag = config.getboolean('downloads', 'download_videos')
+            video_folder = config_file(config.get('downloads', 'video_folder'))
+            preferred_resolution = config.get('downloads', 'preferred_resolution', fallback='1080')
+            ffmpeg_location = config.get('downloads', 'ffmpeg_location', fallback=None) or None
         
-        archive_file_str = config.get('downloads', 'archive_file', fallback='').strip()
-        archive_file = Path(archive_file_str) if archive_file_str else None
+            archive_file_str = config.get('downloads', 'archive_file', fallback='').strip()
+            archive_file = config_file(archive_file_str) if archive_file_str else None
 
-        # --- READ COOKIES FILE PATH FROM CONFIG ---
-        cookies_file_str = config.get('downloads', 'cookies_file', fallback='').strip()
-        cookies_file = Path(cookies_file_str) if cookies_file_str else None
+            # --- READ COOKIES FILE PATH FROM CONFIG ---
+            cookies_file_str = config.get('downloads', 'cookies_file', fallback='').strip()
+            cookies_file = config_file(cookies_file_str) if cookies_file_str else None
+
+            # --- CONCURRENCY SETTINGS ---
+            metadata_workers = config.getint('performance', 'metadata_workers', fallback=4)
+            download_workers = config.getint('performance', 'download_workers', fallback=2)
+            engine_mode = config.get('performance', 'engine', fallback='subprocess').strip().lower()
+            scan_workers = config.getint('performance', 'scan_workers', fallback=4)
+            pipeline_queue_size = config.getint('performance', 'pipeline_queue_size', fallback=200)
+            thumbnail_workers = max(1, config.getint('performance', 'thumbnail_workers', fallback=THUMBNAIL_WORKERS))
+            thumbnail_connections_per_host = config.getint('performance', 'thumbnail_connections_per_host', fallback=THUMBNAIL_CONNECTIONS_PER_HOST)
+            thumbnail_timeout = config.getfloat('performance', 'thumbnail_timeout_seconds', fallback=15)
+            derivative_workers = config.getint('performance', 'derivative_workers', fallback=0)
+            parallel_reports = config.getboolean('performance', 'parallel_reports', fallback=True)
+            pdf_workers = config.getint('performance', 'pdf_workers', fallback=1)
+            progress_interval = config.getfloat('performance', 'progress_interval_seconds', fallback=10)
+            merge_workers = config.getint('performance', 'merge_workers', fallback=1)
+            download_rate_limit_mb = config.getfloat('downloads', 'download_rate_limit_mb', fallback=0)
+            min_free_disk_gb = config.getfloat('downloads', 'min_free_disk_gb', fallback=1)
+
+            # --- METADATA CACHE SETTINGS ---
+            metadata_db_str = config.get('cache', 'metadata_db', fallback='').strip()
+            metadata_ttl_days = config.getfloat('cache', 'metadata_ttl_days', fallback=7)
+            playlist_snapshot_hours = 0 if refresh else config.getfloat('cache', 'playlist_snapshot_hours', fallback=24)
+            thumb_max_size_mb = config.getfloat('cache', 'thumb_max_size_mb', fallback=0)
+            thumb_max_age_days = config.getfloat('cache', 'thumb_max_age_days', fallback=0)
+            thumb_revalidate_hours = config.getfloat('cache', 'thumb_revalidate_hours', fallback=24)
+            report_cache_db_str = config.get('cache', 'report_cache_db', fallback='').strip()
+            journal_file_str = config.get('cache', 'journal_file', fallback='').strip()
+            ledger_index_db_str = config.get('cache', 'ledger_index_db', fallback='').strip()
+
+            # --- RATE LIMITING AND RETRIES ---
+            max_retries = config.getint('rate_limit', 'max_retries', fallback=3)
+            backoff_seconds = config.getfloat('rate_limit', 'backoff_seconds', fallback=5)
+            max_backoff_seconds = config.getfloat('rate_limit', 'max_backoff_seconds', fallback=300)
+            min_workers = config.getint('rate_limit', 'min_workers', fallback=1)
         
-        output_xls = Path(config.get('outputs', 'output_file_xls'))
-        output_html = Path(config.get('outputs', 'output_file_html'))
-        output_pdf = Path(config.get('outputs', 'output_file_pdf'))
-        thumbs_folder = Path(config.get('outputs', 'thumbs_folder'))
-        template_html = Path(config.get('outputs', 'template_file_html'))
+            output_xls = config_file(config.get('outputs', 'output_file_xls'))
+            output_html = config_file(config.get('outputs', 'output_file_html'))
+            output_pdf = config_file(config.get('outputs', 'output_file_pdf'))
+            thumbs_folder = config_file(config.get('outputs', 'thumbs_folder'))
+            template_html = config_file(config.get('outputs', 'template_file_html'))
+            if not template_html.exists() and (Path(__file__).parent / template_html.name).exists():
+                # Configs kept in their own folder can use the template that ships with the script.
+                template_html = Path(__file__).parent / template_html.name
+            report_formats = parse_report_formats(config.get('outputs', 'report_formats', fallback=', '.join(REPORT_FORMATS)))
+            xlsx_streaming = config.getboolean('outputs', 'xlsx_streaming', fallback=True)
+            xlsx_rows_per_sheet = config.getint('outputs', 'xlsx_rows_per_sheet', fallback=0)
+            xlsx_split_into = config.get('outputs', 'xlsx_split_into', fallback='sheets').strip().lower()
+            html_mode = config.get('outputs', 'html_mode', fallback='single').strip().lower()
+            html_page_size = config.getint('outputs', 'html_page_size', fallback=1000)
+            html_thumbnail_format = config.get('outputs', 'html_thumbnail_format', fallback='jpeg').strip().lower()
+            pdf_thumbnail_dpi = config.getint('outputs', 'pdf_thumbnail_dpi', fallback=150)
+            show_footer_watermark = config.getboolean('outputs', 'show_footer_watermark', fallback=True)
+            report_queries = parse_report_queries(config)
+
+            # --- RUN METRICS ---
+            metrics_summary_file = config.get('metrics', 'summary_file', fallback='').strip()
+            metrics_prometheus_file = config.get('metrics', 'prometheus_file', fallback='').strip()
+            metrics_trace_file = config.get('metrics', 'trace_file', fallback='').strip()
         
-    except Exception as e:
-        logging.critical(f"CRITICAL ERROR reading config.ini: {e}")
-        return
+            metadata_db_str, report_cache_db_str, journal_file_str, ledger_index_db_str, metrics_summary_file, metrics_prometheus_file, metrics_trace_file = (
+                str(config_file(value)) if value else value
+                for value in (metadata_db_str, report_cache_db_str, journal_file_str, ledger_index_db_str, metrics_summary_file, metrics_prometheus_file, metrics_trace_file)
+            )
+            if file_suffix:
+                output_xls, output_html, output_pdf = (path_with_suffix(path, file_suffix) for path in (output_xls, output_html, output_pdf))
+                journal_file_str, ledger_index_db_str, metrics_summary_file, metrics_prometheus_file, metrics_trace_file = (
+                    str(path_with_suffix(Path(value), file_suffix)) if value else value
+                    for value in (journal_file_str, ledger_index_db_str, metrics_summary_file, metrics_prometheus_file, metrics_trace_file)
+                )
+        
+        except Exception as e:
+            logging.critical(f"CRITICAL ERROR reading {config_path}: {e}")
+            return False
 
-    if not ids_str or 'Please paste playlist ID' in ids_str:
-        logging.critical("CRITICAL ERROR: Please set your playlist_id in config.ini")
-        return
+    instrumentation.set_trace(bool(metrics_trace_file))
 
-    all_input_items = [item.strip() for item in ids_str.replace('+', '\n').splitlines() if item.strip()]
-    if not all_input_items:
-        logging.critical("CRITICAL ERROR: playlist_id field in config.ini is empty or contains only whitespace.")
-        return
+    journal = None
+    metadata_store = None
+    ledger_index = None
+    try:
+        if from_index and not ledger_index_db_str:
+            logging.critical(f"CRITICAL ERROR: --from-index needs ledger_index_db to be set under [cache] in {config_path}.")
+            return False
+        if from_index and not Path(ledger_index_db_str).exists():
+            logging.critical(f"CRITICAL ERROR: The ledger index '{ledger_index_db_str}' doesn't exist yet. Run once without --from-index first.")
+            return False
+        if from_disk:
+            logging.info(f"Rebuilding the reports from the files in '{video_folder}'. Nothing is fetched.")
+        elif from_index:
+            logging.info(f"Rebuilding the reports from the ledger index '{ledger_index_db_str}'. Nothing is fetched.")
+        elif not ids_str or 'Please paste playlist ID' in ids_str:
+            logging.critical(f"CRITICAL ERROR: Please set your playlist_id in {config_path}")
+            return False
 
-    playlist_urls = []
-    single_video_ids = set()
-    playlist_prefixes = ('PL', 'FL', 'UU', 'RD')
-    logging.info("Parsing all items from the 'playlist_id' field in config...")
+        all_input_items = [item.strip() for item in ids_str.replace('+', '\n').splitlines() if item.strip()]
+        if not all_input_items and not (from_disk or from_index):
+            logging.critical(f"CRITICAL ERROR: playlist_id field in {config_path} is empty or contains only whitespace.")
+            return False
 
-    for item in all_input_items:
-        if item.startswith('http://') or item.startswith('https://'):
-            try:
-                parsed_url = urlparse(item)
-                hostname = parsed_url.hostname.lower() if parsed_url.hostname else ''
+        playlist_urls = []
+        single_video_ids = set()
+        playlist_prefixes = ('PL', 'FL', 'UU', 'RD')
+        logging.info("Parsing all items from the 'playlist_id' field in config...")
+
+        for item in all_input_items:
+            if item.startswith('http://') or item.startswith('https://'):
+                try:
+                    parsed_url = urlparse(item)
+                    hostname = parsed_url.hostname.lower() if parsed_url.hostname else ''
                 
-                if 'youtube.com' in hostname:
-                    query_params = parse_qs(parsed_url.query)
-                    if 'list' in query_params:
-                        playlist_urls.append(f"https://www.youtube.com/playlist?list={query_params['list'][0]}")
-                    elif 'v' in query_params:
-                        single_video_ids.add(query_params['v'][0])
-                elif 'youtu.be' in hostname:
-                    video_id = parsed_url.path.strip('/')
-                    if video_id: single_video_ids.add(video_id)
-            except Exception: pass
+                    if 'youtube.com' in hostname:
+                        query_params = parse_qs(parsed_url.query)
+                        if 'list' in query_params:
+                            playlist_urls.append(f"https://www.youtube.com/playlist?list={query_params['list'][0]}")
+                        elif 'v' in query_params:
+                            single_video_ids.add(query_params['v'][0])
+                    elif 'youtu.be' in hostname:
+                        video_id = parsed_url.path.strip('/')
+                        if video_id: single_video_ids.add(video_id)
+                except Exception: pass
         
-        elif item.upper().startswith(playlist_prefixes):
-            playlist_urls.append(f"https://www.youtube.com/playlist?list={item}")
+            elif item.upper().startswith(playlist_prefixes):
+                playlist_urls.append(f"https://www.youtube.com/playlist?list={item}")
         
-        elif len(item) == 11 and not item.isspace():
-             single_video_ids.add(item)
+            elif len(item) == 11 and not item.isspace():
+                 single_video_ids.add(item)
     
-    logging.info(f"--> Found {len(playlist_urls)} playlist(s) and {len(single_video_ids)} single video(s) to process.")
+        logging.info(f"--> Found {len(playlist_urls)} playlist(s) and {len(single_video_ids)} single video(s) to process.")
 
-    video_list = process_playlist_with_yt_dlp(
-        playlist_urls, single_video_ids, video_folder, preferred_resolution, 
-        ffmpeg_location, download_videos_flag, archive_file, cookies_file
-    )
+        # A journal left by an interrupted run is only resumed if it was for the same sources and settings.
+        run_key = hashlib.sha1(json.dumps(
+            [sorted(playlist_urls), sorted(single_video_ids), download_videos_flag, str(video_folder), preferred_resolution]
+        ).encode('utf-8')).hexdigest()
+        offline = from_disk or from_index
+        journal = open_run_journal(journal_file_str, run_key) if not offline else None
+        if report_queries or ledger_index_db_str:
+            # The index file can be shared by several configs; each ledger's rows are keyed by its sources.
+            ledger_key = hashlib.sha1(json.dumps([sorted(playlist_urls), sorted(single_video_ids)]).encode('utf-8')).hexdigest()
+            ledger_index = open_ledger_index(ledger_index_db_str, ledger_key)
+            if from_index and (ledger_index is None or not ledger_index.count()):
+                if ledger_index:
+                    logging.critical(
+                        f"CRITICAL ERROR: The ledger index '{ledger_index_db_str}' has no videos for the playlists in {config_path}. "
+                        "Run once without --from-index first."
+                    )
+                return False
+
+        # Thumbnails are fetched and report rows prepared while metadata is still coming in.
+        metadata_store = open_metadata_store(metadata_db_str, metadata_ttl_days, playlist_snapshot_hours) if not offline else None
+        thumb_cache = ThumbnailCache(
+            thumbs_folder, thumb_max_size_mb, thumb_max_age_days, thumb_revalidate_hours, thumbnail_timeout,
+            shared=shared.thumbnails if shared else None
+        )
+        derivative_builder = DerivativeBuilder(
+            thumbs_folder / 'derived', derivative_workers, pdf_thumbnail_dpi, html_thumbnail_format,
+            executor=shared.derivative_executor(derivative_workers) if shared else None
+        )
+        # One limiter per host: throttling on YouTube's pages says nothing about its image servers.
+        make_limiter = shared.limiter if shared else AdaptiveLimiter
+        scheduler = DownloadScheduler(
+            video_folder, download_workers, merge_workers, download_rate_limit_mb * 1024 ** 2, min_free_disk_gb * 1024 ** 3
+        ) if download_videos_flag else None
+        ytdlp_limiter = make_limiter(
+            'ytdlp', scheduler.workers if scheduler else metadata_workers,
+            min_workers, backoff_seconds, max_backoff_seconds
+        )
+        thumbnail_limiter = make_limiter('thumbnails', thumbnail_workers, min_workers, backoff_seconds, max_backoff_seconds)
+        pipeline = ReportPipeline(
+            thumb_cache, derivative_builder, output_html.parent, max_workers=thumbnail_workers, max_pending=pipeline_queue_size,
+            limiter=thumbnail_limiter, max_retries=max_retries, connections_per_host=thumbnail_connections_per_host,
+            session=shared.session(thumbnail_connections_per_host) if shared else None, journal=journal, offline=offline
+        )
+        with instrumentation.stage('fetch'):
+            try:
+                if from_disk:
+                    video_list = load_video_folder(
+                        video_folder, derivative_workers, executor=shared.derivative_executor(derivative_workers) if shared else None,
+                        on_video=pipeline.submit
+                    )
+                elif from_index:
+                    video_list = ledger_index.videos()
+                    logging.info(f"  -> Read {len(video_list)} video(s) from the ledger index.")
+                    for video_data in video_list:
+                        pipeline.submit(video_data)
+                else:
+                    video_list = process_playlist_with_yt_dlp(
+                        playlist_urls, single_video_ids, video_folder, preferred_resolution, 
+                        ffmpeg_location, download_videos_flag, archive_file, cookies_file,
+                        metadata_workers=metadata_workers, download_workers=download_workers,
+                        engine_mode=engine_mode, metadata_store=metadata_store, scan_workers=scan_workers,
+                        on_video=pipeline.submit, limiter=ytdlp_limiter, max_retries=max_retries, shared=shared,
+                        progress_interval=progress_interval, scheduler=scheduler, journal=journal
+                    )
+            finally:
+                thumb_map = pipeline.finish()
     
-    if not video_list:
-        logging.warning("\nHalting script because no video data could be processed.")
-        return
+        if not video_list:
+            logging.warning("\nHalting script because no video data could be processed.")
+            return False
 
-    video_list.sort(key=lambda v: v.get('upload_date', '0000-00-00'), reverse=True)
+        video_list.sort(key=lambda v: v.upload_date, reverse=True)
 
-    thumb_map = download_all_thumbnails_parallel(video_list, thumbs_folder)
-    create_spreadsheet(video_list, thumb_map, output_xls)
-    create_html_report(video_list, thumb_map, report_title, project_name, template_html, output_html)
-    
-    # --- The PDF module now handles its own configuration ---
-    create_pdf_report(video_list, thumb_map, output_pdf, report_title, project_name)
+        if ledger_index and not from_index:
+            with instrumentation.stage('index'):
+                descriptions = metadata_store.get_descriptions(video.id for video in video_list) if metadata_store else None
+                ledger_index.replace(video_list, descriptions)
+
+        report_options = {
+            'output_xls': output_xls,
+            'output_html': output_html,
+            'output_pdf': output_pdf,
+            'pdf_workers': pdf_workers,
+            'report_title': report_title,
+            'project_name': project_name,
+            'template_html': template_html,
+            'html_rows': pipeline.html_rows if 'html' in report_formats and html_mode != 'lazy' else None,
+            'html_mode': html_mode,
+            'html_page_size': html_page_size,
+            'xlsx_streaming': xlsx_streaming,
+            'xlsx_rows_per_sheet': xlsx_rows_per_sheet,
+            'xlsx_split_into': xlsx_split_into,
+            'fragment_cache_db': report_cache_db_str or None,
+            'show_footer_watermark': show_footer_watermark,
+        }
+        with instrumentation.stage('reports'):
+            report_timings = run_reports(report_formats, video_list, thumb_map, derivative_builder.derivatives, report_options, parallel=parallel_reports)
+        if journal:
+            if all(timing['ok'] for timing in report_timings.values()):
+                journal.record_reported()
+            else:
+                logging.info(f"  -> Not every report was built. The next run will go straight to the reports (journal: '{journal.path}').")
+        if report_queries and ledger_index:
+            with instrumentation.stage('subreports'):
+                run_subreports(ledger_index, report_queries, report_formats, thumb_map, derivative_builder.derivatives, report_options, parallel=parallel_reports)
+
+        with instrumentation.stage('cleanup'):
+            thumb_cache.cleanup(keep_ids=thumb_map.keys())
+            derivative_builder.cleanup(thumb_max_age_days)
     
-    logging.info("\n\nAll tasks complete.")
+        logging.info("\n\nAll tasks complete.")
+        return True
+    finally:
+        if journal:
+            journal.close()
+        if metadata_store:
+            metadata_store.close()
+        if ledger_index:
+            ledger_index.close()
+        instrumentation.write_outputs(metrics_summary_file, metrics_prometheus_file, metrics_trace_file)
+
+def run_subreports(ledger_index, report_queries, report_formats, thumb_map, derivatives, options, parallel=True):
+    """
+    Builds the reports once more for each sub-report query, with only the videos the query selects from the
+    ledger index. Thumbnails and prepared rows come from the main run, so nothing is fetched or drawn again.
+    Returns {name: run_reports timings}.
+    """
+    results = {}
+    queries = ledger_index.expand(report_queries)
+    logging.info(f"\nBuilding {len(queries)} sub-report(s)...")
+    for query in queries:
+        try:
+            with instrumentation.span('subreport.query', report=query.name):
+                video_list = ledger_index.videos(query)
+        except sqlite3.OperationalError as e:
+            logging.error(f"❌ Sub-report '{query.name}' has an invalid filter. Error: {e}")
+            continue
+        if not video_list:
+            logging.info(f"  -> Sub-report '{query.name}': no videos match. Skipping.")
+            continue
+        logging.info(f"\n--- Sub-report '{query.name}': {len(video_list)} video(s) ---")
+        sub_options = dict(
+            options,
+            report_title=query.report_title or f"{options['report_title']} - {query.name}",
+            output_xls=path_with_suffix(options['output_xls'], query.name),
+            output_html=path_with_suffix(options['output_html'], query.name),
+            output_pdf=path_with_suffix(options['output_pdf'], query.name),
+        )
+        if options.get('html_rows'):
+            sub_options['html_rows'] = {video.id: options['html_rows'][video.id] for video in video_list if video.id in options['html_rows']}
+        results[query.name] = run_reports(report_formats, video_list, thumb_map, derivatives, sub_options, parallel=parallel)
+    return results
+
+def find_config_files(paths):
+    """
+    Expands the command line's config paths. A folder stands for every .ini file directly inside it.
+    A config given more than once is only built once.
+    """
+    config_paths = []
+    seen = set()
+    for path in map(Path, paths):
+        if path.is_dir():
+            found = sorted(path.glob('*.ini'))
+            if not found:
+                logging.warning(f"No .ini files found in {path}.")
+        else:
+            found = [path]
+        for config_path in found:
+            if config_path.resolve() in seen:
+                logging.warning(f"{config_path} was given more than once. Building it once.")
+                continue
+            seen.add(config_path.resolve())
+            config_paths.append(config_path)
+    return config_paths
+
+def batch_file_suffixes(config_paths):
+    """
+    Finds the configs of a batch that would write the same report, journal, index or metrics file as another
+    (see LEDGER_FILE_SETTINGS), as several configs in one folder do when they keep the default file names.
+    Returns {config_path: suffix} for those configs; run_ledger adds the suffix, the config's name, to each of
+    their files, so no ledger overwrites another's. Configs that can't be read are left to run_ledger to report.
+    """
+    writers = collections.defaultdict(list)
+    for config_path in config_paths:
+        try:
+            config = read_config(config_path)
+        except (OSError, configparser.Error):
+            continue
+        for section, key in LEDGER_FILE_SETTINGS:
+            path_str = config.get(section, key, fallback='').strip()
+            if path_str:
+                path = Path(path_str)
+                path = path if path.is_absolute() else config_path.parent / path
+                writers[path.resolve()].append(config_path)
+
+    clashing = []
+    for path, config_list in writers.items():
+        if len(config_list) > 1:
+            logging.warning(f"{len(config_list)} configs write '{path}'. Their files get the config's name added.")
+            clashing.extend(config_path for config_path in config_list if config_path not in clashing)
+
+    suffixes = {}
+    used = set()
+    for config_path in clashing:
+        suffix = config_path.stem
+        number = 2
+        while suffix in used:
+            # Configs with the same name in different folders.
+            suffix = f"{config_path.stem}_{number}"
+            number += 1
+        used.add(suffix)
+        suffixes[config_path] = suffix
+    return suffixes
+
+def run_batch(config_paths, from_disk=False, from_index=False, refresh=False):
+    """
+    Builds several ledgers one after another in this process, sharing caches, pools and connections
+    between them (see SharedResources). A ledger that fails doesn't stop the rest.
+    from_disk and from_index are passed on to run_ledger.
+    """
+    logging.info(f"Running a batch of {len(config_paths)} ledger(s).")
+    file_suffixes = batch_file_suffixes(config_paths)
+    shared = SharedResources()
+    results = []
+    try:
+        for number, config_path in enumerate(config_paths, 1):
+            logging.info(f"\n===== Ledger {number} of {len(config_paths)}: {config_path} =====")
+            start = time.perf_counter()
+            try:
+                ok = run_ledger(config_path, shared, from_disk, from_index, file_suffixes.get(config_path), refresh)
+            except Exception as e:
+                logging.error(f"❌ Ledger {config_path} failed. Error: {e}")
+                ok = False
+            results.append((config_path, ok, time.perf_counter() - start))
+    finally:
+        shared.close()
+
+    logging.info(f"\n===== Batch summary: {sum(ok for _, ok, _ in results)} of {len(results)} ledger(s) completed =====")
+    for config_path, ok, seconds in results:
+        logging.info(f"  {'✅' if ok else '❌'} {config_path} ({seconds:.1f}s)")
+    logging.info(f"  -> {len(shared.videos)} unique video(s) and {len(shared.thumbnails)} thumbnail(s) shared between ledgers.")
+    return results
+
+def main(argv=None):
+    """Main function to run the archival script."""
+    parser = argparse.ArgumentParser(description="Builds YouTube archive ledgers (XLSX, HTML and PDF reports) from config files.")
+    parser.add_argument(
+        'configs', nargs='*', default=['config.ini'],
+        help="Config files, or folders of .ini files, to build in one run (default: config.ini). "
+             "Relative paths inside each config are taken from its folder."
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        '--from-disk', action='store_true',
+        help="Rebuild the reports from the .meta.json and .info.json files in each config's video_folder "
+             "and the cached thumbnails, without running yt-dlp or using the network."
+    )
+    source.add_argument(
+        '--from-index', action='store_true',
+        help="Rebuild the reports and sub-reports from the ledger index the last run saved (ledger_index_db) "
+             "and the cached thumbnails, without running yt-dlp or using the network."
+    )
+    parser.add_argument(
+        '--refresh', action='store_true',
+        help="Scan every playlist in full instead of trusting the snapshots saved by earlier runs."
+    )
+    args = parser.parse_args(argv)
+
+    config_paths = find_config_files(args.configs)
+    if len(config_paths) == 1:
+        run_ledger(config_paths[0], from_disk=args.from_disk, from_index=args.from_index, refresh=args.refresh)
+    elif config_paths:
+        run_batch(config_paths, args.from_disk, args.from_index, args.refresh)
 
 if __name__ == '__main__':
+    setup_logging()
     main()
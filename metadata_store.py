@@ -0,0 +1,134 @@
+# metadata_store.py
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from video_record import DESCRIPTION_CHARS, NOT_DOWNLOADED, VideoRecord
+
+VIDEO_FIELDS = ('id', 'title', 'channel', 'thumbnail_url', 'upload_date', 'video_path', 'description')
+
+class MetadataStore:
+    """
+    A persistent SQLite cache of the per-video metadata built by process_playlist_with_yt_dlp.
+
+    Entries older than the TTL are considered stale and are fetched again, but they are still
+    returned so a video that yt-dlp skips (e.g. because of the archive file) stays in the report.
+
+    The full description is stored, but records are loaded with only its first DESCRIPTION_CHARS characters,
+    which is all the reports use.
+
+    Playlist snapshots older than snapshot_hours are not returned, so every playlist is scanned in full
+    at least that often (0 = on every run).
+    """
+    def __init__(self, db_path, ttl_days=7, snapshot_hours=24):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = float(ttl_days) * 86400
+        self.snapshot_seconds = float(snapshot_hours) * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    id TEXT PRIMARY KEY,
+                    title TEXT,
+                    channel TEXT,
+                    thumbnail_url TEXT,
+                    upload_date TEXT,
+                    video_path TEXT,
+                    description TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS playlist_snapshots (
+                    playlist_url TEXT PRIMARY KEY,
+                    video_ids TEXT NOT NULL,
+                    video_count INTEGER NOT NULL,
+                    scanned_at REAL NOT NULL
+                )
+            """)
+
+    def get_many(self, video_ids):
+        """Returns {video_id: (VideoRecord, fetched_at)} for every ID that has a stored entry."""
+        found = {}
+        video_ids = list(video_ids)
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(video_ids), 500):
+                batch = video_ids[start:start + 500]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(VIDEO_FIELDS[:-1])}, substr(description, 1, ?), fetched_at FROM videos WHERE id IN ({placeholders})",
+                    [DESCRIPTION_CHARS] + batch
+                ).fetchall()
+                for row in rows:
+                    video_data = VideoRecord(*row[:-1])
+                    found[video_data.id] = (video_data, row[-1])
+        return found
+
+    def get_descriptions(self, video_ids):
+        """Returns {video_id: full description} for every ID that has a stored entry."""
+        found = {}
+        video_ids = list(video_ids)
+        with self._lock:
+            for start in range(0, len(video_ids), 500):
+                batch = video_ids[start:start + 500]
+                placeholders = ",".join("?" for _ in batch)
+                found.update(self._conn.execute(f"SELECT id, description FROM videos WHERE id IN ({placeholders})", batch).fetchall())
+        return found
+
+    def is_fresh(self, fetched_at):
+        return time.time() - fetched_at < self.ttl_seconds
+
+    def put(self, video_data):
+        """
+        Inserts or refreshes the entry for one VideoRecord.
+        A record whose description was already truncated doesn't replace the full text stored for it.
+        """
+        values = [getattr(video_data, field) for field in VIDEO_FIELDS]
+        values[VIDEO_FIELDS.index('video_path')] = Path(video_data.video_path).as_posix() if video_data.downloaded else NOT_DOWNLOADED
+        updates = ", ".join(f"{field} = excluded.{field}" for field in VIDEO_FIELDS[1:-1])
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO videos ({', '.join(VIDEO_FIELDS)}, fetched_at) VALUES ({', '.join('?' for _ in VIDEO_FIELDS)}, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}, fetched_at = excluded.fetched_at, "
+                "description = CASE WHEN length(excluded.description) = ? AND substr(description, 1, ?) = excluded.description "
+                "THEN description ELSE excluded.description END",
+                values + [time.time(), DESCRIPTION_CHARS, DESCRIPTION_CHARS]
+            )
+
+    def get_playlist_snapshot(self, playlist_url):
+        """Returns (video_ids, video_count) from the last complete scan of a playlist, or None if there is none recent enough."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_ids, video_count, scanned_at FROM playlist_snapshots WHERE playlist_url = ?", (playlist_url,)
+            ).fetchone()
+        if row is None or time.time() - row[2] >= self.snapshot_seconds:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save_playlist_snapshot(self, playlist_url, video_ids):
+        """Records the full, ordered ID list of a playlist after a successful scan."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO playlist_snapshots (playlist_url, video_ids, video_count, scanned_at) VALUES (?, ?, ?, ?)",
+                (playlist_url, json.dumps(list(video_ids)), len(video_ids), time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def open_metadata_store(db_path_str, ttl_days, snapshot_hours=24):
+    """Opens the metadata store configured in config.ini, or returns None when it is disabled or unusable."""
+    if not db_path_str:
+        return None
+    try:
+        return MetadataStore(Path(db_path_str), ttl_days, snapshot_hours)
+    except sqlite3.Error as e:
+        logging.error(f"Could not open the metadata cache '{db_path_str}'. Continuing without it. Error: {e}")
+        return None
@@ -0,0 +1,197 @@
+# rate_limiter.py
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import instrumentation
+
+# How a request ended, as far as the scheduler is concerned.
+OK = 'ok'                # The server answered, even if the answer was "not found".
+THROTTLED = 'throttled'  # HTTP 429, a bot check or similar. Everyone slows down.
+FAILED = 'failed'        # A timeout, a dropped connection or a 5xx. Worth retrying.
+
+# Lowercase fragments of yt-dlp messages that mean YouTube is limiting us.
+THROTTLE_MARKERS = (
+    'http error 429', 'too many requests', "confirm you're not a bot", 'confirm you’re not a bot',
+    'rate-limited', 'rate limited', 'sign in to confirm',
+)
+# Lowercase fragments of yt-dlp errors that are usually gone on the next try.
+TRANSIENT_MARKERS = (
+    'timed out', 'connection reset', 'connection aborted', 'temporary failure in name resolution',
+    'remote end closed connection', 'http error 500', 'http error 502', 'http error 503', 'http error 504',
+    'unable to download webpage', 'unable to download api page', 'incomplete read',
+)
+
+def classify_ytdlp_message(message):
+    """Returns THROTTLED or FAILED for a yt-dlp warning or error line that calls for it, otherwise None."""
+    text = message.lower()
+    if any(marker in text for marker in THROTTLE_MARKERS):
+        return THROTTLED
+    if 'error' in text and any(marker in text for marker in TRANSIENT_MARKERS):
+        return FAILED
+    return None
+
+def classify_http_error(error):
+    """Maps an exception raised by requests to THROTTLED, FAILED, or OK for errors a retry won't fix (e.g. 404)."""
+    import requests
+    response = getattr(error, 'response', None)
+    if response is not None:
+        if response.status_code == 429:
+            return THROTTLED
+        return FAILED if response.status_code >= 500 else OK
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return FAILED
+    return OK
+
+class YtdlpOutcome:
+    """
+    Stands in for the log passed to fetch_video_metadata and watches yt-dlp's messages on their way through,
+    so the caller can tell a throttled or flaky lookup from one yt-dlp skipped on purpose.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.outcome = OK
+
+    def _watch(self, message):
+        outcome = classify_ytdlp_message(message)
+        if outcome == THROTTLED or (outcome == FAILED and self.outcome == OK):
+            self.outcome = outcome
+
+    def info(self, message):
+        self.log.info(message)
+
+    def warning(self, message):
+        self._watch(message)
+        self.log.warning(message)
+
+    def critical(self, message):
+        self._watch(message)
+        self.log.critical(message)
+
+class AdaptiveLimiter:
+    """
+    Limits how many requests run at once and adapts the limit to how the server responds (AIMD).
+
+    Every successful request raises the limit by 1/limit, so it grows by about one per round of requests,
+    up to max_limit. A throttled request halves the limit and pauses everyone for a backoff delay that doubles
+    with every throttle in a row. Other failures shrink the limit by a quarter without pausing.
+    Only one decrease is applied per round: requests that started before the last decrease were already
+    in flight when it happened and say nothing new about the current limit.
+    """
+    def __init__(self, name, max_limit, min_limit=1, backoff_seconds=5.0, max_backoff_seconds=300.0):
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._throttle_streak = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with full jitter: a random delay up to backoff_seconds * 2**attempt, capped."""
+        return random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+
+    def acquire(self):
+        """Waits for a free slot and returns a ticket to hand back to release()."""
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+            return self._generation
+
+    def release(self, ticket, outcome=OK):
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == OK:
+                self._throttle_streak = 0
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif ticket == self._generation:
+                self._generation += 1
+                if outcome == THROTTLED:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    pause = self.backoff_delay(self._throttle_streak)
+                    self._throttle_streak += 1
+                    self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                    instrumentation.count(f'rate_limit.{self.name}.pauses')
+                else:
+                    self.limit = max(self.min_limit, self.limit * 0.75)
+            if outcome != OK:
+                instrumentation.count(f'rate_limit.{self.name}.{outcome}')
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Holds a slot for one request. Set the yielded holder's outcome to THROTTLED or FAILED if it went wrong;
+        an exception escaping the block counts as FAILED.
+        """
+        holder = _Slot()
+        ticket = self.acquire()
+        try:
+            yield holder
+        except BaseException:
+            holder.outcome = FAILED
+            raise
+        finally:
+            self.release(ticket, holder.outcome)
+
+class _Slot:
+    __slots__ = ('outcome',)
+
+    def __init__(self):
+        self.outcome = OK
+
+class RetryQueue:
+    """
+    Items waiting to be tried again, each with its attempt count and the time it becomes due.
+    Delays come from the limiter's backoff, so retries spread out instead of arriving together.
+    """
+    def __init__(self, limiter, max_retries=3):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self._heap = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def add(self, item, attempt):
+        """Queues item for attempt number attempt + 1. Returns False if it has used up its retries."""
+        if attempt >= self.max_retries:
+            instrumentation.count(f'rate_limit.{self.limiter.name}.gave_up')
+            return False
+        due = time.monotonic() + self.limiter.backoff_delay(attempt)
+        with self._lock:
+            heapq.heappush(self._heap, (due, next(self._order), item, attempt + 1))
+        instrumentation.count(f'rate_limit.{self.limiter.name}.retries')
+        return True
+
+    def pop_due(self):
+        """Removes and returns [(item, attempt)] for every retry whose time has come."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, item, attempt = heapq.heappop(self._heap)
+                due.append((item, attempt))
+        return due
+
+    def next_due_in(self):
+        """Seconds until the next retry is due, or None if the queue is empty."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
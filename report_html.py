@@ -1,77 +1,190 @@
 # report_html.py
 
-from pathlib import Path
+import json
 from urllib.parse import quote
 from datetime import datetime
+from pathlib import Path
 import logging
 
-def create_html_report(video_list, thumb_map, report_title, project_name, template_path, output_filename):
-    """Generates the final HTML report."""
+HTML_MODES = ('single', 'paged', 'lazy')
+
+def relative_href(path, html_base_dir):
+    """Returns a URL-encoded link to path relative to the HTML file's folder, or an absolute file URI as a fallback."""
+    try:
+        return quote(path.relative_to(html_base_dir).as_posix())
+    except ValueError:
+        # Fallback if the path cannot be made relative (e.g., different drive on Windows).
+        # as_uri() needs an absolute path and already percent-encodes it.
+        return path.resolve().as_uri()
+
+def video_row_fields(video_data, thumb_path, html_base_dir):
+    """Collects the values shown in one report row. Paths are made relative to html_base_dir, the folder of the HTML file."""
+    video_id = video_data.id
+    youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+    thumb_src = relative_href(thumb_path, html_base_dir) if thumb_path else ""
+
+    local_file_href = ""
+    if video_data.downloaded:
+        video_path = Path(video_data.video_path)
+        # Create a relative path from the HTML file to the video file.
+        # Then, URL-encode it to handle spaces and special characters safely.
+        try:
+            local_file_href = quote(video_path.relative_to(html_base_dir).as_posix())
+        except ValueError:
+            # Fallback to absolute URI if a relative path can't be made
+            local_file_href = video_path.resolve().as_uri()
+
+    return {
+        'url': youtube_url,
+        'thumb': thumb_src,
+        'title': video_data.title,
+        'channel': video_data.channel,
+        'date': video_data.upload_date,
+        'file': local_file_href,
+    }
+
+def render_video_row(video_data, thumb_path, html_base_dir):
+    """Renders the <tr> for one video."""
+    row = video_row_fields(video_data, thumb_path, html_base_dir)
+    if row['file']:
+        local_file_html = f'<td><a class="local-file-link" href="{row["file"]}" target="_blank">Watch Local File</a></td>'
+    else:
+        local_file_html = '<td>Not Downloaded</td>'
+
+    return f"""
+        <tr>
+            <td><a href="{row['url']}" target="_blank"><img src="{row['thumb']}" alt="Thumbnail for {row['title']}"></a></td>
+            <td class="video-title">{row['title']}</td>
+            <td class="channel-name">{row['channel']}</td>
+            <td>{row['date']}</td>
+            <td class="full-url-col"><a href="{row['url']}" target="_blank">{row['url']}</a></td>
+            {local_file_html}
+        </tr>"""
+
+def split_template(template_content, report_title, footer_html):
+    """
+    Fills in the title and footer, then splits the template at the rows placeholder.
+    Returns (head, tail), or None if the template has no rows placeholder.
+    """
+    filled = template_content.replace('<!--REPORT_TITLE_PLACEHOLDER-->', report_title)
+    filled = filled.replace('<!--FOOTER_PLACEHOLDER-->', footer_html)
+    head, separator, tail = filled.partition('<!--VIDEO_ROWS_PLACEHOLDER-->')
+    if not separator:
+        return None
+    return head, tail
+
+def page_filename(output_filename, page):
+    if page == 1:
+        return output_filename
+    return output_filename.with_name(f"{output_filename.stem}_page{page}{output_filename.suffix}")
+
+def render_pagination(output_filename, page, page_count):
+    """Renders the page links shown above and below the table in paged mode."""
+    links = []
+    if page > 1:
+        links.append(f'<a href="{quote(page_filename(output_filename, page - 1).name)}">&laquo; Previous</a>')
+    for number in range(1, page_count + 1):
+        if number == page:
+            links.append(f'<strong>{number}</strong>')
+        else:
+            links.append(f'<a href="{quote(page_filename(output_filename, number).name)}">{number}</a>')
+    if page < page_count:
+        links.append(f'<a href="{quote(page_filename(output_filename, page + 1).name)}">Next &raquo;</a>')
+    return f'<nav class="pagination">{" ".join(links)}</nav>'
+
+def create_html_report(video_list, thumb_map, report_title, project_name, template_path, output_filename, prepared_rows=None, derivatives=None, mode='single', page_size=1000):
+    """
+    Generates the final HTML report, writing rows straight to the file instead of building one large string.
+    prepared_rows can map video IDs to rows already rendered by render_video_row; other rows are rendered here,
+    linking the web-sized thumbnail from derivatives when there is one.
+
+    mode 'single' writes one page, 'paged' splits the rows over pages of page_size videos, and 'lazy' writes the
+    rows to a separate .data.js file that the template renders in chunks as the reader scrolls.
+    Returns True once the report has been written.
+    """
     if not video_list:
         logging.info("No video data to generate HTML report.")
-        return
+        return False
     logging.info("\nBuilding HTML report...")
     try:
         template_content = template_path.read_text(encoding='utf-8')
     except FileNotFoundError:
         logging.critical(f"CRITICAL ERROR: Template '{template_path}' not found.")
-        return
+        return False
+
+    if mode not in HTML_MODES:
+        logging.warning(f"Unknown html_mode '{mode}'. Using 'single'.")
+        mode = 'single'
 
-    video_rows_html = ""
     # The base directory for creating relative paths is the parent of the HTML output file
     html_base_dir = output_filename.parent
 
-    for video_data in video_list:
-        video_id = video_data.get('id')
-        video_title = video_data.get('title', 'N/A')
-        channel_name = video_data.get('channel', 'N/A')
-        youtube_url = f"https://www.youtube.com/watch?v={video_id}"
-
-        thumb_src = ""
-        if video_id in thumb_map:
-            try:
-                # Create a path for the thumbnail relative to the HTML file's location
-                relative_thumb_path = thumb_map[video_id].relative_to(html_base_dir)
-                thumb_src = quote(relative_thumb_path.as_posix())
-            except ValueError:
-                # Fallback if the path cannot be made relative (e.g., different drive on Windows)
-                thumb_src = quote(thumb_map[video_id].as_uri())
-
-        video_path = video_data.get('video_path')
-        if video_path and video_path.name != "Not Downloaded":
-            # --- THIS IS THE FIX ---
-            # Create a relative path from the HTML file to the video file.
-            # Then, URL-encode it to handle spaces and special characters safely.
-            try:
-                relative_video_path = video_path.relative_to(html_base_dir)
-                local_file_href = quote(relative_video_path.as_posix())
-            except ValueError:
-                # Fallback to absolute URI if a relative path can't be made
-                local_file_href = video_path.as_uri()
-            
-            local_file_html = f'<td><a class="local-file-link" href="{local_file_href}" target="_blank">Watch Local File</a></td>'
-        else:
-            local_file_html = '<td>Not Downloaded</td>'
+    def thumb_for(video_id):
+        if derivatives and video_id in derivatives:
+            return derivatives[video_id]['html']
+        return thumb_map.get(video_id)
 
-        # --- UPDATED HTML ROW ---
-        video_rows_html += f"""
-        <tr>
-            <td><a href="{youtube_url}" target="_blank"><img src="{thumb_src}" alt="Thumbnail for {video_title}"></a></td>
-            <td class="video-title">{video_title}</td>
-            <td class="channel-name">{channel_name}</td>
-            <td>{video_data.get('upload_date', 'N/A')}</td>
-            <td class="full-url-col"><a href="{youtube_url}" target="_blank">{youtube_url}</a></td>
-            {local_file_html}
-        </tr>"""
+    def row_html_for(video_data):
+        video_id = video_data.id
+        row_html = prepared_rows.get(video_id) if prepared_rows else None
+        if row_html is None:
+            row_html = render_video_row(video_data, thumb_for(video_id), html_base_dir)
+        return row_html
 
     generation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     footer_html = f"Generated by {project_name} on {generation_date}"
-    final_html = template_content.replace('<!--REPORT_TITLE_PLACEHOLDER-->', report_title)
-    final_html = final_html.replace('<!--VIDEO_ROWS_PLACEHOLDER-->', video_rows_html)
-    final_html = final_html.replace('<!--FOOTER_PLACEHOLDER-->', footer_html)
 
     try:
-        output_filename.write_text(final_html, encoding='utf-8')
-        logging.info(f"✅ Success! HTML report saved as '{output_filename}'")
+        if mode == 'lazy':
+            data_filename = output_filename.with_name(f"{output_filename.stem}.data.js")
+            parts = split_template(template_content, report_title, footer_html)
+            if parts is None:
+                logging.error(f"❌ Template '{template_path}' has no <!--VIDEO_ROWS_PLACEHOLDER-->. Cannot build the HTML report.")
+                return False
+            head, tail = parts
+            data_script = f'<script src="{quote(data_filename.name)}"></script>'
+            if '<!--DATA_SCRIPT_PLACEHOLDER-->' in tail:
+                tail = tail.replace('<!--DATA_SCRIPT_PLACEHOLDER-->', data_script)
+            else:
+                tail = tail.replace('</body>', f'{data_script}\n</body>')
+
+            with open(data_filename, 'w', encoding='utf-8') as f:
+                f.write("window.YT_LEDGER_ROWS = [\n")
+                for video_data in video_list:
+                    row = video_row_fields(video_data, thumb_for(video_data.id), html_base_dir)
+                    f.write(json.dumps(row, ensure_ascii=False))
+                    f.write(",\n")
+                f.write("];\n")
+            with open(output_filename, 'w', encoding='utf-8') as f:
+                f.write(head)
+                f.write(tail)
+            logging.info(f"✅ Success! HTML report saved as '{output_filename}' with its rows in '{data_filename}'")
+            return True
+
+        page_size = page_size if mode == 'paged' and page_size > 0 else len(video_list)
+        page_count = (len(video_list) + page_size - 1) // page_size
+        for page in range(1, page_count + 1):
+            page_footer = footer_html
+            pagination_html = render_pagination(output_filename, page, page_count) if page_count > 1 else ""
+            if pagination_html and '<!--PAGINATION_PLACEHOLDER-->' not in template_content:
+                page_footer = f"{pagination_html}\n{footer_html}"
+            parts = split_template(template_content.replace('<!--PAGINATION_PLACEHOLDER-->', pagination_html), report_title, page_footer)
+            if parts is None:
+                logging.error(f"❌ Template '{template_path}' has no <!--VIDEO_ROWS_PLACEHOLDER-->. Cannot build the HTML report.")
+                return False
+            head, tail = parts
+
+            with open(page_filename(output_filename, page), 'w', encoding='utf-8') as f:
+                f.write(head)
+                for video_data in video_list[(page - 1) * page_size:page * page_size]:
+                    f.write(row_html_for(video_data))
+                f.write(tail)
+
+        if page_count > 1:
+            logging.info(f"✅ Success! HTML report saved as '{output_filename}' and {page_count - 1} more page(s)")
+        else:
+            logging.info(f"✅ Success! HTML report saved as '{output_filename}'")
+        return True
     except Exception as e:
         logging.error(f"❌ Error saving HTML file: {e}")
+        return False
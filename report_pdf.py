@@ -1,10 +1,68 @@
 # report_pdf.py
 
 from fpdf import FPDF
+from fpdf.enums import Align, XPos, YPos
+from fpdf.util import Padding
 from pathlib import Path
+import concurrent.futures
+import copy
+import json
 import logging
+import math
+import os
+import tempfile
 from datetime import datetime
-import configparser # <-- Import configparser
+
+from fragment_cache import fragment_key, open_fragment_cache
+from thumb_derivatives import source_hash
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+# The fast text path (layout_text, draw_text_lines and the font copies in add_report_fonts) relies on internals
+# of fpdf2 2.7, pinned in requirements.txt. If another fpdf2 lacks them, the report is drawn with the public
+# multi_cell() instead, which is slower but gives the same pages.
+try:
+    from fpdf.fonts import SubsetMap
+    from fpdf.line_break import TextLine
+    from fontTools import ttLib
+except ImportError:
+    SubsetMap = TextLine = ttLib = None
+FAST_TEXT = TextLine is not None and all(
+    hasattr(FPDF, name) for name in ('_render_styled_text_line', '_preload_font_styles')
+)
+
+# Descriptions are cut to this many characters in each banner.
+MAX_DESC_CHARS = 90
+
+# --- Layout Constants ---
+LEFT_MARGIN = 10
+THUMB_WIDTH = 64
+THUMB_HEIGHT = 36
+BANNER_SPACING = 8
+BANNER_BG_COLOR = (242, 242, 242)
+CORNER_RADIUS = 3
+VERTICAL_PADDING = 3
+BANNER_HEIGHT = THUMB_HEIGHT + (VERTICAL_PADDING * 2)
+TEXT_BLOCK_X = LEFT_MARGIN + THUMB_WIDTH + 5
+
+# (style, font size, line height) of the wrapped text blocks in a banner.
+TITLE_STYLE = ('B', 11, 5)
+DESC_STYLE = ('', 9, 4)
+
+FONT_DIR = Path(__file__).parent / 'fonts'
+FONT_FILES = {'': 'DejaVuSans.ttf', 'B': 'DejaVuSans-Bold.ttf', 'I': 'DejaVuSans-Oblique.ttf'}
+
+# Parallel PDF chunks are never smaller than this many pages.
+MIN_CHUNK_PAGES = 20
+
+# Part of the key of cached banner text. Bump it when layout_text or the fonts change.
+LAYOUT_VERSION = 1
+
+# Parsed fonts, kept for the life of the process. {style: TTFFont}
+_font_cache = {}
 
 class PDFReport(FPDF):
     def __init__(self, *args, **kwargs):
@@ -12,6 +70,9 @@ class PDFReport(FPDF):
         self.report_title = ""
         self.project_name = ""
         self.show_watermark = True # Default
+        self.generation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Added to the printed page numbers when this document is one chunk of a larger report.
+        self.page_offset = 0
 
     def header(self):
         self.set_font("DejaVu", "B", 14)
@@ -20,131 +81,396 @@ class PDFReport(FPDF):
 
     def footer(self):
         self.set_y(-15)
-        
+        page_number = self.page_no() + self.page_offset
+
         if self.show_watermark:
-            generation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            footer_text = f"Generated by {self.project_name} on {generation_date}"
-            
+            footer_text = f"Generated by {self.project_name} on {self.generation_date}"
+
             self.set_font('DejaVu', '', 8) # Regular font
             self.set_text_color(128, 128, 128) # Grey
             self.cell(0, 10, footer_text, 0, 0, 'L')
-            
+
             self.set_text_color(0, 0, 0) # Black
-            self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'R')
+            self.cell(0, 10, f'Page {page_number}', 0, 0, 'R')
         else:
             self.set_font('DejaVu', 'I', 8) # Italic font
             self.set_text_color(0, 0, 0)
-            self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+            self.cell(0, 10, f'Page {page_number}', 0, 0, 'C')
 
-def create_pdf_report(video_list, thumb_map, output_filename, report_title, project_name):
-    if not video_list:
-        logging.info("No video data to generate PDF report.")
-        return
-        
-    logging.info("\nBuilding PDF report...")
-    
-    # --- RELIABLE CONFIG READING ---
-    # The PDF module will now read the config for itself. This is the most robust way.
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-    show_footer_watermark = config.getboolean('outputs', 'show_footer_watermark', fallback=True)
-    # --- END OF RELIABLE CONFIG READING ---
+    def draw_text_lines(self, lines, w, h):
+        """
+        Draws lines made by layout_text() exactly like multi_cell(w, h, text) would, but without wrapping the text again.
+        This goes through FPDF's own line renderer, so justified lines keep their word spacing.
+        """
+        for index, (text, text_width, number_of_spaces, align, trailing_nl) in enumerate(lines):
+            if self.will_page_break(h):
+                x = self.x
+                self.add_page(same=True)
+                self.x = x
+            is_last_line = index == len(lines) - 1
+            self._render_styled_text_line(
+                TextLine(
+                    self._preload_font_styles(text, False), text_width=text_width, number_of_spaces=number_of_spaces,
+                    align=Align.coerce(align), height=self.font_size, max_width=w, trailing_nl=trailing_nl
+                ),
+                h=h,
+                new_x=XPos.RIGHT if is_last_line else XPos.LEFT,
+                new_y=YPos.NEXT,
+                padding=Padding(0, 0, 0, 0),
+            )
+        if lines[-1][4]:
+            self.ln()
+
+def add_report_fonts(pdf):
+    """
+    Registers the DejaVu fonts. Reading a TTF's metrics takes a noticeable moment, so each font is parsed once per
+    process and later documents get a copy with their own subset and their own handle on the font file.
+    """
+    for style, filename in FONT_FILES.items():
+        font_path = FONT_DIR / filename
+        cached = _font_cache.get(style)
+        if cached is None or not FAST_TEXT:
+            pdf.add_font('DejaVu', style, str(font_path))
+            _font_cache[style] = pdf.fonts[f"dejavu{style}"]
+            continue
+        font = copy.copy(cached)
+        font.i = len(pdf.fonts) + 1
+        # The subsetter edits the font object when the document is saved, so it can't be shared.
+        font.ttfont = ttLib.TTFont(font_path, recalcTimestamp=False, fontNumber=0, lazy=True)
+        font.missing_glyphs = []
+        reserved = "\x00 \r\n" + ("0123456789" + pdf.str_alias_nb_pages if pdf.str_alias_nb_pages else "")
+        font.subset = SubsetMap(font, [ord(char) for char in reserved])
+        pdf.fonts[f"dejavu{style}"] = font
+
+def layout_text(pdf, text, w):
+    """
+    Wraps text for multi_cell(w, ...) in the current font and returns the lines as plain
+    (text, width, number_of_spaces, align, trailing_newline) tuples that draw_text_lines() can draw.
+    This follows FPDF's word wrapping character for character, but adds up the widths as it goes
+    instead of re-measuring the line for every character.
+    Returns None for text with soft hyphens, non-breaking spaces or form feeds, when text shaping is on,
+    or when this fpdf2 has no fast text path; multi_cell handles those itself.
+    """
+    if not FAST_TEXT:
+        return None
+    text = text.replace("\r", "")
+    if pdf.text_shaping or any(char in text for char in "\u00ad\u00a0\f"):
+        return None
+    if not text:
+        # multi_cell still takes up one line for empty text.
+        return [("", 0, 0, 'J', False)]
+
+    char_widths = pdf.current_font.cw
+    font_size_pt = pdf.font_size_pt
+    k = pdf.k
+
+    def width_of(units):
+        return units * font_size_pt * 0.001 / k
+
+    max_width = w - pdf.c_margin - pdf.c_margin
+    lines = []
+    i = 0
+    while i < len(text):
+        start = i
+        units = 0
+        spaces = 0
+        last_space = None
+        while i < len(text):
+            char = text[i]
+            if char == "\n":
+                lines.append((text[start:i], width_of(units), spaces, 'L', True))
+                i += 1
+                break
+            char_units = char_widths[ord(char)]
+            if width_of(units) + width_of(char_units) > max_width:
+                if char == " ":
+                    lines.append((text[start:i], width_of(units), spaces, 'J', False))
+                    i += 1
+                elif last_space is not None:
+                    space_index, space_units, space_count = last_space
+                    if space_index == start:
+                        # FPDF draws an empty text run for this line; leave such rare text to multi_cell.
+                        return None
+                    lines.append((text[start:space_index], width_of(space_units), space_count, 'J', False))
+                    i = space_index + 1
+                elif i > start:
+                    # A word longer than the line is cut wherever it overflows.
+                    lines.append((text[start:i], width_of(units), spaces, 'L', False))
+                else:
+                    return None
+                break
+            if char == " ":
+                last_space = (i, units, spaces)
+                spaces += 1
+            units += char_units
+            i += 1
+        else:
+            if width_of(units):
+                lines.append((text[start:], width_of(units), spaces, 'L', False))
+    return lines or None
+
+def shorten_description(description):
+    return (description[:MAX_DESC_CHARS] + "...") if len(description) > MAX_DESC_CHARS else description
+
+def prepare_banners(pdf, video_list, thumb_paths, fragment_cache=None):
+    """
+    Works out the text of every banner up front, with the title and description already wrapped into lines.
+    The result is plain data, so it can be sent to the processes that draw the pages.
+    With a fragment_cache, the wrapped lines of videos whose title and description haven't changed are reused.
+    """
+    text_block_width = pdf.w - LEFT_MARGIN * 2 - THUMB_WIDTH - 10
+    banners = []
+    for video_data in video_list:
+        video_id = video_data.id
+        title = video_data.title
+        short_desc = shorten_description(video_data.description)
+        key = None
+        cached = None
+        # Cached lines can only be drawn by the fast text path.
+        if fragment_cache and FAST_TEXT:
+            key = fragment_key(LAYOUT_VERSION, title, short_desc, text_block_width, TITLE_STYLE, DESC_STYLE)
+            cached = fragment_cache.get(video_id, key)
+        if cached:
+            title_lines, desc_lines = json.loads(cached[0])
+        else:
+            pdf.set_font('DejaVu', TITLE_STYLE[0], TITLE_STYLE[1])
+            title_lines = layout_text(pdf, title, text_block_width)
+            pdf.set_font('DejaVu', DESC_STYLE[0], DESC_STYLE[1])
+            desc_lines = layout_text(pdf, short_desc, text_block_width)
+            if key:
+                fragment_cache.put(video_id, key, json.dumps([title_lines, desc_lines], ensure_ascii=False))
+        banners.append({
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'thumb': thumb_paths.get(video_id),
+            'title': title_lines if title_lines is not None else title,
+            'channel': f"By: {video_data.channel}",
+            'uploaded': f"Uploaded: {video_data.upload_date}",
+            'description': desc_lines if desc_lines is not None else short_desc,
+        })
+    return banners
+
+def resolve_thumbnails(video_list, thumb_map, derivatives):
+    """
+    Picks the image each banner shows and returns {video_id: path string}, leaving out videos without one.
+    FPDF embeds an image once per file path, so thumbnails with identical content are pointed at the same
+    path. The report-sized derivatives are already named after their content and need no hashing.
+    """
+    thumb_paths = {}
+    path_by_hash = {}
+    exists = {}
+    for video_data in video_list:
+        video_id = video_data.id
+        if derivatives and video_id in derivatives:
+            thumb_path = derivatives[video_id]['pdf']
+            is_derivative = True
+        else:
+            thumb_path = thumb_map.get(video_id)
+            is_derivative = False
+        if not thumb_path:
+            continue
+        thumb_path = str(thumb_path)
+        if thumb_path not in exists:
+            exists[thumb_path] = Path(thumb_path).exists()
+        if not exists[thumb_path]:
+            continue
+        if not is_derivative:
+            try:
+                thumb_path = path_by_hash.setdefault(source_hash(thumb_path), thumb_path)
+            except OSError:
+                pass
+        thumb_paths[video_id] = thumb_path
+    return thumb_paths
+
+def _draw_wrapped(pdf, text_or_lines, w, h):
+    if isinstance(text_or_lines, str):
+        pdf.multi_cell(w, h, text_or_lines)
+    else:
+        pdf.draw_text_lines(text_or_lines, w, h)
+
+def draw_banner(pdf, banner):
+    PAGE_WIDTH = pdf.w - LEFT_MARGIN * 2
+    text_block_width = PAGE_WIDTH - THUMB_WIDTH - 10
+
+    if pdf.get_y() + BANNER_HEIGHT > pdf.page_break_trigger:
+        pdf.add_page()
+
+    start_y = pdf.get_y()
+    youtube_url = banner['url']
+
+    pdf.set_fill_color(*BANNER_BG_COLOR)
+    try:
+        pdf.rect(x=LEFT_MARGIN, y=start_y, w=PAGE_WIDTH, h=BANNER_HEIGHT,
+                 style='F', round_corners=True, corner_radius=CORNER_RADIUS)
+    except TypeError:
+        pdf.rect(x=LEFT_MARGIN, y=start_y, w=PAGE_WIDTH, h=BANNER_HEIGHT, style='F')
+
+    thumb_y = start_y + VERTICAL_PADDING
+    if banner['thumb']:
+        pdf.image(banner['thumb'], x=LEFT_MARGIN + 3, y=thumb_y, w=THUMB_WIDTH, h=THUMB_HEIGHT, link=youtube_url)
+    else:
+        pdf.set_xy(LEFT_MARGIN + 3, thumb_y)
+        pdf.cell(THUMB_WIDTH, THUMB_HEIGHT, "No Thumbnail", border=1, align='C', link=youtube_url)
+
+    pdf.set_xy(TEXT_BLOCK_X, start_y + VERTICAL_PADDING)
+
+    pdf.set_font('DejaVu', TITLE_STYLE[0], TITLE_STYLE[1])
+    _draw_wrapped(pdf, banner['title'], text_block_width, TITLE_STYLE[2])
 
+    pdf.set_x(TEXT_BLOCK_X)
+    pdf.set_font('DejaVu', 'I', 9)
+    pdf.cell(text_block_width, 6, banner['channel'], ln=1)
+
+    pdf.set_x(TEXT_BLOCK_X)
+    pdf.set_font('DejaVu', '', 9)
+    pdf.cell(text_block_width, 6, banner['uploaded'], ln=1)
+
+    pdf.set_x(TEXT_BLOCK_X)
+    pdf.set_font('DejaVu', DESC_STYLE[0], DESC_STYLE[1])
+    _draw_wrapped(pdf, banner['description'], text_block_width, DESC_STYLE[2])
+
+    pdf.set_x(TEXT_BLOCK_X)
+    pdf.set_font('DejaVu', '', 8)
+    pdf.set_text_color(4, 58, 242)
+    pdf.cell(text_block_width, 5, "Watch on YouTube", link=youtube_url)
+    pdf.set_text_color(0, 0, 0)
+
+    pdf.set_y(start_y + BANNER_HEIGHT + BANNER_SPACING)
+
+def new_report_document(report_title, project_name, show_watermark, generation_date, page_offset=0):
     pdf = PDFReport()
-    
+
     # Set the properties on the instance AFTER creation
     pdf.report_title = report_title
     pdf.project_name = project_name
-    pdf.show_watermark = show_footer_watermark
+    pdf.show_watermark = show_watermark
+    pdf.generation_date = generation_date
+    pdf.page_offset = page_offset
 
     # --- Font Setup ---
-    base_dir = Path(__file__).parent
-    font_dir = base_dir / 'fonts'
     try:
-        pdf.add_font('DejaVu', '', str(font_dir / 'DejaVuSans.ttf'), uni=True)
-        pdf.add_font('DejaVu', 'B', str(font_dir / 'DejaVuSans-Bold.ttf'), uni=True)
-        pdf.add_font('DejaVu', 'I', str(font_dir / 'DejaVuSans-Oblique.ttf'), uni=True)
+        add_report_fonts(pdf)
     except RuntimeError:
-        logging.error(f"FPDF error: Could not load DejaVu fonts from '{font_dir}'. Using Arial fallback.")
+        logging.error(f"FPDF error: Could not load DejaVu fonts from '{FONT_DIR}'. Using Arial fallback.")
     pdf.set_font('DejaVu', '', 12) # Set default font
 
     pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf
+
+def render_banners(banners, output_filename, report_title, project_name, show_watermark, generation_date, page_offset=0):
+    """Draws the banners into a new document and saves it. Also runs in worker processes for one chunk of pages."""
+    pdf = new_report_document(report_title, project_name, show_watermark, generation_date, page_offset)
     pdf.add_page()
+    for banner in banners:
+        draw_banner(pdf, banner)
+    pdf.output(str(output_filename))
+    return pdf.page_no()
 
-    # --- Layout Constants ---
-    LEFT_MARGIN = 10
-    PAGE_WIDTH = pdf.w - LEFT_MARGIN * 2
-    THUMB_WIDTH = 64
-    THUMB_HEIGHT = 36
-    
-    BANNER_SPACING = 8
-    BANNER_BG_COLOR = (242, 242, 242)
-    CORNER_RADIUS = 3
-    VERTICAL_PADDING = 3
-    
-    TEXT_BLOCK_X = LEFT_MARGIN + THUMB_WIDTH + 5
-    text_block_width = PAGE_WIDTH - THUMB_WIDTH - 10
-    
-    MAX_DESC_CHARS = 90 
+def banners_per_page(pdf):
+    """Returns how many banners fit on a page and the highest point the text of the last one may reach."""
+    # A fresh page shows where the header leaves off.
+    pdf.add_page()
+    starts = []
+    y = pdf.get_y()
+    while y + BANNER_HEIGHT <= pdf.page_break_trigger:
+        starts.append(y)
+        y += BANNER_HEIGHT + BANNER_SPACING
+    return len(starts), starts[-1] + VERTICAL_PADDING
 
-    for video_data in video_list:
-        banner_height = THUMB_HEIGHT + (VERTICAL_PADDING * 2)
-
-        if pdf.get_y() + banner_height > pdf.page_break_trigger:
-            pdf.add_page()
-
-        start_y = pdf.get_y()
-        video_id = video_data.get('id')
-        youtube_url = f"https://www.youtube.com/watch?v={video_id}"
-
-        pdf.set_fill_color(*BANNER_BG_COLOR)
-        try:
-            pdf.rect(x=LEFT_MARGIN, y=start_y, w=PAGE_WIDTH, h=banner_height, 
-                     style='F', round_corners=True, corner_radius=CORNER_RADIUS)
-        except TypeError: 
-            pdf.rect(x=LEFT_MARGIN, y=start_y, w=PAGE_WIDTH, h=banner_height, style='F')
-
-        thumb_y = start_y + VERTICAL_PADDING
-        thumb_path = thumb_map.get(video_id)
-        if thumb_path and Path(thumb_path).exists():
-            pdf.image(str(thumb_path), x=LEFT_MARGIN + 3, y=thumb_y, w=THUMB_WIDTH, h=THUMB_HEIGHT, link=youtube_url)
-        else:
-            pdf.set_xy(LEFT_MARGIN + 3, thumb_y)
-            pdf.cell(THUMB_WIDTH, THUMB_HEIGHT, "No Thumbnail", border=1, align='C', link=youtube_url)
-
-        pdf.set_xy(TEXT_BLOCK_X, start_y + VERTICAL_PADDING)
-        
-        pdf.set_font('DejaVu', 'B', 11)
-        title = video_data.get('title', 'N/A')
-        pdf.multi_cell(text_block_width, 5, title)
-        
-        pdf.set_x(TEXT_BLOCK_X)
-        pdf.set_font('DejaVu', 'I', 9)
-        channel_name = video_data.get('channel', 'N/A')
-        pdf.cell(text_block_width, 6, f"By: {channel_name}", ln=1)
-
-        pdf.set_x(TEXT_BLOCK_X)
-        pdf.set_font('DejaVu', '', 9)
-        pdf.cell(text_block_width, 6, f"Uploaded: {video_data.get('upload_date', 'N/A')}", ln=1)
-
-        pdf.set_x(TEXT_BLOCK_X)
-        pdf.set_font('DejaVu', '', 9)
-        description = video_data.get('description', '')
-        
-        short_desc = (description[:MAX_DESC_CHARS] + "...") if len(description) > MAX_DESC_CHARS else description
-        
-        pdf.multi_cell(text_block_width, 4, short_desc)
-
-        pdf.set_x(TEXT_BLOCK_X)
-        pdf.set_font('DejaVu', '', 8)
-        pdf.set_text_color(4, 58, 242)
-        pdf.cell(text_block_width, 5, "Watch on YouTube", link=youtube_url)
-        pdf.set_text_color(0, 0, 0)
-
-        pdf.set_y(start_y + banner_height + BANNER_SPACING)
+def text_height(banner):
+    """Height of a banner's text column, or None when it wasn't laid out in advance."""
+    if isinstance(banner['title'], str) or isinstance(banner['description'], str):
+        return None
+    return len(banner['title']) * TITLE_STYLE[2] + 12 + len(banner['description']) * DESC_STYLE[2] + 5
+
+def plan_chunks(pdf, banners, workers):
+    """
+    Splits the banners into page-aligned chunks for parallel rendering, or returns None if it isn't worth it
+    or isn't safe. Every page holds the same number of banners unless a banner's text spills onto the next
+    page, so chunks are only used when no text block can reach the page break.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    per_page, last_text_y = banners_per_page(pdf)
+    text_limit = pdf.page_break_trigger - last_text_y
+    for banner in banners:
+        height = text_height(banner)
+        if height is None or height > text_limit:
+            return None
+    page_count = math.ceil(len(banners) / per_page)
+    chunk_count = min(workers, page_count // MIN_CHUNK_PAGES)
+    if chunk_count <= 1:
+        return None
+    pages_per_chunk = math.ceil(page_count / chunk_count)
+    return [
+        (page * per_page, banners[page * per_page:(page + pages_per_chunk) * per_page])
+        for page in range(0, page_count, pages_per_chunk)
+    ]
+
+def _render_in_parallel(chunks, per_page, output_filename, report_title, project_name, show_watermark, generation_date):
+    """Renders each chunk in its own process and joins the pages into output_filename."""
+    with tempfile.TemporaryDirectory(prefix='pdf_chunks_', dir=Path(output_filename).parent) as tmp_dir:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = []
+            for index, (first_banner, chunk) in enumerate(chunks):
+                chunk_path = Path(tmp_dir) / f"chunk_{index:04d}.pdf"
+                futures.append((chunk_path, executor.submit(
+                    render_banners, chunk, chunk_path, report_title, project_name, show_watermark,
+                    generation_date, first_banner // per_page
+                )))
+            chunk_paths = []
+            for chunk_path, future in futures:
+                future.result()
+                chunk_paths.append(chunk_path)
+
+        writer = PdfWriter()
+        for chunk_path in chunk_paths:
+            writer.append(str(chunk_path))
+        tmp_output = Path(tmp_dir) / 'merged.pdf'
+        with open(tmp_output, 'wb') as f:
+            writer.write(f)
+        writer.close()
+        os.replace(tmp_output, output_filename)
+
+def create_pdf_report(video_list, thumb_map, output_filename, report_title, project_name, derivatives=None, workers=1, fragment_cache_db=None, show_footer_watermark=True):
+    """
+    Generates the PDF report.
+    derivatives can map video IDs to their report-sized thumbnails, which keeps the PDF far smaller than embedding the originals.
+    With workers above 1 and pypdf installed, large reports are drawn in page-aligned chunks by separate processes
+    and joined into one file.
+    fragment_cache_db is the SQLite file that keeps each banner's wrapped text between runs (None to disable).
+    show_footer_watermark comes from the [outputs] section of the ledger's config.
+    Returns True once the PDF has been saved.
+    """
+    if not video_list:
+        logging.info("No video data to generate PDF report.")
+        return False
+
+    logging.info("\nBuilding PDF report...")
 
+    generation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    layout_pdf = new_report_document(report_title, project_name, show_footer_watermark, generation_date)
+    fragment_cache = open_fragment_cache(fragment_cache_db, 'pdf')
     try:
-        pdf.output(str(output_filename))
+        banners = prepare_banners(layout_pdf, video_list, resolve_thumbnails(video_list, thumb_map, derivatives), fragment_cache)
+    finally:
+        if fragment_cache:
+            fragment_cache.close()
+
+    chunks = plan_chunks(layout_pdf, banners, workers)
+    if chunks and PdfWriter is None:
+        logging.warning("  > pypdf is not installed, so the PDF is built in a single process. Run 'pip install pypdf' to enable pdf_workers.")
+        chunks = None
+
+    try:
+        if chunks:
+            per_page, _ = banners_per_page(layout_pdf)
+            logging.info(f"  -> Drawing {len(banners)} banners in {len(chunks)} parallel chunks...")
+            _render_in_parallel(chunks, per_page, output_filename, report_title, project_name, show_footer_watermark, generation_date)
+        else:
+            render_banners(banners, output_filename, report_title, project_name, show_footer_watermark, generation_date)
         logging.info(f"✅ Success! PDF report saved as '{output_filename}'")
+        return True
     except Exception as e:
         logging.error(f"❌ Error saving PDF file: {e}")
+        return False
@@ -0,0 +1,171 @@
+# report_runner.py
+
+import concurrent.futures
+import logging
+import os
+import time
+import traceback
+
+import instrumentation
+
+REPORT_FORMATS = ('xlsx', 'html', 'pdf')
+REPORT_NAMES = {'xlsx': 'Excel', 'html': 'HTML', 'pdf': 'PDF'}
+
+def make_report_snapshot(video_list, thumb_map, derivatives, report_formats=REPORT_FORMATS):
+    """
+    Builds a compact, picklable copy of what the writers need to send to worker processes.
+    VideoRecords are already trimmed for the reports; the thumbnail URL is dropped, and so is the
+    description unless the PDF is selected.
+    """
+    keep_description = 'pdf' in report_formats
+    videos = [
+        video_data.replace(thumbnail_url=None, description=video_data.description if keep_description else '')
+        for video_data in video_list
+    ]
+    video_ids = {video.id for video in videos}
+    return {
+        'video_list': videos,
+        'thumb_map': {vid: path for vid, path in thumb_map.items() if vid in video_ids},
+        'derivatives': {vid: paths for vid, paths in (derivatives or {}).items() if vid in video_ids},
+    }
+
+def write_report(report_format, snapshot, options):
+    """
+    Calls the writer for one format and returns whether it saved its file. Each writer's libraries
+    are only imported here, so a run that skips a format never loads them.
+    """
+    video_list, thumb_map, derivatives = snapshot['video_list'], snapshot['thumb_map'], snapshot['derivatives']
+    if report_format == 'xlsx':
+        from report_xlsx import create_spreadsheet
+        return create_spreadsheet(
+            video_list, thumb_map, options['output_xls'], derivatives=derivatives, streaming=options.get('xlsx_streaming', True),
+            rows_per_sheet=options.get('xlsx_rows_per_sheet', 0), split_into=options.get('xlsx_split_into', 'sheets'),
+            fragment_cache_db=options.get('fragment_cache_db')
+        )
+    elif report_format == 'html':
+        from report_html import create_html_report
+        return create_html_report(
+            video_list, thumb_map, options['report_title'], options['project_name'], options['template_html'],
+            options['output_html'], prepared_rows=options.get('html_rows'), derivatives=derivatives,
+            mode=options.get('html_mode', 'single'), page_size=options.get('html_page_size', 1000)
+        )
+    elif report_format == 'pdf':
+        from report_pdf import create_pdf_report
+        return create_pdf_report(video_list, thumb_map, options['output_pdf'], options['report_title'], options['project_name'], derivatives=derivatives,
+                                 workers=options.get('pdf_workers', 1), fragment_cache_db=options.get('fragment_cache_db'),
+                                 show_footer_watermark=options.get('show_footer_watermark', True))
+
+class _RecordCollector(logging.Handler):
+    """Keeps a worker process's log records so the parent can write them to its own log."""
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Flatten the record so it survives pickling back to the parent.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.msg += "\n" + "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        self.records.append(record)
+
+def _run_writer_in_worker(report_format, snapshot, options, log_level):
+    """Entry point in the worker process. Returns (seconds, error text or None, log records, resource usage)."""
+    root_logger = logging.getLogger()
+    collector = _RecordCollector()
+    root_logger.handlers = [collector]
+    root_logger.setLevel(log_level)
+
+    metrics = instrumentation.start_run()
+    started_at = time.time()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    error = None
+    try:
+        if not write_report(report_format, snapshot, options):
+            error = "The report was not saved. See the errors above."
+    except Exception:
+        error = traceback.format_exc()
+    usage = {
+        'started_at': started_at,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'peak_rss': instrumentation.peak_rss_mb(),
+        'pid': os.getpid(),
+        'counters': metrics.counters,
+    }
+    return time.perf_counter() - start, error, collector.records, usage
+
+def run_reports(report_formats, video_list, thumb_map, derivatives, options, parallel=True):
+    """
+    Builds the selected reports and returns {format: {'seconds': float, 'ok': bool}}.
+
+    With parallel on, each writer runs in its own single-process pool. The writers are CPU-bound, so this
+    sidesteps the GIL, and a writer that crashes outright cannot take the others down with it.
+    """
+    timings = {}
+    if not report_formats:
+        logging.info("No report formats selected. Skipping report generation.")
+        return timings
+
+    if not parallel:
+        for report_format in report_formats:
+            start = time.perf_counter()
+            ok = True
+            try:
+                with instrumentation.stage(f'report.{report_format}'):
+                    ok = write_report(report_format, {'video_list': video_list, 'thumb_map': thumb_map, 'derivatives': derivatives or {}}, options)
+                if not ok:
+                    logging.error(f"❌ The {REPORT_NAMES[report_format]} report was not saved.")
+            except Exception as e:
+                logging.error(f"❌ The {REPORT_NAMES[report_format]} report failed. Error: {e}")
+                ok = False
+            timings[report_format] = {'seconds': time.perf_counter() - start, 'ok': ok}
+            logging.info(f"  -> {REPORT_NAMES[report_format]} report took {timings[report_format]['seconds']:.2f}s.")
+        return timings
+
+    logging.info(f"\nBuilding {len(report_formats)} report(s) in parallel: {', '.join(report_formats)}...")
+    snapshot = make_report_snapshot(video_list, thumb_map, derivatives, report_formats)
+    log_level = logging.getLogger().getEffectiveLevel()
+    executors = []
+    futures = []
+    try:
+        for report_format in report_formats:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+            executors.append(executor)
+            futures.append((report_format, executor.submit(_run_writer_in_worker, report_format, snapshot, options, log_level)))
+
+        # Collect in a fixed order so the log reads the same on every run.
+        for report_format, future in futures:
+            name = REPORT_NAMES[report_format]
+            try:
+                seconds, error, records, usage = future.result()
+            except Exception as e:
+                logging.error(f"❌ The {name} report worker crashed. Error: {e!r}")
+                timings[report_format] = {'seconds': None, 'ok': False}
+                continue
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            instrumentation.record_stage(
+                f'report.{report_format}', usage['started_at'], seconds,
+                cpu_seconds=usage['cpu_seconds'], peak_rss=usage['peak_rss'], pid=usage['pid'],
+            )
+            for counter, value in usage['counters'].items():
+                instrumentation.count(counter, value)
+            if error:
+                logging.error(f"❌ The {name} report failed after {seconds:.2f}s. Error:\n{error}")
+            else:
+                logging.info(f"  -> {name} report took {seconds:.2f}s.")
+            timings[report_format] = {'seconds': seconds, 'ok': error is None}
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+    return timings
+
+def parse_report_formats(formats_str):
+    """Turns the comma separated report_formats setting into an ordered tuple, warning about unknown names."""
+    requested = [item.strip().lower() for item in formats_str.split(',') if item.strip()]
+    for item in requested:
+        if item not in REPORT_FORMATS:
+            logging.warning(f"Unknown report format '{item}' in report_formats. Expected one of: {', '.join(REPORT_FORMATS)}.")
+    return tuple(fmt for fmt in REPORT_FORMATS if fmt in requested)
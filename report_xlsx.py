@@ -0,0 +1,201 @@
+# report_xlsx.py
+
+import io
+import json
+import logging
+from PIL import Image
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as OpenpyxlImage
+from pathlib import Path
+
+from fragment_cache import file_signature, fragment_key, open_fragment_cache
+from video_record import NOT_DOWNLOADED
+
+def make_xlsx_thumbnail(thumb_path):
+    """Shrinks a thumbnail to the size used in the spreadsheet and returns it as PNG bytes."""
+    img_pillow = Image.open(thumb_path)
+    img_pillow.thumbnail((120, 90))
+    png_stream = io.BytesIO()
+    img_pillow.save(png_stream, format='PNG')
+    return png_stream.getvalue()
+
+HEADERS = ["Thumbnail", "Video Title", "Channel Name", "Full YouTube URL", "Original Upload Date", "Local File Path"]
+COLUMN_WIDTHS = {'A': 18, 'B': 60, 'C': 30, 'D': 50, 'E': 20, 'F': 70}
+ROW_HEIGHT = 75
+SHEET_TITLE = "YT-Ledger Report"
+
+class XlsxImage(OpenpyxlImage):
+    """
+    A PNG for the spreadsheet whose size is already known. openpyxl's own Image opens the file with Pillow
+    once to measure it and again to save it; this one is given its size and hands over its bytes as they are.
+    source is a file path, which keeps only the reference in memory until the workbook is saved, or the PNG bytes.
+    """
+    def __init__(self, source, width, height):
+        self.ref = source
+        self.width, self.height = width, height
+        self.format = 'png'
+
+    def _data(self):
+        if isinstance(self.ref, bytes):
+            return self.ref
+        with open(self.ref, 'rb') as f:
+            return f.read()
+
+def make_xlsx_image(video_id, thumb_map, derivatives):
+    """
+    Returns (image, png_bytes) for a video's thumbnail, or (None, None) if it has none or it can't be read.
+    png_bytes is only set when the image was shrunk here rather than taken from a derivative file.
+    """
+    if video_id not in thumb_map:
+        return None, None
+    try:
+        if derivatives and video_id in derivatives:
+            source = str(derivatives[video_id]['xlsx'])
+            with Image.open(source) as img:
+                return XlsxImage(source, *img.size), None
+        png_bytes = make_xlsx_thumbnail(thumb_map[video_id])
+        with Image.open(io.BytesIO(png_bytes)) as img:
+            return XlsxImage(png_bytes, *img.size), png_bytes
+    except Exception as e:
+        logging.warning(f"  > Warning: Could not process thumbnail for {video_id}. Error: {e}")
+        return None, None
+
+def local_path_text(video_data):
+    return Path(video_data.video_path).as_posix() if video_data.downloaded else NOT_DOWNLOADED
+
+def make_row(video_data, thumb_map, derivatives, fragment_cache=None):
+    """
+    Returns ([title, channel, upload date, local path], image or None) for one video.
+    With a fragment_cache, a video whose fields and thumbnail are unchanged since the last run reuses the
+    row and image size stored then, along with the shrunk image when there was no derivative for it.
+    """
+    video_id = video_data.id
+    values = [video_data.title, video_data.channel, video_data.upload_date, local_path_text(video_data)]
+    if not fragment_cache:
+        return values, make_xlsx_image(video_id, thumb_map, derivatives)[0]
+
+    derivative = derivatives[video_id]['xlsx'] if derivatives and video_id in derivatives else None
+    # Derivatives are named after their content; an original thumbnail can change under the same name.
+    thumb_id = str(derivative) if derivative else file_signature(thumb_map.get(video_id))
+    key = fragment_key(video_id, values, thumb_id)
+    cached = fragment_cache.get(video_id, key)
+    if cached:
+        data, png_bytes = cached
+        size = json.loads(data)
+        image = XlsxImage(png_bytes if png_bytes is not None else str(derivative), *size) if size else None
+        return values, image
+
+    image, png_bytes = make_xlsx_image(video_id, thumb_map, derivatives)
+    fragment_cache.put(video_id, key, json.dumps([image.width, image.height] if image else None), png_bytes)
+    return values, image
+
+def create_spreadsheet(video_list, thumb_map, output_filename, derivatives=None, streaming=True, rows_per_sheet=0, split_into='sheets', fragment_cache_db=None):
+    """
+    Creates an Excel spreadsheet report.
+    derivatives can map video IDs to their report-sized thumbnails; without one the full image is shrunk here.
+
+    With streaming on, rows are written out as they are added (openpyxl write-only mode), so memory
+    stays roughly flat however many videos there are. rows_per_sheet > 0 starts a new sheet, or a new
+    '_partN' workbook when split_into is 'workbooks', after that many videos.
+    fragment_cache_db is the SQLite file that keeps each row between runs (None to disable).
+    Returns True once every workbook has been saved.
+    """
+    if not video_list: return False
+    fragment_cache = open_fragment_cache(fragment_cache_db, 'xlsx')
+    try:
+        if streaming:
+            return _create_spreadsheet_streaming(video_list, thumb_map, output_filename, derivatives, rows_per_sheet, split_into, fragment_cache)
+        return _create_spreadsheet_in_memory(video_list, thumb_map, output_filename, derivatives, fragment_cache)
+    finally:
+        if fragment_cache:
+            fragment_cache.close()
+
+def _create_spreadsheet_streaming(video_list, thumb_map, output_filename, derivatives, rows_per_sheet, split_into, fragment_cache):
+    logging.info("\nBuilding the Excel spreadsheet (streaming)...")
+    chunk_size = rows_per_sheet if rows_per_sheet > 0 else len(video_list)
+    chunks = [video_list[start:start + chunk_size] for start in range(0, len(video_list), chunk_size)]
+
+    if split_into == 'workbooks' and len(chunks) > 1:
+        saved = True
+        for part, chunk in enumerate(chunks, start=1):
+            part_filename = output_filename.with_name(f"{output_filename.stem}_part{part}{output_filename.suffix}")
+            wb = Workbook(write_only=True)
+            _write_streaming_sheet(wb, SHEET_TITLE, chunk, thumb_map, derivatives, fragment_cache)
+            saved = _save_workbook(wb, part_filename) and saved
+        return saved
+
+    wb = Workbook(write_only=True)
+    for part, chunk in enumerate(chunks, start=1):
+        title = SHEET_TITLE if part == 1 else f"{SHEET_TITLE} ({part})"
+        _write_streaming_sheet(wb, title, chunk, thumb_map, derivatives, fragment_cache)
+    return _save_workbook(wb, output_filename)
+
+def _write_streaming_sheet(wb, title, video_list, thumb_map, derivatives, fragment_cache=None):
+    ws = wb.create_sheet(title)
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+    ws.append(HEADERS)
+
+    for index, video_data in enumerate(video_list, start=2):
+        video_id = video_data.id
+        # Row heights are read when the row is written, so set it first and drop it afterwards.
+        ws.row_dimensions[index].height = ROW_HEIGHT
+
+        (title_text, channel, upload_date, local_path), xlsx_image = make_row(video_data, thumb_map, derivatives, fragment_cache)
+        if xlsx_image:
+            ws.add_image(xlsx_image, f'A{index}')
+
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        url_cell = WriteOnlyCell(ws, value=video_url)
+        url_cell.style = "Hyperlink"
+        # The hyperlink takes its cell reference from the cell's position, so place it before linking.
+        url_cell.row, url_cell.column = index, 4
+        url_cell.hyperlink = video_url
+
+        ws.append([None, title_text, channel, url_cell, upload_date, local_path])
+        del ws.row_dimensions[index]
+
+def _save_workbook(wb, output_filename):
+    """Saves the workbook and returns whether it worked."""
+    try:
+        wb.save(output_filename)
+        logging.info(f"✅ Success! Spreadsheet saved as '{output_filename}'")
+        return True
+    except Exception as e:
+        logging.error(f"❌ Error saving Excel file: {e}")
+        return False
+
+def _create_spreadsheet_in_memory(video_list, thumb_map, output_filename, derivatives=None, fragment_cache=None):
+    """The original, fully in-memory writer. Used when streaming is turned off."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = SHEET_TITLE
+    
+    ws.append(HEADERS)
+
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+
+    logging.info("\nBuilding the Excel spreadsheet...")
+    for index, video_data in enumerate(video_list, start=2):
+        ws.row_dimensions[index].height = ROW_HEIGHT
+        video_id = video_data.id
+
+        (title_text, channel, upload_date, local_path), xlsx_image = make_row(video_data, thumb_map, derivatives, fragment_cache)
+        if xlsx_image:
+            ws.add_image(xlsx_image, f'A{index}')
+
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        ws[f'B{index}'] = title_text
+        ws[f'C{index}'] = channel
+        
+        cell = ws[f'D{index}']
+        cell.value = video_url
+        cell.hyperlink = video_url
+        cell.style = "Hyperlink"
+        
+        ws[f'E{index}'] = upload_date
+        ws[f'F{index}'] = local_path
+
+    return _save_workbook(wb, output_filename)
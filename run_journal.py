@@ -0,0 +1,224 @@
+# run_journal.py
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from video_record import VideoRecord
+
+# Every line is handed to the operating system straight away, so it survives the process crashing, but it is
+# only forced to disk (fsync) this often, or after this many lines. A power cut loses at most that much work,
+# which the next run simply does again.
+SYNC_INTERVAL_SECONDS = 2.0
+SYNC_EVERY_LINES = 200
+
+# The journal is rewritten with only the latest state of each video once it holds this many
+# superseded lines (retries, refreshed thumbnails) for every line still needed.
+COMPACT_RATIO = 1.0
+COMPACT_MIN_LINES = 1000
+
+class RunJournal:
+    """
+    An append-only record of what a run has done so far, so a run that dies part way can carry on where it stopped.
+
+    Each line is one JSON event:
+      {"event": "run", "key": ...}                   starts a run; key identifies its sources and settings
+      {"event": "video", "video": {...}}             a video was fetched (and downloaded, if enabled)
+      {"event": "failed", "id": ..., "reason": ...}  a video failed for good in this attempt
+      {"event": "thumbnail", "id": ..., "path": ...} a thumbnail was fetched (path) or couldn't be (null)
+      {"event": "fetched", "ids": [...]}             every video is in; only the reports are left
+      {"event": "reported"}                          the reports were built; the next run starts over
+
+    On opening, a journal from an unfinished run with the same key is read back: its videos are not fetched
+    again, its failures are retried, and if it got as far as "fetched" the run goes straight to the reports.
+    A video whose downloaded file is missing is read back as not downloaded and listed in lost_downloads
+    (video ID -> the missing path).
+    A torn last line from a crash is ignored.
+    """
+    def __init__(self, path, run_key):
+        self.path = Path(path)
+        self.run_key = run_key
+        self.videos = {}
+        self.failed = {}
+        self.thumbnails = {}
+        self.fetched_ids = None
+        self.lost_downloads = {}
+        self.started_at = time.time()
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        if self.path.exists() and self._load():
+            self.resumed = True
+            logging.info(
+                f"  -> Resuming the unfinished run recorded in '{self.path}': {len(self.videos)} video(s) done, "
+                f"{len(self.failed)} failed video(s) to retry."
+            )
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self.path.stat().st_size and not self._ends_with_newline():
+                # The last line was cut off by a crash; start a new one after it.
+                self._file.write('\n')
+            live_lines = self._live_lines()
+            if self._lines > COMPACT_MIN_LINES and self._lines - live_lines > COMPACT_RATIO * live_lines:
+                self.compact()
+        else:
+            self.resumed = False
+            self.videos, self.failed, self.thumbnails, self.fetched_ids = {}, {}, {}, None
+            self.started_at = time.time()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            with self._lock:
+                self._lines = 0
+                self._write_locked({'event': 'run', 'key': run_key, 'started_at': self.started_at}, sync=True)
+
+    def _load(self):
+        """Reads the journal back. Returns False if it belongs to another run or a finished one."""
+        started = False
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._lines += 1
+                event = entry.get('event')
+                if event == 'run':
+                    if entry.get('key') != self.run_key:
+                        return False
+                    started = True
+                    self.started_at = entry.get('started_at', self.started_at)
+                elif not started:
+                    return False
+                elif event == 'video':
+                    video_data = VideoRecord(**entry['video'])
+                    if video_data.downloaded and not os.path.exists(video_data.video_path):
+                        # yt-dlp prints the info line before it downloads, so the download may have failed
+                        # after the video was recorded. Treat it as not downloaded so it is fetched again.
+                        self.lost_downloads[video_data.id] = video_data.video_path
+                        video_data.video_path = None
+                    else:
+                        self.lost_downloads.pop(video_data.id, None)
+                    self.videos[video_data.id] = video_data
+                    self.failed.pop(video_data.id, None)
+                elif event == 'failed':
+                    if entry['id'] not in self.videos:
+                        self.failed[entry['id']] = entry.get('reason')
+                elif event == 'thumbnail':
+                    self.thumbnails[entry['id']] = entry.get('path')
+                elif event == 'fetched':
+                    self.fetched_ids = entry['ids']
+                elif event == 'reported':
+                    return False
+        return started
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _live_lines(self):
+        return 1 + len(self.videos) + len(self.failed) + len(self.thumbnails) + (self.fetched_ids is not None)
+
+    def _write_locked(self, entry, sync=False):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._lines += 1
+        self._unsynced += 1
+        if sync or self._unsynced >= SYNC_EVERY_LINES or time.monotonic() - self._last_sync >= SYNC_INTERVAL_SECONDS:
+            self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def record_video(self, video_data):
+        with self._lock:
+            self.videos[video_data.id] = video_data
+            self.failed.pop(video_data.id, None)
+            self.lost_downloads.pop(video_data.id, None)
+            self._write_locked({'event': 'video', 'video': _video_fields(video_data)})
+
+    def record_failure(self, video_id, reason):
+        with self._lock:
+            self.failed[video_id] = reason
+            self._write_locked({'event': 'failed', 'id': video_id, 'reason': reason})
+
+    def record_thumbnail(self, video_id, path):
+        path = str(path) if path else None
+        with self._lock:
+            if video_id in self.thumbnails and self.thumbnails[video_id] == path:
+                return
+            self.thumbnails[video_id] = path
+            self._write_locked({'event': 'thumbnail', 'id': video_id, 'path': path})
+
+    def thumbnail(self, video_id):
+        """The thumbnail recorded for a video, if it is still on disk."""
+        path = self.thumbnails.get(video_id)
+        return Path(path) if path and os.path.exists(path) else None
+
+    def record_fetched(self, video_list):
+        """
+        Marks the fetching as finished, so a restart goes straight to the reports. video_list is every video of the
+        run, including those that came from a cache and were never recorded; the journal is compacted to hold them all.
+        """
+        with self._lock:
+            for video_data in video_list:
+                self.videos.setdefault(video_data.id, video_data)
+            self.fetched_ids = [video_data.id for video_data in video_list]
+        self.compact()
+
+    def record_reported(self):
+        """Marks the run as finished, so the next one starts from scratch."""
+        with self._lock:
+            self._write_locked({'event': 'reported', 'finished_at': time.time()}, sync=True)
+
+    def compact(self):
+        """Rewrites the journal with one line per video, dropping superseded ones. Safe against crashes."""
+        with self._lock:
+            self._sync()
+            entries = [{'event': 'run', 'key': self.run_key, 'started_at': self.started_at}]
+            # A lost download keeps its old path, so the next run notices it is missing as well.
+            entries += [
+                {'event': 'video', 'video': _video_fields(video_data, self.lost_downloads.get(video_data.id))}
+                for video_data in self.videos.values()
+            ]
+            entries += [{'event': 'failed', 'id': video_id, 'reason': reason} for video_id, reason in self.failed.items()]
+            entries += [{'event': 'thumbnail', 'id': video_id, 'path': path} for video_id, path in self.thumbnails.items()]
+            if self.fetched_ids is not None:
+                entries.append({'event': 'fetched', 'ids': self.fetched_ids})
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._lines = len(entries)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+def _video_fields(video_data, lost_path=None):
+    fields = {field: getattr(video_data, field) for field in VideoRecord.__slots__}
+    if lost_path:
+        fields['video_path'] = lost_path
+    return fields
+
+def open_run_journal(path_str, run_key):
+    """Opens the run journal configured in config.ini, or returns None when it is disabled or unusable."""
+    if not path_str:
+        return None
+    try:
+        return RunJournal(Path(path_str), run_key)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        logging.error(f"Could not open the run journal '{path_str}'. Continuing without it. Error: {e}")
+        return None
@@ -0,0 +1,202 @@
+# subprocess_io.py
+
+import collections
+import logging
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+
+# yt-dlp is asked to print its download progress in this form (see build_ytdlp_args), one line per update,
+# so it can be parsed instead of shown. The marker tells these lines apart from the info JSON on stdout.
+PROGRESS_MARKER = '[ledger-progress]'
+PROGRESS_TEMPLATE = (
+    PROGRESS_MARKER + ' %(info.id)s %(progress.status)s %(progress.downloaded_bytes)s '
+    '%(progress.total_bytes,progress.total_bytes_estimate)s %(progress.speed)s %(progress.eta)s'
+)
+
+# One progress update of one download. Sizes are in bytes, speed in bytes per second; None when yt-dlp doesn't know.
+ProgressEvent = collections.namedtuple('ProgressEvent', 'video_id status downloaded_bytes total_bytes speed eta')
+
+READ_SIZE = 64 * 1024
+
+def parse_progress_line(line):
+    """Returns the ProgressEvent for a line printed through PROGRESS_TEMPLATE, or None for any other line."""
+    if not line.startswith(PROGRESS_MARKER):
+        return None
+    parts = line[len(PROGRESS_MARKER):].split()
+    if len(parts) != 6:
+        return None
+    video_id, status, *numbers = parts
+    values = []
+    for number in numbers:
+        try:
+            values.append(float(number))
+        except ValueError:  # 'NA'
+            values.append(None)
+    return ProgressEvent(video_id, status, *values)
+
+def format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size:.0f} B"
+        size /= 1024
+
+class ProgressTracker:
+    """
+    Adds up the progress of every download running at once and logs a single line for all of them at most
+    once every interval seconds, rather than a line for every update of every yt-dlp process.
+    A video downloaded as separate video and audio formats counts the finished formats plus the current one.
+    """
+    def __init__(self, interval=10.0):
+        self.interval = interval
+        self._videos = {}  # {video_id: [bytes of finished formats, downloaded of current, total of current, speed]}
+        self._lock = threading.Lock()
+        self._next_log = time.monotonic() + interval
+
+    def update(self, event):
+        with self._lock:
+            state = self._videos.setdefault(event.video_id, [0.0, 0.0, 0.0, 0.0])
+            if event.status == 'finished':
+                state[0] += event.total_bytes or event.downloaded_bytes or 0
+                state[1] = state[2] = state[3] = 0.0
+            else:
+                state[1] = event.downloaded_bytes or 0
+                state[2] = max(event.total_bytes or 0, state[1])
+                state[3] = event.speed or 0
+            now = time.monotonic()
+            if now < self._next_log:
+                return
+            self._next_log = now + self.interval
+            downloaded = sum(done + current for done, current, _, _ in self._videos.values())
+            total = sum(done + size for done, _, size, _ in self._videos.values())
+            speed = sum(state[3] for state in self._videos.values())
+            active = len(self._videos)
+        logging.info(f"  -> Downloading {active} video(s): {format_bytes(downloaded)} of about {format_bytes(total)} at {format_bytes(speed)}/s.")
+
+    def finish(self, video_id):
+        """Stops counting a video once its yt-dlp run is over."""
+        with self._lock:
+            self._videos.pop(video_id, None)
+
+class _Stream:
+    """A pipe being read by PipeReader, with its unfinished last line."""
+    __slots__ = ('file', 'on_line', 'on_close', 'buffer')
+
+    def __init__(self, file, on_line, on_close):
+        self.file = file
+        self.on_line = on_line
+        self.on_close = on_close
+        self.buffer = b''
+
+    def feed(self, data):
+        # Progress bars redraw with '\r'; treat it as the end of a line too.
+        lines = (self.buffer + data).replace(b'\r', b'\n').split(b'\n')
+        self.buffer = lines.pop()
+        for line in lines:
+            self.emit(line)
+
+    def emit(self, line):
+        if not line:
+            return
+        try:
+            self.on_line(line.decode('utf-8', errors='replace'))
+        except Exception as e:
+            # The callback runs on the reader thread, which must keep serving the other pipes.
+            logging.error(f"Could not handle a line of yt-dlp output. Error: {e}")
+
+class PipeReader:
+    """
+    Reads the stdout and stderr of every child process on a single thread, using a selector, instead of
+    one thread per pipe. The thread is started on first use and serves every caller in the process.
+
+    Windows can't select on pipes, so there each pipe gets its own thread as before.
+    """
+    def __init__(self):
+        self._selector = selectors.DefaultSelector() if sys.platform != 'win32' else None
+        self._waiting = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wakeup_read = self._wakeup_write = None
+
+    def run(self, command, on_stdout_line, on_stderr_line):
+        """
+        Runs command to completion and returns its exit code. Each line it prints is passed to on_stdout_line or
+        on_stderr_line as it arrives, from the reader thread, so the callbacks should be quick.
+        Raises FileNotFoundError if the program doesn't exist, like subprocess.
+        """
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if self._selector is None:
+            threads = [
+                threading.Thread(target=self._read_blocking, args=(_Stream(pipe, on_line, None),))
+                for pipe, on_line in ((process.stdout, on_stdout_line), (process.stderr, on_stderr_line))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return process.wait()
+
+        open_pipes = [2]
+        closed = threading.Event()
+
+        def on_close():
+            # Only ever called from the reader thread.
+            open_pipes[0] -= 1
+            if not open_pipes[0]:
+                closed.set()
+
+        self._add(_Stream(process.stdout, on_stdout_line, on_close))
+        self._add(_Stream(process.stderr, on_stderr_line, on_close))
+        closed.wait()
+        return process.wait()
+
+    @staticmethod
+    def _read_blocking(stream):
+        with stream.file:
+            for data in iter(lambda: stream.file.read1(READ_SIZE), b''):
+                stream.feed(data)
+        stream.emit(stream.buffer)
+
+    def _add(self, stream):
+        with self._lock:
+            if self._thread is None:
+                self._wakeup_read, self._wakeup_write = os.pipe()
+                self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+                self._thread = threading.Thread(target=self._loop, name='pipe-reader', daemon=True)
+                self._thread.start()
+            self._waiting.append(stream)
+        os.write(self._wakeup_write, b'.')
+
+    def _loop(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.fileobj == self._wakeup_read:
+                    os.read(self._wakeup_read, READ_SIZE)
+                    with self._lock:
+                        waiting, self._waiting = self._waiting, []
+                    for stream in waiting:
+                        self._selector.register(stream.file, selectors.EVENT_READ, stream)
+                    continue
+                stream = key.data
+                data = os.read(stream.file.fileno(), READ_SIZE)
+                if data:
+                    stream.feed(data)
+                    continue
+                self._selector.unregister(stream.file)
+                stream.file.close()
+                stream.emit(stream.buffer)
+                stream.on_close()
+
+_pipe_reader = None
+_pipe_reader_lock = threading.Lock()
+
+def pipe_reader():
+    """The process-wide PipeReader."""
+    global _pipe_reader
+    with _pipe_reader_lock:
+        if _pipe_reader is None:
+            _pipe_reader = PipeReader()
+        return _pipe_reader
@@ -0,0 +1,8 @@
+# conftest.py
+#
+# The modules under test live at the top of the repository, next to main.py.
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
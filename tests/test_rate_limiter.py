@@ -0,0 +1,72 @@
+# test_rate_limiter.py
+
+import time
+
+from rate_limiter import FAILED, OK, THROTTLED, AdaptiveLimiter, RetryQueue
+
+def no_backoff(limiter):
+    """Makes the limiter's pauses and retry delays zero so the tests never sleep."""
+    limiter.backoff_seconds = 0
+    return limiter
+
+def test_throttle_halves_the_limit_down_to_min_limit():
+    limiter = no_backoff(AdaptiveLimiter('test', 16, min_limit=3))
+    assert limiter.limit == 16
+    for expected in (8, 4, 3, 3):
+        limiter.release(limiter.acquire(), THROTTLED)
+        assert limiter.limit == expected
+
+def test_failure_shrinks_the_limit_by_a_quarter():
+    limiter = no_backoff(AdaptiveLimiter('test', 8))
+    limiter.release(limiter.acquire(), FAILED)
+    assert limiter.limit == 6
+
+def test_only_one_decrease_per_round():
+    limiter = no_backoff(AdaptiveLimiter('test', 16))
+    tickets = [limiter.acquire() for _ in range(4)]
+    for ticket in tickets:
+        limiter.release(ticket, THROTTLED)
+    assert limiter.limit == 8
+    assert limiter.in_flight == 0
+
+def test_successes_grow_the_limit_back_to_max_limit():
+    limiter = no_backoff(AdaptiveLimiter('test', 8))
+    limiter.release(limiter.acquire(), THROTTLED)
+    limiter.release(limiter.acquire(), THROTTLED)
+    assert limiter.limit == 2
+    for _ in range(100):
+        limiter.release(limiter.acquire(), OK)
+    assert limiter.limit == 8
+
+def test_slot_counts_an_exception_as_a_failure():
+    limiter = no_backoff(AdaptiveLimiter('test', 4))
+    try:
+        with limiter.slot():
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert limiter.limit == 3
+    assert limiter.in_flight == 0
+
+def test_throttle_pauses_new_requests():
+    limiter = AdaptiveLimiter('test', 4, backoff_seconds=60)
+    limiter.backoff_delay = lambda attempt: 60
+    limiter.release(limiter.acquire(), THROTTLED)
+    assert limiter.paused_until - time.monotonic() > 50
+
+def test_retries_stop_after_max_retries():
+    queue = RetryQueue(no_backoff(AdaptiveLimiter('test', 4)), max_retries=2)
+    item, attempt = 'vid1', 0
+    while queue.add(item, attempt):
+        [(item, attempt)] = queue.pop_due()
+    assert attempt == 2
+    assert len(queue) == 0
+    assert queue.next_due_in() is None
+
+def test_retries_wait_for_their_backoff():
+    limiter = AdaptiveLimiter('test', 4)
+    limiter.backoff_delay = lambda attempt: 60
+    queue = RetryQueue(limiter, max_retries=3)
+    assert queue.add('vid1', 0)
+    assert queue.pop_due() == []
+    assert 0 < queue.next_due_in() <= 60
@@ -0,0 +1,154 @@
+# test_run_journal.py
+
+from run_journal import RunJournal
+from video_record import VideoRecord
+
+def interrupted_run(path, key='key-a'):
+    """A run that fetched two videos, lost one and then died before the reports."""
+    journal = RunJournal(path, key)
+    journal.record_video(VideoRecord('vid1', title='First'))
+    journal.record_video(VideoRecord('vid2', title='Second'))
+    journal.record_failure('vid3', 'throttled')
+    journal.close()
+
+def test_resume_keeps_finished_videos_and_retries_failed_ones(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    interrupted_run(path)
+
+    journal = RunJournal(path, 'key-a')
+    assert journal.resumed
+    assert set(journal.videos) == {'vid1', 'vid2'}
+    assert journal.videos['vid1'].title == 'First'
+    assert journal.failed == {'vid3': 'throttled'}
+    assert journal.fetched_ids is None
+
+    journal.record_video(VideoRecord('vid3', title='Third'))
+    journal.close()
+    journal = RunJournal(path, 'key-a')
+    assert set(journal.videos) == {'vid1', 'vid2', 'vid3'}
+    assert journal.failed == {}
+    journal.close()
+
+def test_resume_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    interrupted_run(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "video", "video": {"id": "vi')
+
+    journal = RunJournal(path, 'key-a')
+    assert journal.resumed
+    assert set(journal.videos) == {'vid1', 'vid2'}
+    journal.record_video(VideoRecord('vid4'))
+    journal.close()
+    assert set(RunJournal(path, 'key-a').videos) == {'vid1', 'vid2', 'vid4'}
+
+def test_fetched_run_goes_straight_to_the_reports(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = RunJournal(path, 'key-a')
+    journal.record_video(VideoRecord('vid1'))
+    journal.record_fetched([VideoRecord('vid1'), VideoRecord('cached')])
+    journal.close()
+
+    journal = RunJournal(path, 'key-a')
+    assert journal.resumed
+    assert journal.fetched_ids == ['vid1', 'cached']
+    assert set(journal.videos) == {'vid1', 'cached'}
+    journal.close()
+
+def test_reported_run_starts_a_fresh_journal(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = RunJournal(path, 'key-a')
+    journal.record_video(VideoRecord('vid1'))
+    journal.record_reported()
+    journal.close()
+
+    journal = RunJournal(path, 'key-a')
+    assert not journal.resumed
+    assert journal.videos == {}
+    journal.close()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+def test_changed_run_key_discards_the_old_journal(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    interrupted_run(path, key='key-a')
+
+    journal = RunJournal(path, 'key-b')
+    assert not journal.resumed
+    assert journal.videos == {} and journal.failed == {}
+    journal.close()
+    assert not RunJournal(path, 'key-a').resumed
+
+def test_thumbnail_is_only_trusted_while_the_file_exists(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    thumb = tmp_path / 'vid1.jpg'
+    thumb.write_bytes(b'jpeg')
+    journal = RunJournal(path, 'key-a')
+    journal.record_thumbnail('vid1', thumb)
+    journal.record_thumbnail('vid2', None)
+    journal.close()
+
+    journal = RunJournal(path, 'key-a')
+    assert journal.thumbnail('vid1') == thumb
+    assert journal.thumbnail('vid2') is None
+    thumb.unlink()
+    assert journal.thumbnail('vid1') is None
+    journal.close()
+
+def test_compaction_keeps_the_latest_state(tmp_path, monkeypatch):
+    monkeypatch.setattr('run_journal.COMPACT_MIN_LINES', 10)
+    path = tmp_path / 'journal.jsonl'
+    journal = RunJournal(path, 'key-a')
+    for attempt in range(20):
+        journal.record_failure('vid1', f'attempt {attempt}')
+    journal.record_video(VideoRecord('vid2', title='Kept'))
+    journal.close()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 22
+
+    journal = RunJournal(path, 'key-a')
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 3
+    assert journal.failed == {'vid1': 'attempt 19'}
+    assert journal.videos['vid2'].title == 'Kept'
+    journal.record_video(VideoRecord('vid1'))
+    journal.close()
+
+    journal = RunJournal(path, 'key-a')
+    assert set(journal.videos) == {'vid1', 'vid2'} and journal.failed == {}
+    journal.close()
+
+def test_syncs_are_batched(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr('run_journal.os.fsync', synced.append)
+    monkeypatch.setattr('run_journal.SYNC_INTERVAL_SECONDS', 3600)
+    monkeypatch.setattr('run_journal.SYNC_EVERY_LINES', 5)
+    journal = RunJournal(tmp_path / 'journal.jsonl', 'key-a')
+    assert len(synced) == 1  # the "run" line
+    for index in range(10):
+        journal.record_failure(f'vid{index}', 'failed')
+    assert len(synced) == 3
+    journal.close()
+    assert len(synced) == 4
+
+def test_missing_download_is_read_back_as_not_downloaded(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    kept = tmp_path / 'kept.mp4'
+    kept.write_bytes(b'mp4')
+    journal = RunJournal(path, 'key-a')
+    journal.record_video(VideoRecord('kept', video_path=kept))
+    journal.record_video(VideoRecord('lost', video_path=tmp_path / 'lost.mp4'))
+    journal.record_fetched(list(journal.videos.values()))
+    journal.close()
+
+    journal = RunJournal(path, 'key-a')
+    assert journal.videos['kept'].downloaded
+    assert not journal.videos['lost'].downloaded
+    assert journal.lost_downloads == {'lost': str(tmp_path / 'lost.mp4')}
+
+    # Compacting keeps the missing path, so the loss is noticed again after a crash.
+    journal.compact()
+    journal.close()
+    journal = RunJournal(path, 'key-a')
+    assert set(journal.lost_downloads) == {'lost'}
+
+    journal.record_video(VideoRecord('lost', video_path=kept))
+    assert journal.lost_downloads == {}
+    journal.close()
@@ -0,0 +1,240 @@
+# thumb_cache.py
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import instrumentation
+
+INDEX_FILENAME = 'thumbs_index.json'
+CHUNK_SIZE = 64 * 1024
+
+# The only files cleanup() may delete: cached '<video_id>.jpg' thumbnails, '.part' files left by interrupted
+# downloads, and the '<title> [<video_id>].jpg' names of older versions. Anything else in the folder is left alone,
+# in case thumbs_folder is shared with videos or other files.
+OWNED_FILE = re.compile(r'^(?:[0-9A-Za-z_-]{11}\.jpg(?:\.\d+\.part)?|.* \[[0-9A-Za-z_-]{11}\]\.jpg)$')
+
+def create_session(connections_per_host=10, max_hosts=10):
+    """
+    A requests session sized for the thumbnail workers.
+
+    requests keeps at most 10 idle connections per host by default, so more workers than that keep
+    opening and discarding connections. Here each host gets connections_per_host keep-alive connections,
+    and workers beyond that wait for a free one instead of opening another, which also caps how hard any
+    one host is hit. max_hosts is how many hosts' pools are kept; YouTube serves thumbnails from a few.
+    Retries are left to the rate limiter.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max(1, connections_per_host), pool_block=True, max_retries=0)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class LazySession:
+    """
+    Stands in for the session from create_session() and only creates it for the first request,
+    so a run that finds every thumbnail fresh in the cache never loads requests at all.
+    """
+    def __init__(self, connections_per_host=10):
+        self.connections_per_host = connections_per_host
+        self._session = None
+        self._lock = threading.Lock()
+
+    def get(self, *args, **kwargs):
+        with self._lock:
+            if self._session is None:
+                self._session = create_session(self.connections_per_host)
+        return self._session.get(*args, **kwargs)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+class ThumbnailCache:
+    """
+    Thumbnails stored as '<video_id>.jpg' with a small JSON index next to them.
+
+    The index keeps each thumbnail's source URL and HTTP validators (ETag / Last-Modified), so a
+    thumbnail that was checked recently is reused as-is and an older one is revalidated with a
+    conditional GET. A retitled video keeps its cached file because the name only uses the ID.
+
+    shared, if given, is a dict that several caches fill with {url: (path, index entry)}. In batch mode
+    every ledger's cache gets the same dict, so a thumbnail already fetched into another ledger's folder
+    during the run is linked or copied from there instead of being downloaded again.
+    """
+    def __init__(self, folder, max_size_mb=0, max_age_days=0, revalidate_hours=24, timeout=15, shared=None):
+        self.folder = Path(folder)
+        self.shared = shared
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 86400
+        self.revalidate_seconds = revalidate_hours * 3600
+        self.timeout = timeout
+        self.index_path = self.folder / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return {}
+        try:
+            return json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logging.warning(f"  > Thumbnail index '{self.index_path}' is unreadable and will be rebuilt. Error: {e}")
+            return {}
+
+    def path_for(self, video_id):
+        return self.folder / f"{video_id}.jpg"
+
+    def fetch(self, video_id, url, session):
+        """
+        Returns the local path of the thumbnail for video_id, downloading or revalidating it if needed.
+        Raises requests' exceptions if the download fails.
+        """
+        path = self.path_for(video_id)
+        now = time.time()
+        with self._lock:
+            entry = self.index.get(video_id)
+            if entry and (entry.get('url') != url or not path.exists()):
+                entry = None
+            if entry:
+                entry['last_used'] = now
+                if now - entry.get('checked_at', 0) < self.revalidate_seconds:
+                    instrumentation.count('thumbnail_cache.fresh')
+                    self._share(url, path, entry)
+                    return path
+            elif self._copy_shared(video_id, url, path, now):
+                instrumentation.count('thumbnail_cache.shared')
+                return path
+            headers = {}
+            if entry and entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry and entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with session.get(url, headers=headers, timeout=self.timeout, stream=True) as res:
+            if res.status_code == 304 and entry:
+                with self._lock:
+                    entry['checked_at'] = now
+                    self._share(url, path, entry)
+                instrumentation.count('thumbnail_cache.not_modified')
+                return path
+            res.raise_for_status()
+
+            # Stream into a temporary file so an interrupted download never leaves a truncated image,
+            # and the image is never held in memory as a whole.
+            # The name is unique per thread, in case the same video is fetched twice at once.
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+            size = 0
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in res.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        size += len(chunk)
+                os.replace(tmp_path, path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        instrumentation.count('thumbnail_cache.downloaded')
+        instrumentation.count('bytes.thumbnails', size)
+
+        with self._lock:
+            self.index[video_id] = {
+                'url': url,
+                'etag': res.headers.get('ETag'),
+                'last_modified': res.headers.get('Last-Modified'),
+                'size': size,
+                'checked_at': now,
+                'last_used': now,
+            }
+            self._share(url, path, self.index[video_id])
+        return path
+
+    def cached(self, video_id):
+        """Returns the cached thumbnail for video_id however old it is, or None, without any request."""
+        path = self.path_for(video_id)
+        with self._lock:
+            entry = self.index.get(video_id)
+            if not entry or not path.exists():
+                return None
+            entry['last_used'] = time.time()
+        instrumentation.count('thumbnail_cache.offline')
+        return path
+
+    def _share(self, url, path, entry):
+        if self.shared is not None:
+            self.shared[url] = (path, dict(entry))
+
+    def _copy_shared(self, video_id, url, path, now):
+        """Takes a thumbnail another cache fetched this run. Called with the lock held. Returns False if there is none."""
+        if self.shared is None or url not in self.shared:
+            return False
+        source, source_entry = self.shared[url]
+        if source != path:
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+            try:
+                try:
+                    # A hard link costs nothing. Downloads replace files rather than rewriting them, so the two never clash.
+                    os.link(source, tmp_path)
+                except OSError:
+                    shutil.copyfile(source, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+                return False
+        self.index[video_id] = dict(source_entry, last_used=now)
+        return True
+
+    def cleanup(self, keep_ids=()):
+        """
+        Removes orphaned files and index entries, then evicts the least recently used thumbnails
+        that are past max_age_days or over max_size_mb. Thumbnails in keep_ids are never evicted.
+        """
+        keep_ids = set(keep_ids)
+        removed = 0
+        with self._lock:
+            # Index entries whose file has gone missing.
+            for video_id in [vid for vid in self.index if not self.path_for(vid).exists()]:
+                del self.index[video_id]
+
+            # Thumbnail files nobody indexes, such as title-based names from older versions or stale '.part' files.
+            indexed_names = {self.path_for(vid).name for vid in self.index}
+            for file_path in self.folder.iterdir():
+                if file_path.is_file() and OWNED_FILE.match(file_path.name) and file_path.name not in indexed_names:
+                    file_path.unlink()
+                    removed += 1
+
+            now = time.time()
+            by_last_use = sorted(self.index.items(), key=lambda item: item[1].get('last_used', 0))
+            total_size = sum(entry.get('size', 0) for _, entry in by_last_use)
+            for video_id, entry in by_last_use:
+                if video_id in keep_ids:
+                    continue
+                too_old = self.max_age_seconds and now - entry.get('last_used', 0) > self.max_age_seconds
+                too_big = self.max_size_bytes and total_size > self.max_size_bytes
+                if not (too_old or too_big):
+                    continue
+                self.path_for(video_id).unlink(missing_ok=True)
+                total_size -= entry.get('size', 0)
+                del self.index[video_id]
+                removed += 1
+
+        if removed:
+            logging.info(f"  -> Removed {removed} orphaned or evicted thumbnail file(s) from '{self.folder}'.")
+        self.save()
+
+    def save(self):
+        """Writes the index atomically."""
+        with self._lock:
+            data = json.dumps(self.index, indent=1)
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        tmp_path.write_text(data, encoding='utf-8')
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,132 @@
+# thumb_derivatives.py
+
+import concurrent.futures
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+
+# The PDF draws thumbnails in a 64 x 36 mm box.
+PDF_THUMB_MM = (64, 36)
+
+def derivative_specs(pdf_dpi=150, html_format='jpeg'):
+    """Returns {kind: (max_size, pillow_format, extension)} for the variants each report uses."""
+    pdf_size = tuple(round(mm / 25.4 * pdf_dpi) for mm in PDF_THUMB_MM)
+    html_format = html_format.lower()
+    html_spec = ((320, 180), 'WEBP', '.webp') if html_format == 'webp' else ((320, 180), 'JPEG', '.jpg')
+    return {
+        'xlsx': ((120, 90), 'PNG', '.png'),
+        'pdf': (pdf_size, 'JPEG', '.jpg'),
+        'html': html_spec,
+    }
+
+def source_hash(source_path):
+    """Hashes a thumbnail's bytes. Derivatives are named after it, so identical images share their variants."""
+    return hashlib.sha1(Path(source_path).read_bytes()).hexdigest()[:20]
+
+def build_derivatives(source_path, cache_dir, specs):
+    """
+    Makes every variant in specs for one thumbnail, skipping the ones already cached.
+    Runs in a worker process. Returns (source_hash, {kind: path}).
+    """
+    digest = source_hash(source_path)
+    paths = {kind: Path(cache_dir) / f"{digest}_{kind}{ext}" for kind, (_, _, ext) in specs.items()}
+    missing = [kind for kind, path in paths.items() if not path.exists()]
+
+    if missing:
+        from PIL import Image
+        with Image.open(source_path) as img:
+            img = img.convert('RGB')
+            for kind in missing:
+                if paths[kind].exists():
+                    # Another worker made it from identical bytes in the meantime.
+                    continue
+                max_size, image_format, _ = specs[kind]
+                variant = img.copy()
+                variant.thumbnail(max_size)
+                # Named per process: workers given identical images (placeholders, shared thumbnails) write the same variant.
+                tmp_path = paths[kind].with_name(f"{paths[kind].name}.{os.getpid()}.part")
+                save_options = {'quality': 85, 'optimize': True} if image_format in ('JPEG', 'WEBP') else {'optimize': True}
+                try:
+                    variant.save(tmp_path, format=image_format, **save_options)
+                    os.replace(tmp_path, paths[kind])
+                except OSError:
+                    tmp_path.unlink(missing_ok=True)
+                    if not paths[kind].exists():
+                        raise
+
+    # Mark cached variants as used so cleanup() keeps them.
+    now = time.time()
+    for kind, path in paths.items():
+        if kind not in missing:
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                pass
+    return digest, paths
+
+class DerivativeBuilder:
+    """
+    Produces the report-sized thumbnail variants once, in a process pool, so the XLSX, HTML and PDF
+    writers all reuse the same small files instead of each handling the full-size image.
+
+    executor can be a process pool shared with other builders, as in batch mode. It is left running by finish().
+    """
+    def __init__(self, cache_dir, max_workers=None, pdf_dpi=150, html_format='jpeg', executor=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.specs = derivative_specs(pdf_dpi, html_format)
+        self.derivatives = {}
+        self.used_hashes = set()
+        self._owns_executor = executor is None
+        self._executor = executor or concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or None)
+        self._futures = []
+
+    def submit(self, video_id, source_path):
+        """Queues one thumbnail. The returned future resolves to its {kind: path} map, or None on failure."""
+        future = self._executor.submit(build_derivatives, source_path, self.cache_dir, self.specs)
+        result = concurrent.futures.Future()
+
+        def done(worker_future):
+            try:
+                digest, paths = worker_future.result()
+            except Exception as e:
+                logging.warning(f"  > Warning: Could not make report thumbnails for {video_id}. Error: {e}")
+                result.set_result(None)
+                return
+            self.used_hashes.add(digest)
+            self.derivatives[video_id] = paths
+            result.set_result(paths)
+
+        future.add_done_callback(done)
+        self._futures.append(result)
+        return result
+
+    def build_all(self, thumb_map):
+        """Builds the variants for every thumbnail in thumb_map and waits for them."""
+        futures = [self.submit(video_id, path) for video_id, path in thumb_map.items()]
+        concurrent.futures.wait(futures)
+        return self.derivatives
+
+    def finish(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        else:
+            concurrent.futures.wait(self._futures)
+        self._futures.clear()
+        return self.derivatives
+
+    def cleanup(self, max_age_days=0):
+        """Removes variants that this run didn't use and that haven't been used for max_age_days (0 keeps them)."""
+        if not max_age_days:
+            return
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for file_path in self.cache_dir.iterdir():
+            digest = file_path.name.split('_', 1)[0]
+            if digest not in self.used_hashes and file_path.stat().st_mtime < cutoff:
+                file_path.unlink()
+                removed += 1
+        if removed:
+            logging.info(f"  -> Removed {removed} unused report thumbnail(s) from '{self.cache_dir}'.")
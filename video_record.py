@@ -0,0 +1,77 @@
+# video_record.py
+
+import json
+import sys
+from datetime import datetime
+
+# Characters of a description kept in memory. The PDF shows the first 90 (report_pdf.MAX_DESC_CHARS) and needs
+# one more to know when to add "..."; the other reports don't show it. The full text is kept in the metadata
+# store and, for downloaded videos, in the .meta.json file next to the video.
+DESCRIPTION_CHARS = 100
+
+# What the reports show for a video that wasn't downloaded.
+NOT_DOWNLOADED = "Not Downloaded"
+
+# The only keys read from yt-dlp's info JSON.
+INFO_KEYS = ('id', 'title', 'channel', 'thumbnail', 'upload_date', 'description', '_filename', 'webpage_url')
+
+class VideoRecord:
+    """
+    One video as the report writers see it.
+
+    Runs of tens of thousands of videos keep every record in memory until the reports are done, so it is kept
+    small: slots instead of a dict, channel names and dates interned (a playlist has few channels and fewer
+    upload days than videos), the local file as a string (None when not downloaded) rather than a Path, and the
+    description cut to DESCRIPTION_CHARS once it has been stored (see truncate_description).
+    """
+    __slots__ = ('id', 'title', 'channel', 'thumbnail_url', 'upload_date', 'video_path', 'description')
+
+    def __init__(self, id, title='N/A', channel='N/A', thumbnail_url=None, upload_date='N/A', video_path=None, description=''):
+        self.id = id
+        self.title = title if title is not None else 'N/A'
+        self.channel = sys.intern(channel) if channel else 'N/A'
+        self.thumbnail_url = thumbnail_url
+        self.upload_date = sys.intern(upload_date) if upload_date else 'N/A'
+        self.video_path = str(video_path) if video_path and str(video_path) != NOT_DOWNLOADED else None
+        self.description = description if description is not None else ''
+
+    @classmethod
+    def from_ytdlp(cls, info):
+        """Builds a record from yt-dlp's info dict. The description is kept whole until truncate_description()."""
+        upload_date_raw = info.get('upload_date')
+        return cls(
+            id=info.get('id'),
+            title=info.get('title', 'N/A'),
+            channel=info.get('channel', 'N/A'),
+            thumbnail_url=info.get('thumbnail'),
+            upload_date=datetime.strptime(upload_date_raw, '%Y%m%d').strftime('%Y-%m-%d') if upload_date_raw else "N/A",
+            video_path=info.get('_filename'),
+            description=info.get('description', 'N/A'),
+        )
+
+    @property
+    def downloaded(self):
+        return self.video_path is not None
+
+    def truncate_description(self):
+        """Drops all but the start of the description, once the full text has been stored."""
+        if len(self.description) > DESCRIPTION_CHARS:
+            self.description = self.description[:DESCRIPTION_CHARS]
+
+    def replace(self, **changes):
+        """Returns a copy with some fields changed."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return VideoRecord(**fields)
+
+    def __repr__(self):
+        return f"VideoRecord(id={self.id!r}, title={self.title!r})"
+
+def parse_info_line(line):
+    """
+    Reads the info JSON line yt-dlp prints for a video and keeps only INFO_KEYS.
+    The line can run to hundreds of kilobytes of formats and subtitle tables; the parsed dict is dropped
+    as soon as the few keys have been copied out of it.
+    """
+    info = json.loads(line)
+    return {key: info[key] for key in INFO_KEYS if key in info}
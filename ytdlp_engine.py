@@ -0,0 +1,109 @@
+# ytdlp_engine.py
+
+import logging
+import threading
+
+from download_scheduler import MERGE_MARKER
+from subprocess_io import parse_progress_line
+
+class _LedgerLogger:
+    """Routes yt-dlp's messages into our logging, mirroring what log_ytdlp_line does for stderr."""
+    def __init__(self):
+        self.log = logging
+        self.on_progress = None
+
+    def debug(self, message):
+        # Screen output arrives here as debug messages. --print-json keeps the
+        # command-line tool quiet, so these are dropped to match it, apart from
+        # the progress lines asked for with --progress-template.
+        if self.on_progress:
+            event = parse_progress_line(message)
+            if event:
+                self.on_progress(event)
+
+    def info(self, message):
+        self.log.info(f"[yt-dlp] {message}")
+
+    def warning(self, message):
+        self.log.warning(f"[yt-dlp] WARNING: {message}")
+
+    def error(self, message):
+        self.log.warning(f"[yt-dlp] {message}")
+
+class InProcessEngine:
+    """
+    Runs yt-dlp inside this interpreter instead of spawning one process per video.
+
+    The options are parsed once from the same argument list the subprocess path uses, so
+    both engines behave identically. Each worker thread gets its own long-lived YoutubeDL
+    instance, which keeps its HTTP session, extractor cache and cookies between videos.
+    """
+    def __init__(self, yt_dlp_module, ytdlp_args):
+        self._yt_dlp = yt_dlp_module
+        self._ydl_opts = yt_dlp_module.parse_options(ytdlp_args).ydl_opts
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+
+        class CapturingYoutubeDL(yt_dlp_module.YoutubeDL):
+            # --print-json output goes through to_stdout; keep it instead of printing it.
+            def to_stdout(self, message, skip_eol=False, quiet=None):
+                if message.startswith(MERGE_MARKER):
+                    # Printed in this worker thread right before the merge, so the merge can wait here for a slot.
+                    if self.on_merge:
+                        self.on_merge(wait=True)
+                    return
+                self.stdout_lines.append(message)
+
+        self._ydl_class = CapturingYoutubeDL
+
+    def _get_ydl(self):
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            logger = _LedgerLogger()
+            ydl = self._ydl_class(dict(self._ydl_opts, logger=logger))
+            ydl.ledger_logger = logger
+            ydl.stdout_lines = []
+            ydl.on_merge = None
+            self._local.ydl = ydl
+            with self._lock:
+                self._instances.append(ydl)
+        return ydl
+
+    def run(self, video_url, log=logging, on_progress=None, on_merge=None):
+        """
+        Processes one video and returns the lines yt-dlp would have written to stdout.
+        Download progress is passed to on_progress as ProgressEvents, and on_merge(wait=True) is called
+        before the merge starts.
+        """
+        ydl = self._get_ydl()
+        ydl.ledger_logger.log = log
+        ydl.ledger_logger.on_progress = on_progress
+        ydl.on_merge = on_merge
+        ydl.stdout_lines = []
+        try:
+            ydl.download([video_url])
+        finally:
+            ydl.ledger_logger.log = logging
+            ydl.ledger_logger.on_progress = None
+            ydl.on_merge = None
+        return ydl.stdout_lines
+
+    def close(self):
+        """Closes every YoutubeDL instance, saving cookies and releasing their HTTP sessions."""
+        with self._lock:
+            for ydl in self._instances:
+                try:
+                    ydl.close()
+                except Exception as e:
+                    logging.warning(f"  > Could not cleanly close a yt-dlp instance. Error: {e}")
+            self._instances.clear()
+
+def create_inprocess_engine(ytdlp_args):
+    """Returns an InProcessEngine, or None if the yt_dlp package cannot be imported."""
+    try:
+        import yt_dlp
+    except ImportError:
+        logging.warning("  -> The 'yt_dlp' Python package is not installed. Falling back to the subprocess engine.")
+        return None
+    return InProcessEngine(yt_dlp, ytdlp_args)